@@ -1,7 +1,26 @@
+import sys
 import time
+import argparse
+import os
+import tempfile
+import tracemalloc
 import random
+import asyncio
+import threading
 from Server import Server
-from Client import Client
+from SlabServer import SlabServer
+from Client import Client, fixed_ciphertext_size
+from PositionMap import ArrayPositionMap
+from RecursivePositionMap import RecursivePositionMap
+from RingClient import RingClient
+from CircuitClient import CircuitClient
+from TreeTopCache import levels_for_budget
+from Network import NetworkServer, RemoteServer
+from MmapServer import MmapServer
+from LogServer import LogServer
+from PartitionedClient import PartitionedClient
+from BenchmarkHarness import TrafficCounter, run_scenario
+from Tracing import Tracer
 import matplotlib.pyplot as plt
 
 # Constants
@@ -9,8 +28,26 @@ DEFAULT_REQUESTS = 50
 DEFAULT_RUNS = 5
 BUCKET_CAPACITY = 2
 TEST_DB_SIZES = [8, 16, 32, 64, 128, 256, 512, 1024, 2048, 4096]
+POSITION_MAP_DB_SIZES = [1024, 4096, 16384]
+ACCESS_MODE_DB_SIZES = [256, 1024, 4096]
+RING_REAL_SLOTS = 4
+RING_DUMMY_SLOTS = 6
+TREE_TOP_DB_SIZES = [1024, 4096]
+TREE_TOP_BUDGETS = [0, 4 * 1024, 64 * 1024]  # Client memory given to the tree-top cache, in bytes
+CACHED_BLOCK_BYTES = 200  # Rough memory taken by one decrypted (block_id, leaf, content) entry
+DEFERRED_DB_SIZES = [256, 1024]
+DEFERRED_WRITE_BOUND = 8  # Write-backs a deferred client may leave queued
+BULK_LOAD_DB_SIZES = [1024, 4096, 16384]
+PARTITIONED_DB_SIZES = [4096]
+PARTITION_COUNTS = [1, 2, 4, 8]
+DURABLE_DB_SIZES = [1024, 4096]
+LARGE_BLOCK_DB_SIZE = 256
+LARGE_BLOCK_SIZES = [4 * 1024, 16 * 1024, 64 * 1024]  # Fixed payload sizes, in bytes
+HOT_PATH_DB_SIZES = [256, 4096]
+HOT_PATH_REQUESTS = 500
 
-def evaluate_oram_performance(block_count: int, access_count: int = DEFAULT_REQUESTS, trials: int = DEFAULT_RUNS):
+def evaluate_oram_performance(block_count: int, access_count: int = DEFAULT_REQUESTS, trials: int = DEFAULT_RUNS,
+                              server_cls=Server, workload: str = "read-only", tracer: Tracer = None):
     """
     Measures average throughput and latency of ORAM access over multiple trials.
 
@@ -18,59 +55,569 @@ def evaluate_oram_performance(block_count: int, access_count: int = DEFAULT_REQU
         block_count (int): Number of data blocks in the ORAM.
         access_count (int): Number of random accesses per trial (default: DEFAULT_REQUESTS).
         trials (int): Number of trials to average over (default: DEFAULT_RUNS).
+        server_cls: Server backend to benchmark, one of BenchmarkHarness.SERVER_BACKENDS (default: Server).
+        workload (str): Access pattern, one of Workloads.WORKLOADS (default: uniform reads).
+        tracer (Tracer): Optional tracer recording the phases of the measured accesses.
 
     Returns:
-        tuple: (average_throughput, average_latency)
+        tuple: (average_throughput, average_latency, peak_stash_size)
     """
     tree_depth = (block_count - 1).bit_length()
 
     cumulative_throughput = 0.0
     cumulative_latency = 0.0
+    peak_stash = 0
 
     for _ in range(trials):
+        # Population happens before, and outside of, the measured steady-state phase
+        result = run_scenario(tree_depth, BUCKET_CAPACITY, workload, operations=access_count,
+                              warmup=0, server_cls=server_cls, tracer=tracer)
+        cumulative_throughput += result["throughput"]
+        cumulative_latency += result["latency_ns"]["mean"] / 1e9
+        peak_stash = max(peak_stash, result["peak_stash"])
+
+    avg_throughput = cumulative_throughput / trials
+    avg_latency = cumulative_latency / trials
+
+    return avg_throughput, avg_latency, peak_stash
+
+
+def execute_benchmarks(tracer: Tracer = None):
+    """
+    Measures average throughput and latency of ORAM access over multiple trials.
+
+    Args:
+        tracer (Tracer): Optional tracer recording the phases of the measured accesses.
+
+    Returns:
+        tuple: (average_throughput, average_latency)
+    """
+    results_summary = []
+
+    print(f"{'Database Size':<15} {'Avg Throughput (req/s)':<25} {'Avg Latency (s/req)':<22} {'Peak Stash'}")
+    for db_size in TEST_DB_SIZES:
+        throughput, latency, peak_stash = evaluate_oram_performance(db_size, tracer=tracer)
+        results_summary.append((db_size, throughput, latency, peak_stash))
+        print(f"{db_size:<15} {throughput:<25.2f} {latency:<22.6f} {peak_stash}")
+
+    return results_summary
+
+
+def measure_client_memory(client: Client) -> int:
+    """
+    Approximates the memory held by a client, excluding the servers it talks to.
+
+    Args:
+        client (Client): The client to measure.
+
+    Returns:
+        int: Total size in bytes of the objects reachable from the client.
+    """
+    seen = set()
+    pending = [client]
+    total = 0
+    while pending:
+        obj = pending.pop()
+        if id(obj) in seen or hasattr(obj, "read_path") or callable(obj):
+            continue
+        seen.add(id(obj))
+        total += sys.getsizeof(obj)
+        if isinstance(obj, dict):
+            pending.extend(obj.keys())
+            pending.extend(obj.values())
+        elif isinstance(obj, (list, tuple, set, frozenset)):
+            pending.extend(obj)
+        elif hasattr(obj, "__dict__"):
+            pending.append(vars(obj))
+    return total
+
+
+def evaluate_position_maps(block_count: int, access_count: int = DEFAULT_REQUESTS):
+    """
+    Compares client memory and access latency of the flat, array-backed and recursive position maps.
+
+    Args:
+        block_count (int): Number of data blocks in the ORAM.
+        access_count (int): Number of random accesses to time (default: DEFAULT_REQUESTS).
+
+    Returns:
+        list: (mode, client_memory_bytes, average_latency) for each position map mode.
+    """
+    tree_depth = (block_count - 1).bit_length()
+    results = []
+
+    position_maps = {
+        "flat": lambda: None,
+        "array": lambda: ArrayPositionMap(block_count, tree_depth),
+        "recursive": lambda: RecursivePositionMap(block_count),
+    }
+
+    for mode, make_pos_map in position_maps.items():
+        pos_map = make_pos_map()
         server = Server(tree_depth, BUCKET_CAPACITY)
-        client = Client(tree_depth)
+        client = Client(tree_depth, pos_map=pos_map)
+
+        client.bulk_load(server, ((block_id, f"data_{block_id:04}") for block_id in range(block_count)))
+
+        t_start = time.time()
+        for _ in range(access_count):
+            client.retrieve_data(server, random.randint(0, block_count - 1))
+        elapsed = time.time() - t_start
+
+        results.append((mode, measure_client_memory(client), elapsed / access_count))
+
+    return results
 
-        # Populate the ORAM with dummy data
+
+def execute_position_map_benchmarks():
+    """
+    Prints client memory against access latency for every position map mode.
+
+    Returns:
+        list: (db_size, mode, client_memory_bytes, average_latency) rows.
+    """
+    results_summary = []
+
+    print(f"{'Database Size':<15} {'Position Map':<15} {'Client Memory (B)':<20} {'Avg Latency (s/req)'}")
+    for db_size in POSITION_MAP_DB_SIZES:
+        for mode, memory, latency in evaluate_position_maps(db_size):
+            results_summary.append((db_size, mode, memory, latency))
+            print(f"{db_size:<15} {mode:<15} {memory:<20} {latency:.6f}")
+
+    return results_summary
+
+
+def evaluate_access_modes(block_count: int, access_count: int = DEFAULT_REQUESTS):
+    """
+    Compares online bandwidth, total bandwidth, latency and stash size of the Path, Ring and Circuit ORAM modes.
+
+    Args:
+        block_count (int): Number of data blocks in the ORAM.
+        access_count (int): Number of random accesses to measure (default: DEFAULT_REQUESTS).
+
+    Returns:
+        list: (mode, online_bytes_per_access, total_bytes_per_access, average_latency, peak_stash_size)
+              for each mode.
+    """
+    tree_depth = (block_count - 1).bit_length()
+    modes = {
+        "path": lambda monitor: (Server(tree_depth, BUCKET_CAPACITY), Client(tree_depth, stash_monitor=monitor)),
+        "ring": lambda monitor: (Server(tree_depth, RING_REAL_SLOTS + RING_DUMMY_SLOTS),
+                                 RingClient(tree_depth, RING_REAL_SLOTS, RING_DUMMY_SLOTS, stash_monitor=monitor)),
+        "circuit": lambda monitor: (Server(tree_depth, BUCKET_CAPACITY),
+                                    CircuitClient(tree_depth, stash_monitor=monitor)),
+    }
+    online_calls = {"circuit": ("read_paths",)}  # Circuit ORAM evicts through read_buckets
+    results = []
+
+    for mode, build in modes.items():
+        stash_sizes = []
+        server, client = build(stash_sizes.append)
         for block_id in range(block_count):
             client.store_data(server, block_id, f"data_{block_id:04}")
 
-        # Begin access measurement
+        counter = TrafficCounter(server, online_calls.get(mode, TrafficCounter.ONLINE_CALLS))
         t_start = time.time()
         for _ in range(access_count):
-            random_block = random.randint(0, block_count - 1)
-            client.retrieve_data(server, random_block)
-        t_end = time.time()
+            client.retrieve_data(counter, random.randint(0, block_count - 1))
+        elapsed = time.time() - t_start
 
-        elapsed = t_end - t_start
-        cumulative_throughput += access_count / elapsed
-        cumulative_latency += elapsed / access_count
+        results.append((mode, counter.online_bytes / access_count, counter.total_bytes / access_count,
+                        elapsed / access_count, max(stash_sizes[block_count:])))
 
-    avg_throughput = cumulative_throughput / trials
-    avg_latency = cumulative_latency / trials
+    return results
 
-    return avg_throughput, avg_latency
 
+def execute_access_mode_benchmarks():
+    """
+    Prints online bandwidth, total bandwidth, latency and peak stash of every access mode side by side.
 
-def execute_benchmarks():
+    Returns:
+        list: (db_size, mode, online_bytes_per_access, total_bytes_per_access, average_latency, peak_stash_size)
+              rows.
     """
-    Measures average throughput and latency of ORAM access over multiple trials.
+    results_summary = []
+
+    print(f"{'Database Size':<15} {'Mode':<8} {'Online (B/req)':<16} {'Total (B/req)':<16} "
+          f"{'Avg Latency (s/req)':<22} {'Peak Stash'}")
+    for db_size in ACCESS_MODE_DB_SIZES:
+        for mode, online, total, latency, peak_stash in evaluate_access_modes(db_size):
+            results_summary.append((db_size, mode, online, total, latency, peak_stash))
+            print(f"{db_size:<15} {mode:<8} {online:<16.0f} {total:<16.0f} {latency:<22.6f} {peak_stash}")
+
+    return results_summary
+
+
+def evaluate_tree_top_cache(block_count: int, access_count: int = DEFAULT_REQUESTS):
+    """
+    Measures server traffic and latency of Path ORAM with the top levels of the tree cached on the client.
 
     Args:
         block_count (int): Number of data blocks in the ORAM.
-        access_count (int): Number of random accesses per trial (default: DEFAULT_REQUESTS).
-        trials (int): Number of trials to average over (default: DEFAULT_RUNS).
+        access_count (int): Number of random accesses to measure (default: DEFAULT_REQUESTS).
 
     Returns:
-        tuple: (average_throughput, average_latency)
+        list: (budget_bytes, cached_levels, total_bytes_per_access, average_latency, client_memory_bytes)
+              for each budget in TREE_TOP_BUDGETS.
+    """
+    tree_depth = (block_count - 1).bit_length()
+    results = []
+
+    for budget in TREE_TOP_BUDGETS:
+        cached_levels = levels_for_budget(budget, BUCKET_CAPACITY, CACHED_BLOCK_BYTES, tree_depth)
+        server = Server(tree_depth, BUCKET_CAPACITY)
+        client = Client(tree_depth, cached_levels=cached_levels)
+        client.bulk_load(server, ((block_id, f"data_{block_id:04}") for block_id in range(block_count)))
+
+        counter = TrafficCounter(server)
+        t_start = time.time()
+        for _ in range(access_count):
+            client.retrieve_data(counter, random.randint(0, block_count - 1))
+        elapsed = time.time() - t_start
+
+        results.append((budget, cached_levels, counter.total_bytes / access_count, elapsed / access_count,
+                        measure_client_memory(client)))
+
+    return results
+
+
+def execute_tree_top_benchmarks():
+    """
+    Prints the server traffic and latency saved by each tree-top cache budget.
+
+    Returns:
+        list: (db_size, budget_bytes, cached_levels, total_bytes_per_access, average_latency, client_memory_bytes)
+              rows.
     """
     results_summary = []
 
-    print(f"{'Database Size':<15} {'Avg Throughput (req/s)':<25} {'Avg Latency (s/req)'}")
-    for db_size in TEST_DB_SIZES:
-        throughput, latency = evaluate_oram_performance(db_size)
-        results_summary.append((db_size, throughput, latency))
-        print(f"{db_size:<15} {throughput:<25.2f} {latency:.6f}")
+    print(f"{'Database Size':<15} {'Budget (B)':<12} {'Levels':<8} {'Server (B/req)':<16} "
+          f"{'Avg Latency (s/req)':<22} {'Client Memory (B)'}")
+    for db_size in TREE_TOP_DB_SIZES:
+        for budget, levels, traffic, latency, memory in evaluate_tree_top_cache(db_size):
+            results_summary.append((db_size, budget, levels, traffic, latency, memory))
+            print(f"{db_size:<15} {budget:<12} {levels:<8} {traffic:<16.0f} {latency:<22.6f} {memory}")
+
+    return results_summary
+
+
+def evaluate_deferred_eviction(block_count: int, access_count: int = DEFAULT_REQUESTS):
+    """
+    Measures user-visible latency with synchronous and deferred write-back against a server reached over TCP.
+
+    Args:
+        block_count (int): Number of data blocks in the ORAM.
+        access_count (int): Number of random accesses to measure (default: DEFAULT_REQUESTS).
+
+    Returns:
+        list: (mode, average_latency, drain_time) for each mode, where drain_time is the time taken
+              to flush the write-backs still queued after the last access.
+    """
+    tree_depth = (block_count - 1).bit_length()
+    loop = asyncio.new_event_loop()
+    loop_thread = threading.Thread(target=loop.run_forever, daemon=True)
+    loop_thread.start()
+    results = []
+
+    for mode, deferred_writes in (("synchronous", 0), ("deferred", DEFERRED_WRITE_BOUND)):
+        network_server = NetworkServer(Server(tree_depth, BUCKET_CAPACITY))
+        host, port = asyncio.run_coroutine_threadsafe(network_server.start_tcp(), loop).result()
+        server = RemoteServer(host, port)
+        client = Client(tree_depth, deferred_writes=deferred_writes)
+        client.bulk_load(server, ((block_id, f"data_{block_id:04}") for block_id in range(block_count)))
+        client.flush()
+        server.flush()
+
+        t_start = time.time()
+        for _ in range(access_count):
+            client.retrieve_data(server, random.randint(0, block_count - 1))
+        elapsed = time.time() - t_start
+
+        t_drain = time.time()
+        client.close()
+        server.flush()
+        drain_time = time.time() - t_drain
+
+        server.close()
+        asyncio.run_coroutine_threadsafe(network_server.close(), loop).result()
+        results.append((mode, elapsed / access_count, drain_time))
+
+    loop.call_soon_threadsafe(loop.stop)
+    loop_thread.join()
+    return results
+
+
+def execute_deferred_eviction_benchmarks():
+    """
+    Prints the user-visible latency of synchronous and deferred write-back side by side.
+
+    Returns:
+        list: (db_size, mode, average_latency, drain_time) rows.
+    """
+    results_summary = []
+
+    print(f"{'Database Size':<15} {'Write-back':<13} {'Avg Latency (s/req)':<22} {'Drain (s)'}")
+    for db_size in DEFERRED_DB_SIZES:
+        for mode, latency, drain_time in evaluate_deferred_eviction(db_size):
+            results_summary.append((db_size, mode, latency, drain_time))
+            print(f"{db_size:<15} {mode:<13} {latency:<22.6f} {drain_time:.6f}")
+
+    return results_summary
+
+
+def evaluate_bulk_load(block_count: int):
+    """
+    Times filling an empty ORAM one store_data call at a time against a single bulk_load.
+
+    Args:
+        block_count (int): Number of data blocks to load.
+
+    Returns:
+        tuple: (incremental_seconds, bulk_seconds)
+    """
+    tree_depth = (block_count - 1).bit_length()
+
+    server = Server(tree_depth, BUCKET_CAPACITY)
+    client = Client(tree_depth)
+    t_start = time.time()
+    for block_id in range(block_count):
+        client.store_data(server, block_id, f"data_{block_id:04}")
+    incremental_seconds = time.time() - t_start
+
+    server = Server(tree_depth, BUCKET_CAPACITY)
+    client = Client(tree_depth)
+    t_start = time.time()
+    client.bulk_load(server, ((block_id, f"data_{block_id:04}") for block_id in range(block_count)))
+    bulk_seconds = time.time() - t_start
+
+    return incremental_seconds, bulk_seconds
+
+
+def execute_bulk_load_benchmarks():
+    """
+    Prints the time taken by incremental and bulk loading for every database size.
+
+    Returns:
+        list: (db_size, incremental_seconds, bulk_seconds) rows.
+    """
+    results_summary = []
+
+    print(f"{'Database Size':<15} {'Incremental (s)':<18} {'Bulk Load (s)'}")
+    for db_size in BULK_LOAD_DB_SIZES:
+        incremental_seconds, bulk_seconds = evaluate_bulk_load(db_size)
+        results_summary.append((db_size, incremental_seconds, bulk_seconds))
+        print(f"{db_size:<15} {incremental_seconds:<18.3f} {bulk_seconds:.3f}")
+
+    return results_summary
+
+
+def evaluate_partitioned(block_count: int, access_count: int = DEFAULT_REQUESTS):
+    """
+    Measures the throughput of partitioned ORAM with every partition in its own worker process.
+
+    Args:
+        block_count (int): Number of data blocks in the ORAM.
+        access_count (int): Number of random accesses to measure (default: DEFAULT_REQUESTS).
+
+    Returns:
+        list: (partitions, throughput) for each count in PARTITION_COUNTS.
+    """
+    results = []
+
+    for partitions in PARTITION_COUNTS:
+        client = PartitionedClient(block_count, partitions, processes=True)
+        client.bulk_load((block_id, f"data_{block_id:04}") for block_id in range(block_count))
+
+        t_start = time.time()
+        for _ in range(access_count):
+            client.retrieve_data(random.randint(0, block_count - 1))
+        client.flush()
+        elapsed = time.time() - t_start
+
+        client.close()
+        results.append((partitions, access_count / elapsed))
+
+    return results
+
+
+def execute_partitioned_benchmarks():
+    """
+    Prints how throughput scales with the number of partition worker processes.
+
+    Returns:
+        list: (db_size, partitions, throughput) rows.
+    """
+    results_summary = []
+
+    print(f"{'Database Size':<15} {'Partitions':<12} {'Throughput (req/s)'}")
+    for db_size in PARTITIONED_DB_SIZES:
+        for partitions, throughput in evaluate_partitioned(db_size):
+            results_summary.append((db_size, partitions, throughput))
+            print(f"{db_size:<15} {partitions:<12} {throughput:.2f}")
+
+    return results_summary
+
+
+def evaluate_durable_storage(block_count: int, access_count: int = DEFAULT_REQUESTS):
+    """
+    Measures the throughput of durable backends: an mmap-backed tree updated in place and
+    flushed after every access, and the log-structured server with and without group commit.
+
+    Args:
+        block_count (int): Number of data blocks in the ORAM.
+        access_count (int): Number of random accesses to measure (default: DEFAULT_REQUESTS).
+
+    Returns:
+        list: (backend, throughput) for each backend.
+    """
+    tree_depth = (block_count - 1).bit_length()
+    results = []
+
+    backends = (
+        ("mmap, in place", lambda directory: MmapServer(os.path.join(directory, "tree.bin"), tree_depth,
+                                                        BUCKET_CAPACITY)),
+        ("log, fsync per access", lambda directory: LogServer(directory, tree_depth, BUCKET_CAPACITY, commit_every=1)),
+        ("log, group commit", lambda directory: LogServer(directory, tree_depth, BUCKET_CAPACITY)),
+    )
+    for backend, build in backends:
+        with tempfile.TemporaryDirectory() as directory:
+            server = build(directory)
+            client = Client(tree_depth)
+            client.bulk_load(server, ((block_id, f"data_{block_id:04}") for block_id in range(block_count)))
+            server.flush()
+
+            t_start = time.time()
+            for _ in range(access_count):
+                client.store_data(server, random.randint(0, block_count - 1), "updated")
+                if isinstance(server, MmapServer):
+                    server.flush()  # In-place writes are only durable once the mapping is synced
+            server.flush()
+            elapsed = time.time() - t_start
+
+            server.close()
+            results.append((backend, access_count / elapsed))
+
+    return results
+
+
+def execute_durable_storage_benchmarks():
+    """
+    Prints the write throughput of the durable backends side by side.
+
+    Returns:
+        list: (db_size, backend, throughput) rows.
+    """
+    results_summary = []
+
+    print(f"{'Database Size':<15} {'Backend':<24} {'Throughput (req/s)'}")
+    for db_size in DURABLE_DB_SIZES:
+        for backend, throughput in evaluate_durable_storage(db_size):
+            results_summary.append((db_size, backend, throughput))
+            print(f"{db_size:<15} {backend:<24} {throughput:.2f}")
+
+    return results_summary
+
+
+def evaluate_block_size(block_count: int, block_size: int, access_count: int = DEFAULT_REQUESTS):
+    """
+    Measures throughput with fixed-size binary payloads on the slab backend.
+
+    Args:
+        block_count (int): Number of data blocks in the ORAM.
+        block_size (int): Payload size of every block, in bytes.
+        access_count (int): Number of random accesses to measure (default: DEFAULT_REQUESTS).
+
+    Returns:
+        tuple: (throughput in requests per second, payload throughput in MiB per second)
+    """
+    tree_depth = (block_count - 1).bit_length()
+    server = SlabServer(tree_depth, BUCKET_CAPACITY, max_payload=fixed_ciphertext_size(block_size))
+    client = Client(tree_depth, block_size=block_size)
+    payload = bytes(block_size)
+    client.bulk_load(server, ((block_id, payload) for block_id in range(block_count)))
+
+    t_start = time.time()
+    for access in range(access_count):
+        if access % 2:
+            client.store_data(server, random.randint(0, block_count - 1), payload)
+        else:
+            client.retrieve_data(server, random.randint(0, block_count - 1))
+    elapsed = time.time() - t_start
+
+    client.close()
+    throughput = access_count / elapsed
+    return throughput, throughput * block_size / (1 << 20)
+
+
+def execute_block_size_benchmarks():
+    """
+    Prints throughput for every size in LARGE_BLOCK_SIZES.
+
+    Returns:
+        list: (block_size, throughput, payload_throughput) rows.
+    """
+    results_summary = []
+
+    print(f"{'Block Size (B)':<16} {'Throughput (req/s)':<20} {'Payload (MiB/s)'}")
+    for block_size in LARGE_BLOCK_SIZES:
+        throughput, payload_throughput = evaluate_block_size(LARGE_BLOCK_DB_SIZE, block_size)
+        results_summary.append((block_size, throughput, payload_throughput))
+        print(f"{block_size:<16} {throughput:<20.2f} {payload_throughput:.2f}")
+
+    return results_summary
+
+
+def evaluate_hot_path(block_count: int, access_count: int = HOT_PATH_REQUESTS):
+    """
+    Microbenchmark of a single access on the object-based Server: time, and memory allocated on
+    top of the steady state, per access.
+
+    Timing and allocation tracing run separately, as tracemalloc slows every allocation down.
+
+    Args:
+        block_count (int): Number of data blocks in the ORAM.
+        access_count (int): Number of random reads measured in each pass (default: HOT_PATH_REQUESTS).
+
+    Returns:
+        tuple: (mean time per access in microseconds, mean peak allocation per access in bytes)
+    """
+    tree_depth = (block_count - 1).bit_length()
+    server = Server(tree_depth, BUCKET_CAPACITY)
+    client = Client(tree_depth)
+    client.bulk_load(server, ((block_id, f"data_{block_id:04}") for block_id in range(block_count)))
+    block_ids = [random.randint(0, block_count - 1) for _ in range(access_count)]
+
+    t_start = time.perf_counter_ns()
+    for block_id in block_ids:
+        client.retrieve_data(server, block_id)
+    elapsed_ns = time.perf_counter_ns() - t_start
+
+    tracemalloc.start()
+    peak_total = 0
+    for block_id in block_ids:
+        baseline, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        client.retrieve_data(server, block_id)
+        peak_total += tracemalloc.get_traced_memory()[1] - baseline
+    tracemalloc.stop()
+
+    return elapsed_ns / access_count / 1e3, peak_total / access_count
+
+
+def execute_hot_path_benchmarks():
+    """
+    Prints the time and peak allocation of one access for every size in HOT_PATH_DB_SIZES.
+
+    Returns:
+        list: (db_size, microseconds_per_access, bytes_per_access) rows.
+    """
+    results_summary = []
+
+    print(f"{'Database Size':<15} {'Time (us/access)':<18} {'Peak Allocation (B/access)'}")
+    for db_size in HOT_PATH_DB_SIZES:
+        microseconds, allocated = evaluate_hot_path(db_size)
+        results_summary.append((db_size, microseconds, allocated))
+        print(f"{db_size:<15} {microseconds:<18.1f} {allocated:.0f}")
 
     return results_summary
 
@@ -105,5 +652,28 @@ def generate_plots(metrics):
 
 
 if __name__ == "__main__":
-    benchmark_data = execute_benchmarks()
-    generate_plots(benchmark_data)
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="ORAM benchmarks.")
+    parser.add_argument("--trace", help="Record the phases of the main benchmark's accesses to this file")
+    parser.add_argument("--trace-format", choices=["chrome", "pstats"], default="chrome",
+                        help="chrome: trace-event JSON for chrome://tracing or Perfetto; pstats: for pstats/snakeviz")
+    parser.add_argument("--trace-sample-rate", type=float, default=1.0, help="Fraction of the accesses traced")
+    arguments = parser.parse_args()
+
+    tracer = Tracer(arguments.trace_sample_rate) if arguments.trace else None
+    benchmark_data = execute_benchmarks(tracer)
+    if tracer is not None:
+        tracer.print_summary()
+        if arguments.trace_format == "chrome":
+            tracer.write_chrome_trace(arguments.trace)
+        else:
+            tracer.write_pstats(arguments.trace)
+    execute_position_map_benchmarks()
+    execute_access_mode_benchmarks()
+    execute_tree_top_benchmarks()
+    execute_deferred_eviction_benchmarks()
+    execute_bulk_load_benchmarks()
+    execute_partitioned_benchmarks()
+    execute_durable_storage_benchmarks()
+    execute_block_size_benchmarks()
+    execute_hot_path_benchmarks()
+    generate_plots(benchmark_data)
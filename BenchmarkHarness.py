@@ -0,0 +1,327 @@
+import argparse
+import json
+import math
+import platform
+import os
+import sys
+import time
+from itertools import islice, product
+
+from Client import Client
+from Server import Server
+from SlabServer import SlabServer
+from Workloads import DEFAULT_THETA, SKEWED_WORKLOADS, WORKLOADS, apply_operation, read_trace
+
+# CONSTANTS
+DEFAULT_OPERATIONS = 500
+DEFAULT_WARMUP = 50
+DEFAULT_DEPTHS = [6, 8, 10]
+DEFAULT_CAPACITIES = [2, 4]
+DEFAULT_THRESHOLD = 0.10  # Relative change flagged as a regression by compare
+SERVER_BACKENDS = {"objects": Server, "slab": SlabServer}
+
+DEFAULT_WORKLOADS = ["read-only", "read-heavy", "churn", "zipfian", "ycsb-a"]
+
+# Metrics compared between result files, with the direction in which they get worse
+COMPARED_METRICS = {
+    ("throughput",): "lower",
+    ("latency_ns", "p50"): "higher",
+    ("latency_ns", "p95"): "higher",
+    ("latency_ns", "p99"): "higher",
+    ("bytes_per_op", "total"): "higher",
+}
+
+
+class TrafficCounter:
+    """
+    Wraps a server and counts the bytes of the blocks moved by each kind of call.
+
+    Online reads are the calls that return the requested block (by default read_path and read_slots);
+    every other call only counts towards the total.
+    """
+
+    ONLINE_CALLS = ("read_path", "read_slots")
+
+    def __init__(self, server, online_calls: tuple = ONLINE_CALLS):
+        self._server = server
+        self._online_calls = online_calls
+        self.online_bytes = 0
+        self.total_bytes = 0
+
+    def __getattr__(self, name):
+        attribute = getattr(self._server, name)
+        if not callable(attribute):
+            return attribute
+
+        def counted(*args, **kwargs):
+            result = attribute(*args, **kwargs)
+            moved = result if result is not None else list(args) + list(kwargs.values())
+            size = self._count(moved)
+            self.total_bytes += size
+            if name in self._online_calls:
+                self.online_bytes += size
+            return result
+
+        return counted
+
+    def _count(self, moved) -> int:
+        if isinstance(moved, dict):
+            return sum(self._count(blocks) for blocks in moved.values())
+        if isinstance(moved, list):
+            return sum(self._count(item) for item in moved)
+        data = getattr(moved, "data", None)
+        return sum(len(part) for part in data) if data is not None else 0
+
+
+def percentile(sorted_values: list, fraction: float):
+    """
+    Nearest-rank percentile of an already sorted list.
+
+    Args:
+        sorted_values (list): The samples, in ascending order.
+        fraction (float): The percentile as a fraction, e.g. 0.99.
+
+    Returns:
+        The smallest sample such that at least `fraction` of the samples are lower or equal (0 if empty).
+    """
+    if not sorted_values:
+        return 0
+    rank = max(math.ceil(fraction * len(sorted_values)), 1)
+    return sorted_values[rank - 1]
+
+
+def summarize_latencies(latencies_ns: list[int]) -> dict:
+    # Mean, median, tail percentiles and maximum of a list of latencies in nanoseconds
+    ordered = sorted(latencies_ns)
+    return {
+        "count": len(ordered),
+        "mean": sum(ordered) / len(ordered) if ordered else 0,
+        "p50": percentile(ordered, 0.50),
+        "p95": percentile(ordered, 0.95),
+        "p99": percentile(ordered, 0.99),
+        "max": ordered[-1] if ordered else 0,
+    }
+
+
+def run_scenario(depth: int, bucket_capacity: int, workload: str, operations: int = DEFAULT_OPERATIONS,
+                 warmup: int = DEFAULT_WARMUP, server_cls=Server, seed: int = None, trace: str = None,
+                 tracer=None, theta: float = DEFAULT_THETA) -> dict:
+    """
+    Benchmarks one configuration in three separate phases: population, warmup and steady state.
+
+    The tree is filled with one block per leaf by bulk_load, `warmup` operations are run unmeasured,
+    then every one of `operations` operations is timed with perf_counter_ns and the bytes it moves
+    are counted.
+
+    Args:
+        depth (int): Depth of the ORAM tree.
+        bucket_capacity (int): Number of blocks per bucket.
+        workload (str): Name of the workload in Workloads.WORKLOADS, or a label for the trace.
+        operations (int): Number of measured operations; with a trace, None replays it to the end.
+        warmup (int): Number of unmeasured operations run first.
+        server_cls: Server backend, one of SERVER_BACKENDS.
+        seed (int): Seed of the workload generator, for reproducible operation sequences.
+        trace (str): Path of a trace file to stream operations from instead of a generated workload.
+        tracer (Tracer): Optional tracer given to the client; it keeps only the measured operations.
+        theta (float): Zipfian skew of the workloads in Workloads.SKEWED_WORKLOADS.
+
+    Returns:
+        dict: The configuration and its measurements, ready to be serialized to JSON.
+    """
+    block_count = 1 << depth
+    stream = read_trace(trace) if trace is not None else WORKLOADS[workload](block_count, seed, theta)
+    peak_stash = 0
+
+    def track_stash(stash_size: int):
+        nonlocal peak_stash
+        peak_stash = max(peak_stash, stash_size)
+
+    server = TrafficCounter(server_cls(depth, bucket_capacity))
+    client = Client(depth, stash_monitor=track_stash)
+
+    t_start = time.perf_counter_ns()
+    client.bulk_load(server, ((block_id, f"data_{block_id:04}") for block_id in range(block_count)))
+    population_ns = time.perf_counter_ns() - t_start
+
+    for operation in islice(stream, warmup):
+        apply_operation(client, server, operation)
+    client.set_tracer(tracer)  # Traced from here on, so that only measured operations are recorded
+
+    server.online_bytes = server.total_bytes = 0
+    peak_stash = 0
+    latencies = {}
+    t_steady = time.perf_counter_ns()
+    for operation in islice(stream, operations):
+        t_op = time.perf_counter_ns()
+        apply_operation(client, server, operation)
+        latencies.setdefault(operation[0], []).append(time.perf_counter_ns() - t_op)
+    steady_ns = time.perf_counter_ns() - t_steady
+    measured = sum(len(samples) for samples in latencies.values())
+
+    return {
+        "depth": depth,
+        "bucket_capacity": bucket_capacity,
+        "workload": workload,
+        "theta": theta if trace is None and workload in SKEWED_WORKLOADS else None,
+        "server": server_cls.__name__,
+        "block_count": block_count,
+        "operations": measured,
+        "warmup": warmup,
+        "population_seconds": population_ns / 1e9,
+        "throughput": measured / (steady_ns / 1e9),
+        "latency_ns": summarize_latencies([latency for samples in latencies.values() for latency in samples]),
+        "latency_ns_by_action": {action: summarize_latencies(samples) for action, samples in latencies.items()},
+        "bytes_per_op": {"online": server.online_bytes / max(measured, 1),
+                         "total": server.total_bytes / max(measured, 1)},
+        "peak_stash": peak_stash,
+    }
+
+
+def _metadata(seed: int = None) -> dict:
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "seed": seed,
+    }
+
+
+def _workload_label(workload: str, theta) -> str:
+    return workload if theta is None else f"{workload}@{theta:g}"
+
+
+def _report_progress(result: dict):
+    print(f"depth={result['depth']:<3} Z={result['bucket_capacity']:<3} "
+          f"{_workload_label(result['workload'], result.get('theta')):<13} "
+          f"{result['throughput']:>9.1f} req/s  p50={result['latency_ns']['p50'] / 1e6:.3f}ms  "
+          f"p99={result['latency_ns']['p99'] / 1e6:.3f}ms  {result['bytes_per_op']['total']:.0f} B/op", file=sys.stderr)
+
+
+def run_sweep(depths: list[int] = None, capacities: list[int] = None, workloads: list[str] = None,
+              operations: int = DEFAULT_OPERATIONS, warmup: int = DEFAULT_WARMUP, server: str = "objects",
+              seed: int = None, theta: float = DEFAULT_THETA) -> dict:
+    """
+    Runs run_scenario over every combination of depth, bucket capacity and workload, with the
+    Zipfian skew `theta`.
+
+    Returns:
+        dict: {"metadata": ..., "results": [...]} as written by the `run` command.
+    """
+    results = []
+    for depth, capacity, workload in product(depths or DEFAULT_DEPTHS, capacities or DEFAULT_CAPACITIES,
+                                             workloads or DEFAULT_WORKLOADS):
+        result = run_scenario(depth, capacity, workload, operations, warmup, SERVER_BACKENDS[server], seed,
+                              theta=theta)
+        results.append(result)
+        _report_progress(result)
+    return {"metadata": _metadata(seed), "results": results}
+
+
+def _scenario_key(result: dict) -> tuple:
+    # Result files written before theta was recorded ran their skewed workloads at DEFAULT_THETA
+    theta = result.get("theta", DEFAULT_THETA if result["workload"] in SKEWED_WORKLOADS else None)
+    return result["depth"], result["bucket_capacity"], _workload_label(result["workload"], theta), result["server"]
+
+
+def _metric(result: dict, path: tuple):
+    for part in path:
+        result = result[part]
+    return result
+
+
+def compare_results(baseline: dict, candidate: dict, threshold: float = DEFAULT_THRESHOLD) -> list[dict]:
+    """
+    Compares every scenario present in both result sets.
+
+    Args:
+        baseline (dict): Results of the reference run.
+        candidate (dict): Results of the run under test.
+        threshold (float): Relative change beyond which a worse metric is flagged.
+
+    Returns:
+        list[dict]: One entry per compared metric, with its relative change and a `regression` flag.
+    """
+    baseline_results = {_scenario_key(result): result for result in baseline["results"]}
+    rows = []
+    for result in candidate["results"]:
+        reference = baseline_results.get(_scenario_key(result))
+        if reference is None:
+            continue
+        for path, worse in COMPARED_METRICS.items():
+            before, after = _metric(reference, path), _metric(result, path)
+            change = (after - before) / before if before else 0.0
+            regression = change > threshold if worse == "higher" else change < -threshold
+            rows.append({"scenario": _scenario_key(result), "metric": ".".join(path), "baseline": before,
+                         "candidate": after, "change": change, "regression": regression})
+    return rows
+
+
+def _print_comparison(rows: list[dict]):
+    print(f"{'Scenario':<34} {'Metric':<20} {'Baseline':>14} {'Candidate':>14} {'Change':>9}")
+    for row in rows:
+        depth, capacity, workload, server = row["scenario"]
+        scenario = f"d={depth} Z={capacity} {workload} {server}"
+        flag = "  REGRESSION" if row["regression"] else ""
+        print(f"{scenario:<34} {row['metric']:<20} {row['baseline']:>14.1f} {row['candidate']:>14.1f} "
+              f"{row['change']:>+8.1%}{flag}")
+
+
+def main(argv: list[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="ORAM benchmark harness.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="Run a benchmark sweep and write the results as JSON")
+    run_parser.add_argument("--output", "-o", help="Result file (default: standard output)")
+    run_parser.add_argument("--depths", type=int, nargs="+", default=DEFAULT_DEPTHS)
+    run_parser.add_argument("--capacities", type=int, nargs="+", default=DEFAULT_CAPACITIES)
+    run_parser.add_argument("--workloads", nargs="+", choices=list(WORKLOADS), default=DEFAULT_WORKLOADS)
+    run_parser.add_argument("--operations", type=int, default=DEFAULT_OPERATIONS)
+    run_parser.add_argument("--warmup", type=int, default=DEFAULT_WARMUP)
+    run_parser.add_argument("--server", choices=list(SERVER_BACKENDS), default="objects")
+    run_parser.add_argument("--seed", type=int)
+    run_parser.add_argument("--theta", type=float, default=DEFAULT_THETA,
+                            help="Zipfian skew of the zipfian and ycsb-* workloads, in (0, 1) (default: 0.99)")
+
+    replay_parser = commands.add_parser("replay", help="Stream a recorded trace through a client and write the results")
+    replay_parser.add_argument("trace", help="Trace file of '<action> <block_id> [payload]' lines")
+    replay_parser.add_argument("--output", "-o", help="Result file (default: standard output)")
+    replay_parser.add_argument("--depth", type=int, default=DEFAULT_DEPTHS[-1])
+    replay_parser.add_argument("--capacity", type=int, default=DEFAULT_CAPACITIES[-1])
+    replay_parser.add_argument("--operations", type=int, help="Measured operations (default: the rest of the trace)")
+    replay_parser.add_argument("--warmup", type=int, default=DEFAULT_WARMUP)
+    replay_parser.add_argument("--server", choices=list(SERVER_BACKENDS), default="objects")
+
+    compare_parser = commands.add_parser("compare", help="Flag regressions between two result files")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("candidate")
+    compare_parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                                help="Relative change flagged as a regression (default: 0.10)")
+
+    arguments = parser.parse_args(argv)
+    if arguments.command == "run" and not 0 < arguments.theta < 1:
+        run_parser.error("--theta must lie strictly between 0 and 1")
+    if arguments.command in ("run", "replay"):
+        if arguments.command == "run":
+            report = run_sweep(arguments.depths, arguments.capacities, arguments.workloads, arguments.operations,
+                               arguments.warmup, arguments.server, arguments.seed, arguments.theta)
+        else:
+            result = run_scenario(arguments.depth, arguments.capacity, f"trace:{os.path.basename(arguments.trace)}",
+                                  arguments.operations, arguments.warmup, SERVER_BACKENDS[arguments.server],
+                                  trace=arguments.trace)
+            _report_progress(result)
+            report = {"metadata": _metadata(), "results": [result]}
+        if arguments.output:
+            with open(arguments.output, "w") as output:
+                json.dump(report, output, indent=2)
+        else:
+            json.dump(report, sys.stdout, indent=2)
+        return 0
+
+    with open(arguments.baseline) as baseline_file, open(arguments.candidate) as candidate_file:
+        rows = compare_results(json.load(baseline_file), json.load(candidate_file), arguments.threshold)
+    _print_comparison(rows)
+    return 1 if any(row["regression"] for row in rows) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
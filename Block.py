@@ -6,19 +6,22 @@ class Block:
         _id (int): Identifier of the block (can be None for dummy blocks).
         data (str): 4-character string containing the block's data.
         _is_dummy (bool): Indicates if the block is a dummy (used to hide real data).
+        _data (tuple): The (nonce, ciphertext, tag) triple, or None before any ciphertext is set.
+
+    Blocks are created and read on every access, so they use __slots__ and keep the sealed triple
+    as the tuple they were given; hot paths in this package read _id, _data and _is_dummy directly.
     """
 
+    __slots__ = ("_id", "_is_dummy", "_data")
+
     def __init__(self, block_id=None, data=None, is_dummy=True):
         self._id = block_id
         self._is_dummy = is_dummy
+        self._data = None
 
-        self._tag = None
-        self._nonce = None
-        self._ciphertext = None
-
-        # Set the data if not a dummy block and data has exactly 3 elements
-        if not self._is_dummy and data is not None and len(data) == 3:
-            self._nonce, self._ciphertext, self._tag = data
+        # Set the data if it has exactly 3 elements (dummy blocks may carry a dummy ciphertext)
+        if data is not None and len(data) == 3 and data[1] is not None:
+            self._data = data if type(data) is tuple else tuple(data)
 
 
     # Getter for block id
@@ -42,15 +45,13 @@ class Block:
     # Getter for the full data tuple
     @property
     def data(self):
-        if self._is_dummy:
-            return None
-        return (self._nonce, self._ciphertext, self._tag)
+        return self._data
 
     # Setter for full data (nonce, ciphertext, tag)
     @data.setter
     def data(self, value):
         if value is not None and isinstance(value, tuple) and len(value) == 3:
-            self._nonce, self._ciphertext, self._tag = value
+            self._data = value if value[1] is not None else None
         else:
             raise ValueError("Data must be a tuple with 3 elements (nonce, ciphertext, tag).")
 
@@ -1,6 +1,16 @@
 from Block import Block
 
 class Bucket:
+    """
+    Fixed-capacity list of blocks, one per tree node.
+
+    `blocks` and `get_blocks()` return the bucket's own list rather than a copy: callers must not
+    mutate it. Writers replace the content through `reset_content()`, which binds a new list, so a
+    list handed out earlier keeps the blocks it was read with.
+    """
+
+    __slots__ = ("_capacity", "_blocks")
+
     def __init__(self, capacity: int):
         """
         Initializes the Bucket with a given capacity.
@@ -28,10 +38,10 @@ class Bucket:
         if len(self._blocks) > self._capacity:
             self._blocks = self._blocks[:self._capacity]
 
-    # Getter for _blocks (read-only)
+    # Getter for _blocks (read-only, not copied)
     @property
     def blocks(self):
-        return self._blocks.copy()
+        return self._blocks
 
     # Method to add a block to the bucket
     def add_block(self, block: Block):
@@ -44,7 +54,13 @@ class Bucket:
     def reset_content(self):
         self._blocks = []
 
-    # Method to get all blocks in the bucket
+    # Method to get all blocks in the bucket (read-only, not copied)
     def get_blocks(self):
-        return self._blocks.copy()
+        return self._blocks
+
+    # Method to get the block stored in one slot (an empty Block if the slot was never written)
+    def get_block(self, slot: int):
+        if slot < len(self._blocks):
+            return self._blocks[slot]
+        return Block()
 
@@ -0,0 +1,78 @@
+import struct
+
+# ENTRY LAYOUT: real flag | block id | leaf | content length | content (padded to slot_size)
+ENTRY_HEADER = struct.Struct("<BqIH")
+DEFAULT_SLOT_SIZE = 32
+
+
+class BucketFormat:
+    """
+    Serializes a whole bucket into one fixed-size plaintext, to be sealed with a single AES-GCM call.
+
+    Every bucket serializes to the same number of bytes whatever it holds, so once encrypted the
+    server stores one opaque ciphertext per bucket and cannot tell real blocks from dummy slots.
+    """
+
+    def __init__(self, capacity: int, slot_size: int = DEFAULT_SLOT_SIZE):
+        """
+        Args:
+            capacity (int): Number of block slots per bucket.
+            slot_size (int): Maximum encoded content length of a block, in bytes.
+        """
+        self._capacity = capacity
+        self._slot_size = slot_size
+        self._entry_size = ENTRY_HEADER.size + slot_size
+
+    @property
+    def capacity(self) -> int:
+        return self._capacity
+
+    @property
+    def slot_size(self) -> int:
+        return self._slot_size
+
+    @property
+    def plaintext_size(self) -> int:
+        # Size in bytes of a serialized bucket
+        return self._entry_size * self._capacity
+
+    def pack(self, entries: list[tuple]) -> bytes:
+        """
+        Serializes the blocks of a bucket, padding the remaining slots with zeros.
+
+        Args:
+            entries (list[tuple]): Up to `capacity` (block_id, leaf, content) tuples.
+
+        Returns:
+            bytes: The serialized bucket, exactly plaintext_size bytes long.
+        """
+        if len(entries) > self._capacity:
+            raise Exception("Reached max capacity")
+        plain_text = bytearray(self.plaintext_size)
+        for slot, (block_id, leaf, content) in enumerate(entries):
+            encoded = content.encode()
+            if len(encoded) > self._slot_size:
+                raise ValueError(f"Content of block {block_id} exceeds the slot size of {self._slot_size} bytes.")
+            offset = slot * self._entry_size
+            ENTRY_HEADER.pack_into(plain_text, offset, 1, block_id, leaf, len(encoded))
+            start = offset + ENTRY_HEADER.size
+            plain_text[start:start + len(encoded)] = encoded
+        return bytes(plain_text)
+
+    def unpack(self, plain_text: bytes) -> list[tuple]:
+        """
+        Parses a serialized bucket.
+
+        Args:
+            plain_text (bytes): A bucket produced by pack.
+
+        Returns:
+            list[tuple]: (block_id, leaf, content) for every real block in the bucket.
+        """
+        entries = []
+        for offset in range(0, self.plaintext_size, self._entry_size):
+            is_real, block_id, leaf, length = ENTRY_HEADER.unpack_from(plain_text, offset)
+            if is_real:
+                start = offset + ENTRY_HEADER.size
+                entries.append((block_id, leaf, plain_text[start:start + length].decode()))
+        return entries
@@ -0,0 +1,128 @@
+from Client import Client
+from TreeUtils import deepest_common_level, find_path_indices
+
+
+class CircuitClient(Client):
+    """
+    ORAM client using Circuit ORAM eviction instead of full-path write-back from the stash.
+
+    An access reads the path of the requested block, removes the block and writes the path back.
+    Two eviction passes then run along paths taken in reverse-lexicographic order. Each pass scans
+    the metadata of its path once to decide, per level, which block to pick up and where to drop
+    it, then walks the path from the stash down to the leaf carrying at most one block at a time.
+    This keeps the stash small and constant-sized without rescanning it for every bucket.
+    """
+
+    def __init__(self, tree_height: int, evictions_per_access: int = 2, **client_options):
+        if client_options.get("cached_levels"):
+            raise ValueError("Circuit ORAM evicts whole server paths and cannot cache the top of the tree.")
+        if client_options.get("deferred_writes"):
+            raise ValueError("Circuit ORAM writes paths back synchronously.")
+        super().__init__(tree_height, **client_options)
+        self._evictions_per_access = evictions_per_access
+        self._eviction_count = 0
+
+    def _next_eviction_leaf(self) -> int:
+        # Leaves are visited in reverse-lexicographic order: the bits of a counter, reversed
+        counter = self._eviction_count % (1 << self._depth)
+        self._eviction_count += 1
+        return int(f"{counter:0{self._depth}b}"[::-1], 2) if self._depth else 0
+
+    def _read_path_entries(self, server, leaf: int, online: bool = False) -> list[list[tuple]]:
+        # Decrypts a path into one list of (block_id, leaf, content) entries per level, root first.
+        # The online read of an access goes through read_paths, eviction reads through read_buckets.
+        path = find_path_indices(leaf, self._depth)
+        fetched = server.read_paths([leaf]) if online else server.read_buckets(path)
+        return [self._decrypt_entries(fetched[node_index]) for node_index in path]
+
+    def _write_path_entries(self, server, leaf: int, levels: list[list[tuple]]):
+        server.write_path(leaf, self._encrypt_buckets(self._bucket_slots(server), levels))
+
+    def _prepare_deepest(self, leaf: int, levels: list[list[tuple]]) -> list:
+        # deepest[i]: the position above i holding the block that can go deepest, if it can reach i.
+        # Position 0 is the stash and position i + 1 is the bucket at level i.
+        deepest = [None] * (self._depth + 2)
+        source, goal = None, -1
+        candidate = self._stash.deepest_for(leaf)
+        if candidate is not None:
+            source, goal = 0, candidate[1]
+        for level, entries in enumerate(levels):
+            if goal >= level:
+                deepest[level + 1] = source
+            local_goal = max((deepest_common_level(leaf, entry[1], self._depth) for entry in entries), default=-1)
+            if local_goal > goal:
+                source, goal = level + 1, local_goal
+        return deepest
+
+    def _prepare_target(self, levels: list[list[tuple]], deepest: list, capacity: int) -> list:
+        # target[i]: the position the block picked up at position i must be dropped at
+        target = [None] * (self._depth + 2)
+        source, destination = None, None
+        for position in range(self._depth + 1, -1, -1):
+            if position == source:
+                target[position] = destination
+                source, destination = None, None
+            has_room = position > 0 and len(levels[position - 1]) < capacity
+            if ((destination is None and has_room) or target[position] is not None) and deepest[position] is not None:
+                source, destination = deepest[position], position
+        return target
+
+    def _take_deepest(self, leaf: int, position: int, levels: list[list[tuple]]) -> tuple:
+        # Removes the block that can go deepest from the stash (position 0) or a bucket on the path
+        if position == 0:
+            block_id, _ = self._stash.deepest_for(leaf)
+            block_leaf = self._stash.leaf_of(block_id)
+            return block_id, block_leaf, self._stash.remove(block_id)
+        entries = levels[position - 1]
+        best = max(range(len(entries)), key=lambda index: deepest_common_level(leaf, entries[index][1], self._depth))
+        return entries.pop(best)
+
+    def _evict_once(self, server, leaf: int):
+        # One Circuit ORAM eviction pass along the path to `leaf`
+        capacity = self._bucket_slots(server)
+        levels = self._read_path_entries(server, leaf)
+        deepest = self._prepare_deepest(leaf, levels)
+        target = self._prepare_target(levels, deepest, capacity)
+
+        held, destination = None, None
+        for position in range(self._depth + 2):
+            to_write = None
+            if held is not None and position == destination:
+                to_write, held, destination = held, None, None
+            if target[position] is not None:
+                held, destination = self._take_deepest(leaf, position, levels), target[position]
+            if to_write is not None:
+                levels[position - 1].append(to_write)
+
+        self._write_path_entries(server, leaf, levels)
+
+    def _process_request(self, server, block_id: int, action: str, payload: str = None):
+        # Main handler for read/write/delete/update requests
+        new_leaf = self._assign_new_leaf()
+        previous_leaf = self._pos_map.remap(block_id, new_leaf)  # Re-assign position
+        leaf = previous_leaf if previous_leaf is not None else self._assign_new_leaf()  # Unknown: random path
+
+        # Read the path and remove the requested block from it. Until the access below reassigns
+        # it, the block keeps its previous leaf in the stash, so a failure restores that leaf.
+        try:
+            levels = self._read_path_entries(server, leaf, online=True)
+            for entries in levels:
+                for index, entry in enumerate(entries):
+                    if entry[0] == block_id:
+                        del entries[index]
+                        self._stash.add(block_id, entry[2], entry[1])
+                        break
+            self._write_path_entries(server, leaf, levels)
+            result, _ = self._handle_access(block_id, action, payload, new_leaf)
+        except BaseException:
+            self._restore_leaf(block_id, previous_leaf)
+            raise
+
+        for _ in range(self._evictions_per_access):
+            self._evict_once(server, self._next_eviction_leaf())
+
+        self._report_stash()
+        return result
+
+    def batch_access(self, server, operations: list) -> list:
+        raise ValueError("Circuit ORAM evicts along single paths and cannot serve a batch from one union of paths.")
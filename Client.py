@@ -1,122 +1,535 @@
-import random
-from Crypto.Cipher import AES
+import struct
+from time import perf_counter
 from Crypto.Random import get_random_bytes
 
-from TreeUtils import find_path_indices
 from Block import Block
+from CryptoPipeline import CryptoPipeline
+from Metrics import (CLIENT_DECRYPT_SECONDS, CLIENT_ENCRYPT_SECONDS, CLIENT_EVICTED_BLOCKS,
+                     CLIENT_POSITION_MAP_ENTRIES, CLIENT_STASH_BLOCKS, CLIENT_STASH_PER_ACCESS)
+from PositionMap import LeafSampler, PositionMap
+from Stash import Stash
+from TreeTopCache import TreeTopCache
+from TreeUtils import find_path_indices, find_paths_union, leftmost_leaf, node_level
+from WriteBackQueue import WriteBackQueue
 
 # OPERATIONS WE CAN DO
 OP_WRITE = "write"
 OP_READ = "read"
 OP_DELETE = "delete"
+OP_UPDATE = "update"
 
 # CONSTANTS
 AES_KEY_SIZE = 16
+LEAF_HEADER = struct.Struct("<I")  # Every plaintext starts with the leaf its block is assigned to
+# With a fixed block size, plaintexts are instead: leaf | payload length | payload kind | payload, zero-padded
+PAYLOAD_HEADER = struct.Struct("<IIB")
+PAYLOAD_BYTES = 0
+PAYLOAD_STR = 1
+DEFAULT_DUMMY_SIZE = 16  # Length of the content sealed into dummy slots
+DEFAULT_LOAD_BATCH = 1024  # Buckets sealed and written per call during a bulk load
+
+
+def fixed_ciphertext_size(block_size: int) -> int:
+    # Length of every ciphertext sealed by a client with the given block size, e.g. a SlabServer's max_payload
+    return PAYLOAD_HEADER.size + block_size
 
 class Client:
     """
     ORAM client managing encrypted access with a stash and position map.
     """
 
-    def __init__(self, tree_height: int):
-        self._key = get_random_bytes(AES_KEY_SIZE)  # Symmetric key for AES encryption
+    def __init__(self, tree_height: int, stash_monitor=None, pos_map=None, crypto_workers: int = 0,
+                 dummy_size: int = DEFAULT_DUMMY_SIZE, bucket_format=None, cached_levels: int = 0,
+                 deferred_writes: int = 0, metrics=None, tracer=None, key: bytes = None, block_size: int = None):
+        # Symmetric key for AES encryption, fresh unless the client resumes a saved state
+        self._key = key if key is not None else get_random_bytes(AES_KEY_SIZE)
+        self._crypto = CryptoPipeline(self._key, workers=crypto_workers)  # Batched AES-GCM for whole paths
+        # With a block size, every block carries a bytes-like (or str) payload of at most block_size
+        # bytes, padded so that all ciphertexts, dummies included, have the same length
+        self._block_size = block_size
+        if block_size is not None:
+            if bucket_format is not None:
+                raise ValueError("A fixed block size cannot be combined with a bucket format.")
+            self._plain_size = fixed_ciphertext_size(block_size)
+            self._dummy_plaintext = bytes(self._plain_size)
+            self._arena = bytearray()  # Reused buffer the fetched blocks are decrypted into
+        else:
+            self._dummy_plaintext = LEAF_HEADER.pack(0) + bytes(dummy_size)  # Sealed into every empty slot
         self._depth = tree_height  # Height of the ORAM tree
-        self._pos_map = {}  # Maps block ID to a leaf index
-        self._stash = []  # Temporary storage for blocks
+        self._pos_map = pos_map if pos_map is not None else PositionMap()  # Maps block ID to a leaf index
+        self._stash = Stash(tree_height)  # Temporary storage for blocks, indexed by ID and leaf
+        self._stash_monitor = stash_monitor  # Optional callback receiving the stash size after every access
+        self._leaf_sampler = LeafSampler(tree_height)  # Pre-generated random leaves
+        # Optional BucketFormat: seal each bucket as one ciphertext, stored by the server as a single opaque block
+        self._bucket_format = bucket_format
+        # The top `cached_levels` levels of the tree live on the client and are never sent to the server
+        self._tree_top = TreeTopCache(cached_levels)
+        # With deferred_writes > 0, up to that many write-backs are left to a background thread and
+        # accesses return as soon as their result is known
+        self._write_back = WriteBackQueue(self._seal_nodes, deferred_writes) if deferred_writes > 0 else None
+        # Optional MetricsSink receiving the stash and position map sizes, the blocks evicted per
+        # level and the time spent in encryption and decryption
+        self._metrics = metrics
+        # Optional Tracer recording the phases of sampled accesses, and the trace of the access in progress
+        self._tracer = tracer
+        self._trace = None
+
+    @property
+    def stash_size(self) -> int:
+        # Number of real blocks currently held in the stash
+        return len(self._stash)
+
+    def _bucket_slots(self, server) -> int:
+        # Number of blocks that fit in one bucket
+        if self._bucket_format is not None:
+            return self._bucket_format.capacity
+        return server._bucket_capacity
+
+    def _bucket_real_slots(self, server) -> int:
+        # Number of real blocks a bulk load may place in one bucket
+        return self._bucket_slots(server)
+
+    def _decrypt_blocks(self, blocks: list[Block]) -> list[bytes]:
+        # Decrypts and verifies a batch of blocks using AES-GCM
+        started = perf_counter() if self._metrics is not None else None
+        try:
+            plain_texts = self._crypto.decrypt_many([block._data for block in blocks])
+        except ValueError as err:
+            raise ValueError(f"Failed to decrypt a block of {[block._id for block in blocks]}: {err}")
+        if started is not None:
+            self._metrics.observe(CLIENT_DECRYPT_SECONDS, perf_counter() - started)
+        return plain_texts
+
+    def _decrypt_blocks_into(self, blocks: list[Block]) -> list[memoryview]:
+        # Decrypts and verifies a batch of fixed-size blocks into the reused arena, returning views of the plaintexts
+        needed = len(blocks) * self._plain_size
+        if len(self._arena) < needed:
+            self._arena = bytearray(needed)
+        started = perf_counter() if self._metrics is not None else None
+        try:
+            plain_texts = self._crypto.decrypt_many_into([block._data for block in blocks], memoryview(self._arena),
+                                                         self._plain_size)
+        except ValueError as err:
+            raise ValueError(f"Failed to decrypt a block of {[block._id for block in blocks]}: {err}")
+        if started is not None:
+            self._metrics.observe(CLIENT_DECRYPT_SECONDS, perf_counter() - started)
+        return plain_texts
+
+    def _pack_payload(self, leaf: int, content) -> bytearray:
+        # Builds the fixed-size plaintext of a block
+        if isinstance(content, str):
+            kind, payload = PAYLOAD_STR, content.encode()
+        else:
+            kind, payload = PAYLOAD_BYTES, memoryview(content).cast("B")
+        if len(payload) > self._block_size:
+            raise ValueError(f"A payload of {len(payload)} bytes exceeds the block size of {self._block_size} bytes.")
+        plain_text = bytearray(self._plain_size)
+        PAYLOAD_HEADER.pack_into(plain_text, 0, leaf, len(payload), kind)
+        plain_text[PAYLOAD_HEADER.size:PAYLOAD_HEADER.size + len(payload)] = payload
+        return plain_text
+
+    def _encrypt_many(self, plain_texts: list[bytes]) -> list[tuple]:
+        # Seals a batch of plaintexts using AES-GCM
+        if self._metrics is None:
+            return self._crypto.encrypt_many(plain_texts)
+        started = perf_counter()
+        sealed = self._crypto.encrypt_many(plain_texts)
+        self._metrics.observe(CLIENT_ENCRYPT_SECONDS, perf_counter() - started)
+        return sealed
+
+    def _encrypt_buckets(self, capacity: int, buckets: list[list[tuple]]) -> list[list[Block]]:
+        # Re-encrypts every evicted block and fills the remaining slots with fresh dummy ciphertexts,
+        # so each bucket written back holds exactly `capacity` newly sealed blocks
+        if self._bucket_format is not None:
+            plain_texts = [self._bucket_format.pack(entries) for entries in buckets]
+            return [[Block(None, sealed, is_dummy=True)] for sealed in self._encrypt_many(plain_texts)]
+
+        plain_texts = []
+        for entries in buckets:
+            for _, leaf, content in entries:
+                if self._block_size is not None:
+                    plain_texts.append(self._pack_payload(leaf, content))
+                else:
+                    plain_texts.append(LEAF_HEADER.pack(leaf) + content.encode())
+            plain_texts.extend([self._dummy_plaintext] * (capacity - len(entries)))
 
-    def _decrypt_block(self, nonce: bytes, cipher_text: bytes, tag: bytes) -> str:
-        # Decrypts and verifies a block using AES-GCM
-        aes = AES.new(self._key, AES.MODE_GCM, nonce=nonce)
-        return aes.decrypt_and_verify(cipher_text, tag).decode()
+        sealed = iter(self._encrypt_many(plain_texts))
+        sealed_buckets = []
+        for entries in buckets:
+            bucket_blocks = [Block(block_id, next(sealed), is_dummy=False) for block_id, _, _ in entries]
+            bucket_blocks.extend(Block(None, next(sealed), is_dummy=True) for _ in range(capacity - len(entries)))
+            sealed_buckets.append(bucket_blocks)
+        return sealed_buckets
 
-    def _encrypt_block(self, content: str) -> tuple[bytes, bytes, bytes]:
-        # Encrypts block content using AES-GCM
-        aes = AES.new(self._key, AES.MODE_GCM)
-        cipher_text, tag = aes.encrypt_and_digest(content.encode())
-        return aes.nonce, cipher_text, tag
+    def _decrypt_entries(self, blocks: list[Block]) -> list[tuple]:
+        # Decrypts the real blocks among the fetched ones in one batch, as (block_id, leaf, content) entries
+        if self._bucket_format is not None:
+            # Every fetched block is an opaque bucket ciphertext; never-written buckets are empty
+            sealed_buckets = [block for block in blocks if block._data is not None]
+            entries = []
+            for plain_text in self._decrypt_blocks(sealed_buckets):
+                entries.extend(self._bucket_format.unpack(plain_text))
+            return entries
+
+        real_blocks = [block for block in blocks if not block._is_dummy]
+        if self._block_size is not None:
+            # Only the payload is copied out of the arena
+            entries = []
+            for block, plain_text in zip(real_blocks, self._decrypt_blocks_into(real_blocks)):
+                leaf, length, kind = PAYLOAD_HEADER.unpack_from(plain_text)
+                payload = plain_text[PAYLOAD_HEADER.size:PAYLOAD_HEADER.size + length]
+                entries.append((block._id, leaf, str(payload, "utf-8") if kind == PAYLOAD_STR else bytes(payload)))
+            return entries
+        return [(block._id, LEAF_HEADER.unpack_from(plain_text)[0], plain_text[LEAF_HEADER.size:].decode())
+                for block, plain_text in zip(real_blocks, self._decrypt_blocks(real_blocks))]
+
+    def _stash_fetched(self, blocks: list[Block]):
+        # Decrypts the fetched real blocks in one batch and moves them into the stash
+        entries = self._decrypt_entries(blocks)
+        if self._trace is not None:
+            self._trace.mark("decrypt")
+        for block_id, leaf, content in entries:
+            self._stash.add(block_id, content, leaf)
+        if self._trace is not None:
+            self._trace.mark("stash_merge")
+
+    def _stash_cached(self, node_indices):
+        # Moves the blocks of the cached buckets among the given nodes into the stash
+        for block_id, leaf, content in self._tree_top.take(node_indices):
+            self._stash.add(block_id, content, leaf)
+
+    def _stash_around_queue(self, server, leaves: list[int], node_indices: list[int]):
+        # Reads the paths to `leaves` while write-backs are queued. Buckets with a queued write are
+        # taken from the queue, and their stale server copy is ignored. If the read fails, the
+        # queued writes still land, so their entries go back to the queue instead of the stash.
+        taken = self._write_back.take(node_indices)
+        for entries in taken.values():
+            for block_id, leaf, content in entries:
+                self._stash.add(block_id, content, leaf)
+        try:
+            fetched = server.read_paths(leaves, self._tree_top.levels)
+            if self._trace is not None:
+                self._trace.mark("read_path")
+            self._stash_fetched([block for node_index, bucket_blocks in fetched.items() if node_index not in taken
+                                 for block in bucket_blocks])
+        except BaseException:
+            for entries in taken.values():
+                for block_id, _, _ in entries:
+                    self._stash.remove(block_id)
+            self._write_back.restore(taken)
+            raise
+
+    def _report_stash(self):
+        # Reports the state of the client after an access to the stash monitor and the metrics sink
+        if self._stash_monitor is not None:
+            self._stash_monitor(len(self._stash))
+        if self._metrics is not None:
+            self._metrics.set_gauge(CLIENT_STASH_BLOCKS, len(self._stash))
+            self._metrics.observe(CLIENT_STASH_PER_ACCESS, len(self._stash))
+            self._metrics.set_gauge(CLIENT_POSITION_MAP_ENTRIES, len(self._pos_map))
+
+    def _count_evicted(self, level: int, entries: list):
+        # Counts the blocks evicted into a bucket at the given level
+        if entries:
+            self._metrics.increment(CLIENT_EVICTED_BLOCKS, len(entries), {"level": level})
+
+    def _restore_leaf(self, block_id: int, previous_leaf):
+        # Undoes a remap whose path read failed: the block is still stored on its previous path
+        if previous_leaf is not None:
+            self._pos_map.remap(block_id, previous_leaf)
 
     def _assign_new_leaf(self) -> int:
         # Randomly assigns a new leaf index
-        return random.randrange(2 ** self._depth)
-
-    def _flush_to_tree(self, server, indices: list[int], used_ids: set, valid_indices: set, output_blocks: list):
-        # Evicts blocks from stash back to ORAM path
-        for _ in indices:
-            group = []
-            for block in self._stash:
-                if len(group) >= server._bucket_capacity:
-                    break
-                if block._id not in used_ids and self._pos_map.get(block._id) in valid_indices:
-                    group.append(block)
-                    used_ids.add(block._id)
-            output_blocks.extend(group)
-
-    def _handle_access(self, block_id: int, action: str, payload: str | None, stash_snapshot: list[Block]):
-        # Handles read/write/delete operation on stash
-        outcome = None
-        new_stash = []
-        located = False
-
-        for block_from_stash in stash_snapshot:
-            if block_from_stash.is_dummy or block_from_stash._id != block_id:
-                new_stash.append(block_from_stash)
-                continue
+        return self._leaf_sampler.draw()
 
-            located = True
-            if action == OP_READ:
-                try:
-                    outcome = self._decrypt_block(
-                        block_from_stash._nonce,
-                        block_from_stash._ciphertext,
-                        block_from_stash._tag
-                    )
-                except Exception as err:
-                    raise ValueError(f"Failed to decrypt block {block_id}: {err}")
-                new_stash.append(block_from_stash)
-            elif action == OP_WRITE:
-                new_stash.append(Block(block_id, self._encrypt_block(payload), is_dummy=False))
-            elif action == OP_DELETE:
-                continue  # Skip adding this block
-
-        if action == OP_WRITE and not located:
-            new_stash.append(Block(block_id, self._encrypt_block(payload), is_dummy=False))
-
-        return outcome, new_stash, located
+    def _flush_to_tree(self, server, leaf: int) -> list[list[Block]]:
+        # Evicts stash blocks into the accessed path, deepest bucket first.
+        # A block may sit in any bucket at or above the level where its own
+        # leaf path leaves the accessed path, so walking from the leaf up and
+        # filling each bucket from the blocks that reach it pushes every block
+        # as deep as possible. Cached buckets are kept locally; only the
+        # buckets below them are returned.
+        capacity = self._bucket_slots(server)
+        path_buckets = [None] * (self._depth + 1)
+        for level in range(self._depth, -1, -1):
+            path_buckets[level] = self._stash.take_evictable(leaf, level, capacity)
+            if self._metrics is not None:
+                self._count_evicted(level, path_buckets[level])
+        start_level = self._tree_top.levels
+        for node_index, entries in zip(find_path_indices(leaf, self._depth)[:start_level], path_buckets):
+            self._tree_top.put(node_index, entries)
+        if self._trace is not None:
+            self._trace.mark("evict")
+        sealed_buckets = self._encrypt_buckets(capacity, path_buckets[start_level:])
+        if self._trace is not None:
+            self._trace.mark("encrypt")
+        return sealed_buckets
 
-    def _process_request(self, server, block_id: int, action: str, payload: str = None):
-        # Main handler for read/write/delete requests
-        if block_id not in self._pos_map:
-            self._pos_map[block_id] = self._assign_new_leaf()
-        leaf = self._pos_map[block_id]
+    def _evict_to_nodes(self, server, node_indices: list[int], pinned=()) -> dict:
+        # Evicts stash blocks into an arbitrary set of nodes forming a union of paths, returning
+        # the plaintext entries of every node below the cached levels.
+        # Nodes are filled deepest first, for the same reason as in _flush_to_tree.
+        # Blocks whose IDs are in `pinned` stay in the stash, and cached buckets are kept locally.
+        capacity = self._bucket_slots(server)
+        buckets = {}
+        for node_index in sorted(node_indices, key=node_level, reverse=True):
+            entries = self._stash.take_evictable(
+                leftmost_leaf(node_index, self._depth), node_level(node_index), capacity, pinned)
+            if self._metrics is not None:
+                self._count_evicted(node_level(node_index), entries)
+            if self._tree_top.covers(node_index):
+                self._tree_top.put(node_index, entries)
+            else:
+                buckets[node_index] = entries
+        return buckets
 
-        path_idxs = find_path_indices(leaf, self._depth)
-        fetched_blocks = server.read_path(leaf)
-        self._stash.extend(fetched_blocks)
+    def _seal_nodes(self, server, buckets: dict) -> dict:
+        # Encrypts a dict of node index -> entries into a dict of node index -> blocks
+        return dict(zip(buckets.keys(), self._encrypt_buckets(self._bucket_slots(server), list(buckets.values()))))
 
-        result, self._stash, _ = self._handle_access(block_id, action, payload, self._stash)
+    def _flush_to_nodes(self, server, node_indices: list[int], pinned=()) -> dict:
+        # Evicts stash blocks into a union of paths and seals the buckets to write back
+        return self._seal_nodes(server, self._evict_to_nodes(server, node_indices, pinned))
 
-        self._pos_map[block_id] = self._assign_new_leaf()  # Re-assign position
+    def _handle_access(self, block_id: int, action: str, payload, new_leaf: int):
+        # Handles read/write/delete/update operation on stash
+        outcome = self._stash.get(block_id) if action in (OP_READ, OP_UPDATE, OP_DELETE) else None
+        located = block_id in self._stash
 
-        targets = set(path_idxs)
-        used = set()
-        to_evict = []
+        if action == OP_READ and located:
+            self._stash.reassign(block_id, new_leaf)
+        elif action == OP_WRITE:
+            self._stash.add(block_id, payload, new_leaf)
+        elif action == OP_UPDATE:
+            self._stash.add(block_id, payload(outcome), new_leaf)
+        elif action == OP_DELETE and located:
+            self._stash.remove(block_id)
 
-        self._flush_to_tree(server, path_idxs, used, targets, to_evict)
+        return outcome, located
+
+    def _process_request(self, server, block_id: int, action: str, payload: str = None):
+        # Main handler for read/write/delete/update requests
+        self._trace = self._tracer.begin(action) if self._tracer is not None else None
+        new_leaf = self._assign_new_leaf()
+        previous_leaf = self._pos_map.remap(block_id, new_leaf)  # Re-assign position
+        leaf = previous_leaf if previous_leaf is not None else self._assign_new_leaf()  # Unknown: random path
+        if self._trace is not None:
+            self._trace.mark("remap")
 
-        self._stash = [block for block in self._stash if block._id not in used]
+        try:
+            path = self._read_path_into_stash(server, leaf)
+        except BaseException:
+            self._restore_leaf(block_id, previous_leaf)
+            raise
+        try:
+            result, _ = self._handle_access(block_id, action, payload, new_leaf)
+        except BaseException:
+            # The path is in the stash all the same: write it back, the block under its previous leaf
+            self._restore_leaf(block_id, previous_leaf)
+            self._write_back_path(server, leaf, path)
+            raise
+        if self._trace is not None:
+            self._trace.mark("handle_access")
+        self._write_back_path(server, leaf, path)
 
-        server.write_path(leaf, to_evict)
+        self._report_stash()
+        self._finish_trace()
         return result
 
+    def _finish_trace(self):
+        # Hands the trace of the access just completed, if it was sampled, to the tracer
+        if self._trace is not None:
+            self._tracer.finish(self._trace)
+            self._trace = None
+
+    def _read_path_into_stash(self, server, leaf: int) -> list[int]:
+        # Moves every block on the path to `leaf` into the stash, returning the path's node indices.
+        # Cached levels are read locally.
+        path = find_path_indices(leaf, self._depth)
+        self._stash_cached(path)
+        if self._write_back is None:
+            blocks = server.read_path(leaf, self._tree_top.levels)
+            if self._trace is not None:
+                self._trace.mark("read_path")
+            self._stash_fetched(blocks)
+        else:
+            self._stash_around_queue(server, [leaf], path)
+        return path
+
+    def _write_back_path(self, server, leaf: int, path: list[int]):
+        # Evicts the stash into the path to `leaf` and writes it back, or queues it when writes are deferred
+        if self._write_back is None:
+            server.write_path(leaf, self._flush_to_tree(server, leaf), self._tree_top.levels)
+        else:
+            buckets = self._evict_to_nodes(server, path)
+            if self._trace is not None:
+                self._trace.mark("evict")
+            self._write_back.submit(server, buckets)  # Sealed later by the write-back thread
+        if self._trace is not None:
+            self._trace.mark("write_path")
+
+    def _write_back_nodes(self, server, node_indices: list[int]):
+        # Evicts the stash into a union of paths and writes it back, or queues it when writes are deferred
+        if self._write_back is None:
+            server.write_paths(self._flush_to_nodes(server, node_indices))
+        else:
+            self._write_back.submit(server, self._evict_to_nodes(server, node_indices))
+
+    def dummy_access(self, server):
+        """
+        Reads a uniformly random path and writes it back, evicting from the stash without touching any block.
+
+        To the server it is indistinguishable from a real access.
+        """
+        self._trace = self._tracer.begin("dummy") if self._tracer is not None else None
+        leaf = self._assign_new_leaf()
+        self._write_back_path(server, leaf, self._read_path_into_stash(server, leaf))
+        self._finish_trace()
+
+    def batch_access(self, server, operations: list) -> list:
+        """
+        Performs several operations with a single fetch and a single write-back of the union of their paths.
+
+        Args:
+            server: The ORAM server holding the tree.
+            operations (list): (action, block_id) or (action, block_id, payload) tuples,
+                               where action is one of OP_READ, OP_WRITE, OP_DELETE.
+
+        Returns:
+            list: The result of every operation, in order (read or deleted data, or None).
+        """
+        leaves = []
+        new_leaves = {}
+        previous_leaves = {}
+        for operation in operations:
+            block_id = operation[1]
+            if block_id in new_leaves:
+                # A repeated block is already fetched; read a random path so every operation costs one path
+                leaves.append(self._assign_new_leaf())
+                continue
+            new_leaves[block_id] = self._assign_new_leaf()
+            leaf = previous_leaves[block_id] = self._pos_map.remap(block_id, new_leaves[block_id])
+            leaves.append(leaf if leaf is not None else self._assign_new_leaf())
+
+        nodes = find_paths_union(leaves, self._depth)
+        try:
+            self._stash_cached(nodes)
+            if self._write_back is None:
+                fetched = server.read_paths(leaves, self._tree_top.levels)
+                self._stash_fetched([block for bucket_blocks in fetched.values() for block in bucket_blocks])
+            else:
+                self._stash_around_queue(server, leaves, nodes)
+        except BaseException:
+            for block_id, previous_leaf in previous_leaves.items():
+                self._restore_leaf(block_id, previous_leaf)
+            raise
+
+        results = []
+        handled = set()
+        try:
+            for action, block_id, *payload in operations:
+                result, _ = self._handle_access(block_id, action, payload[0] if payload else None,
+                                                new_leaves[block_id])
+                handled.add(block_id)
+                results.append(result)
+        except BaseException:
+            # Blocks no operation reached keep their previous leaves; the union is written back all the same
+            for block_id, previous_leaf in previous_leaves.items():
+                if block_id not in handled:
+                    self._restore_leaf(block_id, previous_leaf)
+            self._write_back_nodes(server, nodes)
+            raise
+        self._write_back_nodes(server, nodes)
+
+        self._report_stash()
+        return results
+
+    def bulk_load(self, server, items, batch_size: int = DEFAULT_LOAD_BATCH):
+        """
+        Fills an empty ORAM with many blocks without a path access per block.
+
+        Every block is given a fresh random leaf, as store_data would, and is placed in the deepest
+        bucket with room on its path; blocks that find no room stay in the stash. The whole tree,
+        dummies included, is then sealed in batches and written in node order in a single pass.
+        Every content is validated, as store_data does, before anything is written.
+
+        Args:
+            server: The ORAM server, freshly built and empty.
+            items: (block_id, content) pairs with distinct block IDs.
+            batch_size (int): Number of buckets sealed and written per server call.
+        """
+        items = [(block_id, self._checked_content(content)) for block_id, content in items]
+        self.flush()
+        capacity = self._bucket_real_slots(server)
+        first_leaf_node = (1 << self._depth) - 1
+        buckets = {}
+        for block_id, content in items:
+            leaf = self._assign_new_leaf()
+            self._pos_map.remap(block_id, leaf)
+            node_index = first_leaf_node + leaf
+            # Climb towards the root until a bucket with room is found
+            while node_index >= 0 and len(buckets.setdefault(node_index, [])) >= capacity:
+                node_index = (node_index - 1) // 2 if node_index else -1
+            if node_index < 0:
+                self._stash.add(block_id, content, leaf)
+            else:
+                buckets[node_index].append((block_id, leaf, content))
+
+        total_buckets = 2 * first_leaf_node + 1
+        first_remote_node = min((1 << self._tree_top.levels) - 1, total_buckets)
+        for node_index in range(first_remote_node):
+            self._tree_top.put(node_index, buckets.get(node_index, []))
+        for start in range(first_remote_node, total_buckets, batch_size):
+            batch = {node_index: buckets.get(node_index, [])
+                     for node_index in range(start, min(start + batch_size, total_buckets))}
+            server.write_paths(self._seal_nodes(server, batch))
+
+        self._report_stash()
+
     def retrieve_data(self, server, block_id: int):
         # Retrieves and decrypts data from the server
         return self._process_request(server, block_id, OP_READ)
 
-    def store_data(self, server, block_id: int, content: str):
-        # Stores encrypted data on the server
-        self._process_request(server, block_id, OP_WRITE, content)
+    def _checked_content(self, content):
+        # Validates content before it enters the stash, as a write-back would only fail once the
+        # access has returned. Mutable buffers are copied, so that later changes to them do not reach the stash.
+        if self._block_size is not None:
+            if isinstance(content, (bytearray, memoryview)):
+                content = bytes(content)
+            length = len(content.encode()) if isinstance(content, str) else len(content)
+            if length > self._block_size:
+                raise ValueError(f"A payload of {length} bytes exceeds the block size of {self._block_size} bytes.")
+            return content
+        if not isinstance(content, str):
+            raise TypeError("Without a block size, block content must be a str.")
+        if self._bucket_format is not None and len(content.encode()) > self._bucket_format.slot_size:
+            raise ValueError(f"A payload of {len(content.encode())} bytes exceeds the slot size of "
+                             f"{self._bucket_format.slot_size} bytes.")
+        return content
+
+    def store_data(self, server, block_id: int, content):
+        # Stores encrypted data on the server; with a block size, content may also be bytes-like
+        self._process_request(server, block_id, OP_WRITE, self._checked_content(content))
+
+    def update_data(self, server, block_id: int, update):
+        # Replaces data with update(current data or None) in a single access, returning the previous data
+        return self._process_request(server, block_id, OP_UPDATE, update)
 
     def delete_data(self, server, block_id: int):
-        # Deletes data from ORAM
-        self._process_request(server, block_id, OP_DELETE)\
+        # Deletes data from ORAM, returning the deleted data (or None)
+        return self._process_request(server, block_id, OP_DELETE)
+
+    def set_tracer(self, tracer):
+        # Replaces the Tracer sampling later accesses; None stops tracing
+        self._tracer = tracer
+
+    def flush(self):
+        # Waits until every deferred write-back has reached the server
+        if self._write_back is not None:
+            self._write_back.flush()
 
+    def close(self):
+        # Flushes deferred write-backs and stops the background threads
+        if self._write_back is not None:
+            self._write_back.close()
+        self._crypto.close()
@@ -0,0 +1,193 @@
+import asyncio
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from Client import OP_READ, OP_WRITE, OP_DELETE
+from TreeUtils import find_path_indices
+
+# CONSTANTS
+DEFAULT_MAX_IN_FLIGHT = 4
+
+
+class _Fetch:
+    # One path read issued by the sequencer, with the requests it serves
+
+    def __init__(self, sequence: int, leaf: int, depth: int, block_id=None, new_leaf=None, previous_leaf=None):
+        self.sequence = sequence
+        self.leaf = leaf
+        self.nodes = find_path_indices(leaf, depth)
+        self.block_id = block_id  # None for the extra read issued for a duplicate request
+        self.new_leaf = new_leaf
+        self.previous_leaf = previous_leaf  # Leaf restored if the read fails (None for an unknown block)
+        self.requests = []  # (action, payload, future) tuples answered by this fetch
+        self.observed = None  # Write count of every node on the path when the read was issued
+
+
+class ConcurrentClient:
+    """
+    Thread-safe ORAM frontend keeping several path fetches in flight around a single Client.
+
+    The sequencer (`submit`) turns every request into exactly one path read. A request for a block
+    whose fetch is already in flight joins that fetch and reads a random path instead, so the
+    server still sees one uniformly random path per request. The processor answers requests as
+    soon as their path arrives and writes fetched paths back in the order they were issued.
+
+    Fetched paths may overlap and may be read while other paths are being written, so the frontend
+    tracks, per node, how many writes have been issued and whether the node's current content is
+    held in the stash. A read only takes content it is the first to see, a write only replaces
+    content already taken into the stash, and blocks with a fetch in flight are pinned in the stash.
+    Together these guarantee a block is never lost or duplicated.
+    """
+
+    def __init__(self, client, server, max_in_flight: int = DEFAULT_MAX_IN_FLIGHT):
+        """
+        Args:
+            client (Client): The client whose stash, position map and key are shared by all requests.
+            server: The ORAM server. A server offering `submit_read_paths` (such as RemoteServer) has
+                    its reads pipelined; other servers are called one operation at a time.
+            max_in_flight (int): Maximum number of path reads in progress at once.
+        """
+        if client._write_back is not None:
+            raise ValueError("ConcurrentClient orders its own write-backs; use a client without deferred writes.")
+        self._client = client
+        self._server = server
+        self._executor = ThreadPoolExecutor(max_workers=max_in_flight)
+        self._lock = threading.Lock()  # Guards the client state and the tables below
+        self._server_lock = threading.Lock()  # Orders server operations; always taken before _lock
+
+        self._in_flight = {}  # Block ID -> fetch serving it (its keys are the pinned blocks)
+        self._next_sequence = 0
+        self._completed = {}  # Sequence number -> fetch waiting for its turn to be written back
+        self._next_write_back = 0
+        self._write_counts = {}  # Node index -> writes issued since no read was outstanding
+        self._held = set()  # Nodes whose current content has been moved into the stash
+        self._reads_out = 0
+
+    def submit(self, action: str, block_id: int, payload=None) -> Future:
+        """
+        Queues a request.
+
+        Args:
+            action (str): One of OP_READ, OP_WRITE, OP_DELETE.
+            block_id (int): ID of the block.
+            payload: Content to store, for OP_WRITE.
+
+        Returns:
+            Future: Resolves to the read data (or None) once the request has been served.
+        """
+        future = Future()
+        client = self._client
+        with self._lock:
+            sequence = self._next_sequence
+            self._next_sequence += 1
+            fetch = self._in_flight.get(block_id)
+            if fetch is not None:
+                fetch.requests.append((action, payload, future))
+                fetch = _Fetch(sequence, client._assign_new_leaf(), client._depth)
+            else:
+                new_leaf = client._assign_new_leaf()
+                previous_leaf = client._pos_map.remap(block_id, new_leaf)
+                leaf = previous_leaf if previous_leaf is not None else client._assign_new_leaf()  # Unknown: random path
+                fetch = _Fetch(sequence, leaf, client._depth, block_id, new_leaf, previous_leaf)
+                fetch.requests.append((action, payload, future))
+                self._in_flight[block_id] = fetch
+        self._executor.submit(self._run_fetch, fetch)
+        return future
+
+    def _run_fetch(self, fetch: _Fetch):
+        try:
+            submit_read = getattr(self._server, "submit_read_paths", None)
+            with self._server_lock:
+                with self._lock:
+                    fetch.observed = {node_index: self._write_counts.get(node_index, 0) for node_index in fetch.nodes}
+                    self._reads_out += 1
+                start_level = self._client._tree_top.levels  # Cached levels are taken locally in _complete
+                if submit_read is not None:
+                    pending = submit_read([fetch.leaf], start_level)
+                else:
+                    fetched = self._server.read_paths([fetch.leaf], start_level)
+            if submit_read is not None:
+                fetched = pending.result()
+        except Exception as err:
+            self._complete(fetch, {}, err)
+            return
+        self._complete(fetch, fetched)
+
+    def _complete(self, fetch: _Fetch, fetched: dict, error: Exception = None):
+        answers = []
+        with self._lock:
+            if fetch.observed is not None:
+                self._reads_out -= 1
+            for node_index, bucket_blocks in fetched.items():
+                if node_index not in self._held and fetch.observed[node_index] == self._write_counts.get(node_index, 0):
+                    self._client._stash_fetched(bucket_blocks)
+                    self._held.add(node_index)
+            if error is None:
+                # Cached buckets are always current, so a fetch takes any it finds not already held
+                for node_index in fetch.nodes:
+                    if self._client._tree_top.covers(node_index) and node_index not in self._held:
+                        self._client._stash_cached([node_index])
+                        self._held.add(node_index)
+            if not self._reads_out:
+                self._write_counts.clear()  # No read can compare against the old counts any more
+
+            if fetch.block_id is not None:
+                for action, payload, future in fetch.requests:
+                    if error is None:
+                        result, _ = self._client._handle_access(fetch.block_id, action, payload, fetch.new_leaf)
+                        answers.append((future, result))
+                if error is not None:
+                    # The block is still on its previous path, or in the stash under its previous leaf
+                    self._client._restore_leaf(fetch.block_id, fetch.previous_leaf)
+                del self._in_flight[fetch.block_id]
+            self._completed[fetch.sequence] = fetch
+
+            self._client._report_stash()
+
+        for future, result in answers:
+            future.set_result(result)
+        if error is not None:
+            for _, _, future in fetch.requests:
+                future.set_exception(error)
+
+        self._write_back_ready()
+
+    def _write_back_ready(self):
+        # Writes back every completed fetch whose predecessors have all been written back
+        with self._server_lock:
+            with self._lock:
+                writes = []
+                while self._next_write_back in self._completed:
+                    fetch = self._completed.pop(self._next_write_back)
+                    self._next_write_back += 1
+                    nodes = [node_index for node_index in fetch.nodes if node_index in self._held]
+                    if not nodes:
+                        continue
+                    buckets = self._client._flush_to_nodes(self._server, nodes, self._in_flight.keys())
+                    if buckets:
+                        writes.append(buckets)
+                    for node_index in nodes:
+                        self._held.discard(node_index)
+                        self._write_counts[node_index] = self._write_counts.get(node_index, 0) + 1
+            for buckets in writes:
+                self._server.write_paths(buckets)
+
+    async def access(self, action: str, block_id: int, payload=None):
+        # Asyncio entry point: awaits the result of a request
+        return await asyncio.wrap_future(self.submit(action, block_id, payload))
+
+    def retrieve_data(self, block_id: int):
+        # Retrieves and decrypts data, blocking until it is available
+        return self.submit(OP_READ, block_id).result()
+
+    def store_data(self, block_id: int, content: str):
+        # Stores data, blocking until the request has been served
+        self.submit(OP_WRITE, block_id, content).result()
+
+    def delete_data(self, block_id: int):
+        # Deletes data, blocking until the request has been served, and returns the deleted data (or None)
+        return self.submit(OP_DELETE, block_id).result()
+
+    def close(self):
+        # Waits for every outstanding request and write-back
+        self._executor.shutdown(wait=True)
@@ -0,0 +1,107 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from Crypto.Cipher import AES
+
+# CONSTANTS
+DEFAULT_BATCH_SIZE = 64
+
+
+class CryptoPipeline:
+    """
+    Batched AES-GCM encryption and decryption under a single key.
+
+    Whole paths are sealed or opened in one call. With `workers` > 0 the batch is split into
+    chunks of `batch_size` items processed on a thread pool; pycryptodome releases the GIL while
+    it runs the cipher, so large batches make use of several cores.
+    """
+
+    def __init__(self, key: bytes, workers: int = 0, batch_size: int = DEFAULT_BATCH_SIZE):
+        self._key = key
+        self._batch_size = batch_size
+        self._executor = ThreadPoolExecutor(max_workers=workers) if workers > 0 else None
+
+    def _seal_chunk(self, plain_texts: list[bytes]) -> list[tuple[bytes, bytes, bytes]]:
+        sealed = []
+        for plain_text in plain_texts:
+            aes = AES.new(self._key, AES.MODE_GCM)
+            cipher_text, tag = aes.encrypt_and_digest(plain_text)
+            sealed.append((aes.nonce, cipher_text, tag))
+        return sealed
+
+    def _open_chunk(self, sealed: list[tuple[bytes, bytes, bytes]]) -> list[bytes]:
+        opened = []
+        for nonce, cipher_text, tag in sealed:
+            aes = AES.new(self._key, AES.MODE_GCM, nonce=nonce)
+            opened.append(aes.decrypt_and_verify(cipher_text, tag))
+        return opened
+
+    def _open_chunk_into(self, pairs: list[tuple]) -> list[memoryview]:
+        opened = []
+        for (nonce, cipher_text, tag), output in pairs:
+            aes = AES.new(self._key, AES.MODE_GCM, nonce=nonce)
+            aes.decrypt_and_verify(cipher_text, tag, output=output)
+            opened.append(output)
+        return opened
+
+    def _run(self, work, items: list) -> list:
+        if self._executor is None or len(items) <= self._batch_size:
+            return work(items)
+        chunks = [items[start:start + self._batch_size] for start in range(0, len(items), self._batch_size)]
+        results = []
+        for chunk_result in self._executor.map(work, chunks):
+            results.extend(chunk_result)
+        return results
+
+    def encrypt_many(self, plain_texts: list[bytes]) -> list[tuple[bytes, bytes, bytes]]:
+        """
+        Encrypts every plaintext under a fresh nonce.
+
+        Args:
+            plain_texts (list[bytes]): The plaintexts to encrypt.
+
+        Returns:
+            list[tuple]: (nonce, ciphertext, tag) for every plaintext, in order.
+        """
+        return self._run(self._seal_chunk, plain_texts)
+
+    def decrypt_many(self, sealed: list[tuple[bytes, bytes, bytes]]) -> list[bytes]:
+        """
+        Decrypts and verifies every (nonce, ciphertext, tag) triple.
+
+        Args:
+            sealed (list[tuple]): The triples to decrypt.
+
+        Returns:
+            list[bytes]: The plaintexts, in order.
+
+        Raises:
+            ValueError: If any ciphertext fails authentication.
+        """
+        return self._run(self._open_chunk, sealed)
+
+    def decrypt_many_into(self, sealed: list[tuple[bytes, bytes, bytes]], buffer: memoryview,
+                          stride: int) -> list[memoryview]:
+        """
+        Decrypts and verifies every (nonce, ciphertext, tag) triple into a preallocated buffer,
+        without allocating a plaintext object per triple.
+
+        Args:
+            sealed (list[tuple]): The triples to decrypt; no ciphertext may be longer than `stride`.
+            buffer (memoryview): Writable buffer of at least len(sealed) * stride bytes.
+            stride (int): Bytes reserved for each plaintext; the i-th one starts at i * stride.
+
+        Returns:
+            list[memoryview]: Views of the plaintexts inside `buffer`, in order. They are
+                              overwritten by the next call reusing the buffer.
+
+        Raises:
+            ValueError: If any ciphertext fails authentication.
+        """
+        pairs = [(triple, buffer[index * stride:index * stride + len(triple[1])])
+                 for index, triple in enumerate(sealed)]
+        return self._run(self._open_chunk_into, pairs)
+
+    def close(self):
+        # Shuts down the worker threads, if any
+        if self._executor is not None:
+            self._executor.shutdown()
@@ -0,0 +1,443 @@
+import os
+import struct
+import threading
+import time
+import zlib
+from array import array
+
+from Block import Block
+from Metrics import record_read, record_write
+from SlabServer import DEFAULT_MAX_PAYLOAD, pack_slot, slot_size, unpack_slot
+from TreeUtils import find_path_indices, find_paths_union, node_level
+
+# SEGMENT HEADER: magic | version | depth | bucket capacity | max payload | segment id
+SEGMENT_MAGIC = b"ORAMLOG1"
+SEGMENT_VERSION = 1
+SEGMENT_HEADER = struct.Struct("<8sHIIII")
+# RECORD: node index | CRC-32 of the bucket | bucket (bucket_capacity slots in the SlabServer layout)
+RECORD_HEADER = struct.Struct("<II")
+SEGMENT_NAME = "segment-{:08}.log"
+
+# CONSTANTS
+DEFAULT_SEGMENT_SIZE = 8 << 20  # A new segment is started once the active one reaches this size
+DEFAULT_COMMIT_EVERY = 32  # Write-backs made durable by one fsync
+DEFAULT_COMMIT_INTERVAL = 0.05  # Longest time, in seconds, a write-back waits for its fsync
+DEFAULT_COMPACTION_THRESHOLD = 0.5  # Sealed segments whose live fraction drops to this are compacted
+COMPACTION_CHUNK = 256  # Records copied per lock acquisition during compaction
+NO_SEGMENT = 0  # Segment ID of a bucket that was never written
+
+_sync = getattr(os, "fdatasync", os.fsync)
+
+
+class LogServer:
+    """
+    Durable ORAM Server that appends every write-back to a log instead of overwriting buckets in place.
+
+    The log is a directory of segment files. A write-back appends the new version of each of its
+    buckets as one fixed-width record, so writing a path is a single sequential write however
+    scattered its buckets are on disk; an in-memory index maps every node to the offset of its
+    latest version. Write-backs are made durable in groups: one fsync covers up to `commit_every`
+    write-backs, or all those made in the last `commit_interval` seconds. A background thread
+    commits write-backs left waiting once no more arrive, and compacts sealed segments whose
+    records are mostly stale, copying their live records to the end of the log and deleting them.
+    `LogServer.open` rebuilds the index by scanning the log.
+    """
+
+    def __init__(self, directory: str, depth: int, bucket_capacity: int, max_payload: int = DEFAULT_MAX_PAYLOAD,
+                 segment_size: int = DEFAULT_SEGMENT_SIZE, commit_every: int = DEFAULT_COMMIT_EVERY,
+                 commit_interval: float = DEFAULT_COMMIT_INTERVAL,
+                 compaction_threshold: float = DEFAULT_COMPACTION_THRESHOLD, metrics=None):
+        """
+        Creates an empty log in `directory`, which must not hold one already.
+
+        Args:
+            directory (str): Directory of the segment files, created if missing.
+            depth (int): Depth of the ORAM tree.
+            bucket_capacity (int): Number of slots per bucket.
+            max_payload (int): Maximum ciphertext length of a slot, in bytes.
+            segment_size (int): Size, in bytes, at which the active segment is sealed.
+            commit_every (int): Write-backs per group commit; 1 makes every write-back durable before returning.
+            commit_interval (float): Longest time, in seconds, between a write-back and its commit.
+            compaction_threshold (float): Live fraction at or below which a sealed segment is compacted.
+            metrics: Optional MetricsSink counting the buckets and bytes read and written.
+        """
+        os.makedirs(directory, exist_ok=True)
+        if any(name.startswith("segment-") for name in os.listdir(directory)):
+            raise ValueError(f"{directory} already holds a log; reopen it with LogServer.open.")
+        self._setup(directory, depth, bucket_capacity, max_payload, segment_size, commit_every, commit_interval,
+                    compaction_threshold, metrics)
+        self._start_segment(1)
+        self._start_compactor()
+
+    @classmethod
+    def open(cls, directory: str, **options):
+        """
+        Reopens a log, rebuilding the bucket index from its segments.
+
+        A record cut short or corrupted by a crash at the end of the newest segment is dropped,
+        along with everything after it.
+
+        Args:
+            directory (str): Directory of the segment files.
+            **options: segment_size, commit_every, commit_interval, compaction_threshold, metrics.
+
+        Returns:
+            LogServer: A server holding the latest committed version of every bucket.
+        """
+        segment_ids = sorted(int(name[8:16]) for name in os.listdir(directory)
+                             if name.startswith("segment-") and name.endswith(".log"))
+        if not segment_ids:
+            raise ValueError(f"{directory} holds no log segments.")
+        with open(os.path.join(directory, SEGMENT_NAME.format(segment_ids[0])), "rb") as handle:
+            _, _, depth, bucket_capacity, max_payload, _ = cls._check_header(handle.read(SEGMENT_HEADER.size),
+                                                                            directory)
+
+        server = cls.__new__(cls)
+        server._setup(directory, depth, bucket_capacity, max_payload, **options)
+        for segment_id in segment_ids:
+            server._recover_segment(segment_id, last=segment_id == segment_ids[-1])
+        server._start_segment(segment_ids[-1] + 1)
+        server._start_compactor()
+        server._compaction_wanted.set()  # Segments left stale before the restart
+        return server
+
+    def _setup(self, directory: str, depth: int, bucket_capacity: int, max_payload: int,
+               segment_size: int = DEFAULT_SEGMENT_SIZE, commit_every: int = DEFAULT_COMMIT_EVERY,
+               commit_interval: float = DEFAULT_COMMIT_INTERVAL,
+               compaction_threshold: float = DEFAULT_COMPACTION_THRESHOLD, metrics=None):
+        # Tree shape, log geometry and an empty index
+        self._directory = directory
+        self._depth = depth
+        self._bucket_capacity = bucket_capacity
+        self._max_payload = max_payload
+        self._slot_size = slot_size(max_payload)
+        self._bucket_size = self._slot_size * bucket_capacity
+        self._record_size = RECORD_HEADER.size + self._bucket_size
+        self._segment_size = segment_size
+        self._commit_every = commit_every
+        self._commit_interval = commit_interval
+        self._compaction_threshold = compaction_threshold
+        self._metrics = metrics
+
+        total_buckets = (1 << (depth + 1)) - 1
+        self._lock = threading.Lock()  # Guards the index, the segment tables and the active segment
+        self._compaction_lock = threading.Lock()  # Held by the compaction running, if any
+        self._segments = array("I", [NO_SEGMENT]) * total_buckets  # Node index -> segment of its latest version
+        self._offsets = array("Q", [0]) * total_buckets  # Node index -> offset of that version in its segment
+        self._files = {}  # Segment ID -> file descriptor
+        self._records = {}  # Segment ID -> records written to it
+        self._live = {}  # Segment ID -> records still holding the latest version of their bucket
+        self._active = None  # ID of the segment appended to
+        self._active_size = 0
+        self._uncommitted = 0  # Write-backs appended since the last fsync
+        self._last_commit = time.monotonic()
+        self._closed = False
+
+    @staticmethod
+    def _check_header(header: bytes, directory: str) -> tuple:
+        fields = SEGMENT_HEADER.unpack(header)
+        if fields[0] != SEGMENT_MAGIC or fields[1] != SEGMENT_VERSION:
+            raise ValueError(f"{directory} holds a segment that is not an ORAM log of version {SEGMENT_VERSION}.")
+        return fields
+
+    def _segment_path(self, segment_id: int) -> str:
+        return os.path.join(self._directory, SEGMENT_NAME.format(segment_id))
+
+    def _start_segment(self, segment_id: int):
+        # Seals the active segment, if any, and starts appending to a new one
+        if self._active is not None:
+            _sync(self._files[self._active])
+        descriptor = os.open(self._segment_path(segment_id), os.O_RDWR | os.O_CREAT | os.O_APPEND, 0o644)
+        os.write(descriptor, SEGMENT_HEADER.pack(SEGMENT_MAGIC, SEGMENT_VERSION, self._depth, self._bucket_capacity,
+                                                 self._max_payload, segment_id))
+        _sync(descriptor)
+        self._files[segment_id] = descriptor
+        self._records[segment_id] = 0
+        self._live[segment_id] = 0
+        self._active = segment_id
+        self._active_size = SEGMENT_HEADER.size
+
+    def _recover_segment(self, segment_id: int, last: bool):
+        # Replays the records of one segment into the index
+        path = self._segment_path(segment_id)
+        descriptor = os.open(path, os.O_RDWR)
+        self._files[segment_id] = descriptor
+        self._records[segment_id] = 0
+        self._live[segment_id] = 0
+        self._check_header(os.pread(descriptor, SEGMENT_HEADER.size, 0), self._directory)
+        offset = SEGMENT_HEADER.size
+        size = os.fstat(descriptor).st_size
+        while offset < size:
+            record = os.pread(descriptor, self._record_size, offset)
+            node_index, checksum = RECORD_HEADER.unpack_from(record) if len(record) >= RECORD_HEADER.size else (0, 0)
+            if (len(record) < self._record_size or node_index >= len(self._segments)
+                    or zlib.crc32(memoryview(record)[RECORD_HEADER.size:]) != checksum):
+                if not last:
+                    raise ValueError(f"{path} is corrupted at offset {offset}.")
+                os.ftruncate(descriptor, offset)  # Torn write at the tail: drop it
+                break
+            self._point(node_index, segment_id, offset)
+            offset += self._record_size
+
+    def _point(self, node_index: int, segment_id: int, offset: int):
+        # Makes a record the latest version of its bucket
+        previous = self._segments[node_index]
+        if previous != NO_SEGMENT:
+            self._live[previous] -= 1
+        self._segments[node_index] = segment_id
+        self._offsets[node_index] = offset
+        self._records[segment_id] += 1
+        self._live[segment_id] += 1
+
+    def _start_compactor(self):
+        self._compaction_wanted = threading.Event()
+        self._compactor = threading.Thread(target=self._background_loop, daemon=True)
+        self._compactor.start()
+
+    def _background_loop(self):
+        # Commits write-backs once they have waited commit_interval, and compacts when asked to
+        while True:
+            with self._lock:
+                if self._closed:
+                    return
+                self._commit_due()
+                timeout = None
+                if self._commit_interval > 0:
+                    timeout = self._commit_interval
+                    if self._uncommitted:
+                        timeout = self._last_commit + self._commit_interval - time.monotonic()
+            if self._compaction_wanted.wait(timeout):
+                self._compaction_wanted.clear()
+                self.compact()
+
+    def _encode_bucket(self, node_index: int, bucket_blocks: list) -> bytearray:
+        if len(bucket_blocks) > self._bucket_capacity:
+            raise Exception("Reached max capacity")
+        record = bytearray(self._record_size)
+        view = memoryview(record)
+        for slot, block in enumerate(bucket_blocks):
+            pack_slot(view, RECORD_HEADER.size + slot * self._slot_size, block, self._max_payload)
+        RECORD_HEADER.pack_into(view, 0, node_index, zlib.crc32(view[RECORD_HEADER.size:]))
+        return record
+
+    def _append(self, buckets):
+        # Appends one write-back, (node index, blocks) pairs, as a single sequential write
+        records = [(node_index, self._encode_bucket(node_index, bucket_blocks))
+                   for node_index, bucket_blocks in buckets]
+        with self._lock:
+            if self._closed:
+                raise ValueError("The log server is closed.")
+            if self._active_size >= self._segment_size:
+                self._start_segment(self._active + 1)
+                self._compaction_wanted.set()
+            os.write(self._files[self._active], b"".join(record for _, record in records))
+            for node_index, _ in records:
+                self._point(node_index, self._active, self._active_size)
+                self._active_size += self._record_size
+            self._uncommitted += 1
+            if (self._uncommitted >= self._commit_every
+                    or time.monotonic() - self._last_commit >= self._commit_interval):
+                self._commit()
+
+    def _commit(self):
+        # Group commit: one fsync makes every write-back appended since the last one durable
+        _sync(self._files[self._active])
+        self._uncommitted = 0
+        self._last_commit = time.monotonic()
+
+    def _commit_due(self):
+        # Commits the pending write-backs if the oldest has waited commit_interval
+        if self._uncommitted and time.monotonic() - self._last_commit >= self._commit_interval:
+            self._commit()
+
+    def _read_bucket(self, node_index: int, collected_blocks: list):
+        segment_id = self._segments[node_index]
+        if segment_id == NO_SEGMENT:
+            return
+        record = os.pread(self._files[segment_id], self._bucket_size,
+                          self._offsets[node_index] + RECORD_HEADER.size)
+        view = memoryview(record)
+        for slot in range(self._bucket_capacity):
+            block = unpack_slot(view, slot * self._slot_size, copy=False)  # The record is read privately
+            if block is not None:
+                collected_blocks.append(block)
+
+    def read_path(self, leaf_index: int, start_level: int = 0):
+        """
+        Read all blocks along the path from root to given leaf.
+
+        Args:
+            leaf_index (int): Index of the target leaf node.
+            start_level (int): First level to read; the levels above it are skipped.
+
+        Returns:
+            list: Blocks collected along the path.
+        """
+        path = find_path_indices(leaf_index, self._depth)[start_level:]
+        collected_blocks = []
+        with self._lock:
+            for node_index in path:
+                self._read_bucket(node_index, collected_blocks)
+        if self._metrics is not None:
+            record_read(self._metrics, len(path), collected_blocks)
+        return collected_blocks
+
+    def write_path(self, leaf_index: int, blocks: list, start_level: int = 0):
+        """
+        Write blocks along the path from root to given leaf, appending a new version of each bucket.
+
+        Args:
+            leaf_index (int): Index of the target leaf node.
+            blocks (list): One list of blocks per bucket on the path, ordered from start_level to leaf.
+                           Each list may hold at most bucket_capacity blocks.
+            start_level (int): Level of the first bucket written; the levels above it are left untouched.
+        """
+        path = find_path_indices(leaf_index, self._depth)[start_level:]
+        self._append(zip(path, blocks))
+        if self._metrics is not None:
+            record_write(self._metrics, blocks[:len(path)])
+
+    def read_paths(self, leaf_indices: list[int], start_level: int = 0) -> dict:
+        """
+        Read the buckets on the union of several paths, each shared bucket only once.
+
+        Args:
+            leaf_indices (list[int]): Indices of the target leaf nodes.
+            start_level (int): First level to read; the levels above it are skipped.
+
+        Returns:
+            dict: Maps each node index on the union to the blocks stored in its bucket.
+        """
+        nodes = find_paths_union(leaf_indices, self._depth)
+        if start_level:
+            nodes = [node_index for node_index in nodes if node_level(node_index) >= start_level]
+        return self.read_buckets(nodes)
+
+    def read_buckets(self, node_indices: list[int]) -> dict:
+        """
+        Read whole buckets by node index.
+
+        Args:
+            node_indices (list[int]): Indices of the buckets to read.
+
+        Returns:
+            dict: Maps each node index to the blocks stored in its bucket.
+        """
+        buckets = {}
+        with self._lock:
+            for node_index in node_indices:
+                buckets[node_index] = []
+                self._read_bucket(node_index, buckets[node_index])
+        if self._metrics is not None:
+            record_read(self._metrics, len(buckets), [block for blocks in buckets.values() for block in blocks])
+        return buckets
+
+    def read_slots(self, slots: list[tuple[int, int]]) -> list:
+        """
+        Read single blocks out of buckets.
+
+        Args:
+            slots (list[tuple[int, int]]): (node index, slot index) pairs.
+
+        Returns:
+            list: The block stored in every requested slot, in order (an empty Block if unwritten).
+        """
+        blocks = []
+        with self._lock:
+            for node_index, slot in slots:
+                segment_id = self._segments[node_index]
+                block = None
+                if segment_id != NO_SEGMENT:
+                    offset = self._offsets[node_index] + RECORD_HEADER.size + slot * self._slot_size
+                    block = unpack_slot(os.pread(self._files[segment_id], self._slot_size, offset), 0, copy=False)
+                blocks.append(block if block is not None else Block())
+        if self._metrics is not None:
+            record_read(self._metrics, 0, blocks)  # Single slots: bytes only
+        return blocks
+
+    def write_paths(self, buckets: dict):
+        """
+        Replace the content of several buckets at once, appending them as one write-back.
+
+        Args:
+            buckets (dict): Maps node indices to the blocks (at most bucket_capacity) to store there.
+        """
+        self._append(buckets.items())
+        if self._metrics is not None:
+            record_write(self._metrics, buckets.values())
+
+    def compact(self) -> int:
+        """
+        Rewrites every sealed segment whose live fraction is at or below the compaction threshold.
+
+        Live records are appended to the active segment, which is committed before the old
+        segments are deleted. Runs in the background after every segment switch, and may be
+        called directly; concurrent calls run one after the other.
+
+        Returns:
+            int: Number of segments deleted.
+        """
+        with self._compaction_lock:
+            with self._lock:
+                if self._closed:
+                    return 0
+                candidates = [segment_id for segment_id in self._files if segment_id != self._active
+                              and self._live[segment_id] <= self._compaction_threshold * self._records[segment_id]]
+            for segment_id in candidates:
+                self._compact_segment(segment_id)
+            with self._lock:
+                if self._closed:
+                    return 0  # Copying may have stopped early: keep the old segments
+                if candidates:
+                    self._commit()
+                for segment_id in candidates:
+                    os.close(self._files.pop(segment_id))
+                    del self._records[segment_id], self._live[segment_id]
+                    os.remove(self._segment_path(segment_id))
+            return len(candidates)
+
+    def _compact_segment(self, segment_id: int):
+        # Copies the live records of a sealed segment to the active one, a chunk at a time.
+        # Sealed segments are immutable and only deleted under the compaction lock, which the
+        # caller holds, so they are read without holding the lock.
+        descriptor = self._files[segment_id]
+        offset = SEGMENT_HEADER.size
+        chunk_size = COMPACTION_CHUNK * self._record_size
+        while True:
+            chunk = os.pread(descriptor, chunk_size, offset)
+            if not chunk:
+                return
+            view = memoryview(chunk)
+            with self._lock:
+                if self._closed:
+                    return
+                self._commit_due()
+                copied = []
+                for start in range(0, len(chunk), self._record_size):
+                    node_index = RECORD_HEADER.unpack_from(view, start)[0]
+                    if self._segments[node_index] == segment_id and self._offsets[node_index] == offset + start:
+                        copied.append((node_index, view[start:start + self._record_size]))
+                if copied:
+                    os.write(self._files[self._active], b"".join(record for _, record in copied))
+                    for node_index, _ in copied:
+                        self._point(node_index, self._active, self._active_size)
+                        self._active_size += self._record_size
+            offset += len(chunk)
+
+    def flush(self):
+        # Commits every write-back appended so far
+        with self._lock:
+            self._commit()
+
+    def close(self):
+        # Commits, stops the compactor and closes the segment files
+        with self._lock:
+            if self._closed:
+                return
+            self._commit()
+            self._closed = True
+        self._compaction_wanted.set()
+        self._compactor.join()
+        with self._compaction_lock:  # Waits out a compaction called directly
+            for descriptor in self._files.values():
+                os.close(descriptor)
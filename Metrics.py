@@ -0,0 +1,248 @@
+import bisect
+import json
+import threading
+import time
+
+# METRIC NAMES
+SERVER_BUCKETS_READ = "oram_server_buckets_read_total"
+SERVER_BYTES_READ = "oram_server_bytes_read_total"
+SERVER_BUCKETS_WRITTEN = "oram_server_buckets_written_total"
+SERVER_BYTES_WRITTEN = "oram_server_bytes_written_total"
+CLIENT_STASH_BLOCKS = "oram_client_stash_blocks"  # Gauge: stash size after the latest access
+CLIENT_STASH_PER_ACCESS = "oram_client_stash_blocks_per_access"  # Histogram of the same
+CLIENT_POSITION_MAP_ENTRIES = "oram_client_position_map_entries"
+CLIENT_EVICTED_BLOCKS = "oram_client_evicted_blocks_total"  # Labelled by tree level
+CLIENT_ENCRYPT_SECONDS = "oram_client_encrypt_seconds"
+CLIENT_DECRYPT_SECONDS = "oram_client_decrypt_seconds"
+
+# HISTOGRAM BUCKETS: upper bounds, the implicit last bucket being +Inf
+DEFAULT_BOUNDS = (1e-5, 5e-5, 1e-4, 5e-4, 1e-3, 5e-3, 1e-2, 5e-2, 0.1, 0.5, 1.0)
+HISTOGRAM_BOUNDS = {
+    CLIENT_STASH_PER_ACCESS: (0, 1, 2, 4, 8, 16, 32, 64, 128, 256, 512),
+}
+
+# Metrics are reported to a sink only when one is given: servers and clients hold None by
+# default and guard every report with a single `is not None` test, so disabled metrics cost nothing.
+
+
+def _label_key(labels: dict) -> tuple:
+    # Hashable, order-independent form of a label set
+    return tuple(sorted((name, str(value)) for name, value in labels.items())) if labels else ()
+
+
+def _block_bytes(blocks) -> int:
+    # Stored size of blocks: nonce, ciphertext and tag of every non-empty one
+    return sum(len(part) for block in blocks if block._data is not None for part in block._data)
+
+
+def record_read(metrics, bucket_count: int, blocks):
+    # Counts buckets and bytes a server read
+    metrics.increment(SERVER_BUCKETS_READ, bucket_count)
+    metrics.increment(SERVER_BYTES_READ, _block_bytes(blocks))
+
+
+def record_write(metrics, buckets):
+    # Counts buckets and bytes a server wrote; `buckets` holds one list of blocks per bucket
+    byte_count = 0
+    bucket_count = 0
+    for bucket_blocks in buckets:
+        byte_count += _block_bytes(bucket_blocks)
+        bucket_count += 1
+    metrics.increment(SERVER_BUCKETS_WRITTEN, bucket_count)
+    metrics.increment(SERVER_BYTES_WRITTEN, byte_count)
+
+
+class MetricsSink:
+    """
+    Destination of the counters, gauges and histograms reported by servers and clients.
+
+    Every method takes an optional `labels` dict; each distinct label set is a separate series.
+    Sinks may be called from several threads at once, as deferred write-backs run in the background.
+    """
+
+    def increment(self, name: str, value: float = 1, labels: dict = None):
+        # Adds value to a counter
+        raise NotImplementedError
+
+    def set_gauge(self, name: str, value: float, labels: dict = None):
+        # Replaces the value of a gauge
+        raise NotImplementedError
+
+    def observe(self, name: str, value: float, labels: dict = None):
+        # Records one observation in a histogram
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class Histogram:
+    """
+    Per-bucket (non-cumulative) counts of the observations of one series, with their count and sum.
+    """
+
+    def __init__(self, bounds: tuple):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # The last bucket holds observations above every bound
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+
+
+class InMemoryMetrics(MetricsSink):
+    """
+    Keeps every series in memory, for reading back with `snapshot` at the end of a run.
+    """
+
+    def __init__(self, bounds: dict = None):
+        """
+        Args:
+            bounds (dict): Histogram name -> bucket upper bounds, overriding HISTOGRAM_BOUNDS.
+                           Histograms without an entry use DEFAULT_BOUNDS.
+        """
+        self._bounds = {**HISTOGRAM_BOUNDS, **(bounds or {})}
+        self._lock = threading.Lock()  # Guards the three tables below
+        self._counters = {}  # (name, label key) -> value
+        self._gauges = {}  # (name, label key) -> value
+        self._histograms = {}  # (name, label key) -> Histogram
+
+    def increment(self, name: str, value: float = 1, labels: dict = None):
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def set_gauge(self, name: str, value: float, labels: dict = None):
+        with self._lock:
+            self._gauges[(name, _label_key(labels))] = value
+
+    def observe(self, name: str, value: float, labels: dict = None):
+        key = (name, _label_key(labels))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(self._bounds.get(name, DEFAULT_BOUNDS))
+            histogram.observe(value)
+
+    def counter(self, name: str, labels: dict = None) -> float:
+        # Current value of a counter, 0 if never incremented
+        with self._lock:
+            return self._counters.get((name, _label_key(labels)), 0)
+
+    def snapshot(self) -> dict:
+        """
+        Copies every series into plain dicts.
+
+        Returns:
+            dict: "counters" and "gauges" map each name to {label key: value}, and "histograms"
+                  maps each name to {label key: {"bounds", "counts", "count", "sum"}}, where a
+                  label key is a tuple of (label, value) pairs, empty for unlabelled series.
+        """
+        snapshot = {"counters": {}, "gauges": {}, "histograms": {}}
+        with self._lock:
+            for kind, table in (("counters", self._counters), ("gauges", self._gauges)):
+                for (name, label_key), value in table.items():
+                    snapshot[kind].setdefault(name, {})[label_key] = value
+            for (name, label_key), histogram in self._histograms.items():
+                snapshot["histograms"].setdefault(name, {})[label_key] = {
+                    "bounds": list(histogram.bounds), "counts": list(histogram.counts),
+                    "count": histogram.count, "sum": histogram.sum}
+        return snapshot
+
+    def reset(self):
+        # Drops every series
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+            self._histograms.clear()
+
+
+def _format_labels(label_key: tuple, extra: tuple = ()) -> str:
+    pairs = label_key + extra
+    if not pairs:
+        return ""
+    escaped = (value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n") for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+def _format_value(value: float) -> str:
+    return "+Inf" if value == float("inf") else repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class PrometheusMetrics(InMemoryMetrics):
+    """
+    In-memory sink rendering its series in the Prometheus text exposition format, for a scrape
+    endpoint or the node exporter's textfile collector.
+    """
+
+    def render(self) -> str:
+        # The current value of every series, one metric family after another
+        snapshot = self.snapshot()
+        lines = []
+        for kind, prometheus_type in (("counters", "counter"), ("gauges", "gauge")):
+            for name in sorted(snapshot[kind]):
+                lines.append(f"# TYPE {name} {prometheus_type}")
+                for label_key, value in sorted(snapshot[kind][name].items()):
+                    lines.append(f"{name}{_format_labels(label_key)} {_format_value(value)}")
+        for name in sorted(snapshot["histograms"]):
+            lines.append(f"# TYPE {name} histogram")
+            for label_key, histogram in sorted(snapshot["histograms"][name].items()):
+                cumulative = 0
+                for bound, count in zip(histogram["bounds"] + [float("inf")], histogram["counts"]):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{_format_labels(label_key, (('le', _format_value(bound)),))} "
+                                 f"{cumulative}")
+                lines.append(f"{name}_sum{_format_labels(label_key)} {_format_value(histogram['sum'])}")
+                lines.append(f"{name}_count{_format_labels(label_key)} {histogram['count']}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: str):
+        # Writes the rendered series to a file, replacing it
+        with open(path, "w") as output:
+            output.write(self.render())
+
+
+class JsonLinesMetrics(MetricsSink):
+    """
+    Appends every report as one JSON object per line, keeping the full timeline of a run
+    (for example the stash size after every access) rather than aggregates.
+
+    Each line holds "time" (seconds since the epoch), "kind" ("counter", "gauge" or "histogram"),
+    "name", "value" and, for labelled series, "labels".
+    """
+
+    def __init__(self, output):
+        """
+        Args:
+            output: Path of the file to write, or an open text stream (left open by close).
+        """
+        self._owned = isinstance(output, str)
+        self._output = open(output, "w") if self._owned else output
+        self._lock = threading.Lock()  # Keeps the lines of concurrent reports whole
+
+    def _emit(self, kind: str, name: str, value: float, labels: dict):
+        record = {"time": time.time(), "kind": kind, "name": name, "value": value}
+        if labels:
+            record["labels"] = {label: str(label_value) for label, label_value in labels.items()}
+        line = json.dumps(record) + "\n"
+        with self._lock:
+            self._output.write(line)
+
+    def increment(self, name: str, value: float = 1, labels: dict = None):
+        self._emit("counter", name, value, labels)
+
+    def set_gauge(self, name: str, value: float, labels: dict = None):
+        self._emit("gauge", name, value, labels)
+
+    def observe(self, name: str, value: float, labels: dict = None):
+        self._emit("histogram", name, value, labels)
+
+    def close(self):
+        with self._lock:
+            if self._owned:
+                self._output.close()
+            else:
+                self._output.flush()
@@ -0,0 +1,128 @@
+import mmap
+import struct
+
+from SlabServer import SlabServer, DEFAULT_MAX_PAYLOAD
+
+# FILE HEADER: magic | version | depth | bucket capacity | max payload | subtree levels
+FILE_MAGIC = b"ORAMTREE"
+FILE_VERSION = 1
+FILE_HEADER = struct.Struct("<8sHIIII")
+PAGE_SIZE = mmap.PAGESIZE
+
+
+def _round_stride(size: int) -> int:
+    # Rounds a subtree size so that subtrees never straddle a page boundary
+    if size >= PAGE_SIZE:
+        return -(-size // PAGE_SIZE) * PAGE_SIZE
+    return 1 << (size - 1).bit_length()
+
+
+class MmapServer(SlabServer):
+    """
+    ORAM Server whose slab lives in a fixed-layout file accessed through mmap.
+
+    The tree is cut into bands of `subtree_levels` levels. Each band is stored as a run of
+    small subtrees, every subtree packed contiguously and aligned so that it never straddles
+    a page, which makes a path touch about one page per band instead of one page per level.
+    The layout is fully determined by the header, so reopening a file with `MmapServer.open`
+    maps it as is, without rebuilding the tree.
+    """
+
+    def __init__(self, path: str, depth: int, bucket_capacity: int, max_payload: int = DEFAULT_MAX_PAYLOAD,
+                 subtree_levels: int = None, metrics=None):
+        """
+        Creates (or truncates) the file at `path` and lays out an empty tree in it.
+
+        Args:
+            path (str): Path of the backing file.
+            depth (int): Depth of the ORAM tree.
+            bucket_capacity (int): Number of slots per bucket.
+            max_payload (int): Maximum ciphertext length of a slot, in bytes.
+            subtree_levels (int): Levels packed per subtree (default: as many as fit in a page).
+            metrics: Optional MetricsSink counting the buckets and bytes read and written.
+        """
+        self._path = path
+        self._subtree_levels = subtree_levels
+        super().__init__(depth, bucket_capacity, max_payload, metrics)
+
+    @classmethod
+    def open(cls, path: str, metrics=None):
+        """
+        Reopens a tree file previously created by MmapServer.
+
+        Args:
+            path (str): Path of the backing file.
+            metrics: Optional MetricsSink counting the buckets and bytes read and written.
+
+        Returns:
+            MmapServer: A server backed by the existing file.
+        """
+        with open(path, "rb") as handle:
+            header = handle.read(FILE_HEADER.size)
+        magic, version, depth, bucket_capacity, max_payload, subtree_levels = FILE_HEADER.unpack(header)
+        if magic != FILE_MAGIC or version != FILE_VERSION:
+            raise ValueError(f"{path} is not an ORAM tree file of version {FILE_VERSION}.")
+
+        server = cls.__new__(cls)
+        server._path = path
+        server._metrics = metrics
+        server._dirty = None
+        server._snapshot_id = None
+        server._subtree_levels = subtree_levels
+        server._configure(depth, bucket_capacity, max_payload)
+        server._compute_layout()
+        server._file = open(path, "r+b")
+        server._slab = mmap.mmap(server._file.fileno(), server._file_size)
+        return server
+
+    def _allocate(self, size: int):
+        # The slab size is replaced by the size of the subtree-packed layout
+        if self._subtree_levels is None:
+            self._subtree_levels = self._default_subtree_levels()
+        self._compute_layout()
+
+        self._file = open(self._path, "w+b")
+        self._file.truncate(self._file_size)  # Sparse and zero-filled: every slot starts out empty
+        self._file.write(FILE_HEADER.pack(FILE_MAGIC, FILE_VERSION, self._depth, self._bucket_capacity,
+                                          self._max_payload, self._subtree_levels))
+        self._file.flush()
+        return mmap.mmap(self._file.fileno(), self._file_size)
+
+    def _default_subtree_levels(self) -> int:
+        # Deepest subtree whose buckets still fit in a single page
+        levels = 1
+        while levels <= self._depth and ((1 << (levels + 1)) - 1) * self._bucket_size <= PAGE_SIZE:
+            levels += 1
+        return levels
+
+    def _compute_layout(self):
+        # Byte offset and subtree stride of every band of levels
+        self._band_offsets = []
+        self._band_strides = []
+        offset = PAGE_SIZE  # The first page holds the header
+        for top_level in range(0, self._depth + 1, self._subtree_levels):
+            levels = min(self._subtree_levels, self._depth + 1 - top_level)
+            stride = _round_stride(((1 << levels) - 1) * self._bucket_size)
+            self._band_offsets.append(offset)
+            self._band_strides.append(stride)
+            offset += (1 << top_level) * stride
+        self._file_size = offset
+
+    def _bucket_offset(self, node_index: int) -> int:
+        level = (node_index + 1).bit_length() - 1
+        position = node_index + 1 - (1 << level)  # Position of the node within its level
+        band, relative_level = divmod(level, self._subtree_levels)
+        subtree = position >> relative_level
+        local_index = (1 << relative_level) - 1 + (position & ((1 << relative_level) - 1))
+        return (self._band_offsets[band] + subtree * self._band_strides[band]
+                + local_index * self._bucket_size)
+
+    def flush(self):
+        # Forces pending writes to the backing file
+        self._slab.flush()
+
+    def close(self):
+        # Flushes and releases the mapping and the file handle
+        self._slab.flush()
+        self._slab.close()
+        self._file.close()
@@ -0,0 +1,418 @@
+import argparse
+import asyncio
+import itertools
+import struct
+import threading
+
+from Block import Block
+from Server import Server
+
+# FRAME LAYOUT: payload length | request id | opcode, followed by the payload
+FRAME_HEADER = struct.Struct("<IIB")
+BLOCK_HEADER = struct.Struct("<BqBIB")  # kind | block id | nonce length | ciphertext length | tag length
+COUNT = struct.Struct("<I")
+INFO = struct.Struct("<II")  # depth | bucket capacity
+PATH_HEADER = struct.Struct("<II")  # leaf | start level, ahead of the buckets of a written path
+
+# OPCODES
+OP_INFO = 0
+OP_READ_PATH = 1
+OP_WRITE_PATH = 2
+OP_READ_PATHS = 3
+OP_WRITE_PATHS = 4
+
+# RESPONSE STATUS (sent in the opcode field of a response)
+STATUS_OK = 0
+STATUS_ERROR = 1
+
+# BLOCK KINDS
+KIND_EMPTY = 0
+KIND_REAL = 1
+KIND_DUMMY = 2
+
+DEFAULT_POOL_SIZE = 2
+
+
+def encode_blocks(blocks: list, out: bytearray):
+    # Appends a counted list of blocks to `out`
+    out += COUNT.pack(len(blocks))
+    for block in blocks:
+        if block.data is None:
+            out += BLOCK_HEADER.pack(KIND_EMPTY, 0, 0, 0, 0)
+            continue
+        nonce, cipher_text, tag = block.data
+        kind = KIND_DUMMY if block.is_dummy else KIND_REAL
+        out += BLOCK_HEADER.pack(kind, block.id if kind == KIND_REAL else 0, len(nonce), len(cipher_text), len(tag))
+        out += nonce
+        out += cipher_text
+        out += tag
+
+
+def decode_blocks(view: memoryview, offset: int) -> tuple[list, int]:
+    # Parses a counted list of blocks, returning it with the offset right after it
+    (count,) = COUNT.unpack_from(view, offset)
+    offset += COUNT.size
+    blocks = []
+    for _ in range(count):
+        kind, block_id, nonce_length, cipher_length, tag_length = BLOCK_HEADER.unpack_from(view, offset)
+        offset += BLOCK_HEADER.size
+        if kind == KIND_EMPTY:
+            blocks.append(Block())
+            continue
+        nonce = bytes(view[offset:offset + nonce_length])
+        offset += nonce_length
+        cipher_text = bytes(view[offset:offset + cipher_length])
+        offset += cipher_length
+        tag = bytes(view[offset:offset + tag_length])
+        offset += tag_length
+        if kind == KIND_DUMMY:
+            blocks.append(Block(None, (nonce, cipher_text, tag), is_dummy=True))
+        else:
+            blocks.append(Block(block_id, (nonce, cipher_text, tag), is_dummy=False))
+    return blocks, offset
+
+
+def encode_buckets(buckets: dict, out: bytearray):
+    # Appends a counted node index -> blocks mapping to `out`
+    out += COUNT.pack(len(buckets))
+    for node_index, bucket_blocks in buckets.items():
+        out += COUNT.pack(node_index)
+        encode_blocks(bucket_blocks, out)
+
+
+def decode_buckets(view: memoryview, offset: int) -> tuple[dict, int]:
+    # Parses a counted node index -> blocks mapping
+    (count,) = COUNT.unpack_from(view, offset)
+    offset += COUNT.size
+    buckets = {}
+    for _ in range(count):
+        (node_index,) = COUNT.unpack_from(view, offset)
+        buckets[node_index], offset = decode_blocks(view, offset + COUNT.size)
+    return buckets, offset
+
+
+def _encode_leaves(leaf_indices: list[int], out: bytearray):
+    out += COUNT.pack(len(leaf_indices))
+    out += struct.pack(f"<{len(leaf_indices)}I", *leaf_indices)
+
+
+def _decode_leaves(view: memoryview, offset: int) -> list[int]:
+    (count,) = COUNT.unpack_from(view, offset)
+    return list(struct.unpack_from(f"<{count}I", view, offset + COUNT.size))
+
+
+class NetworkServer:
+    """
+    Exposes an in-process ORAM server over TCP or Unix sockets.
+
+    Requests on one connection are executed in the order they arrive, which is what lets a
+    client pipeline the write-back of one access with the read of the next.
+    """
+
+    def __init__(self, server):
+        self._server = server
+        self._listener = None
+
+    async def start_tcp(self, host: str = "127.0.0.1", port: int = 0):
+        # Starts listening on TCP, returning the bound (host, port)
+        self._listener = await asyncio.start_server(self._handle_connection, host, port)
+        return self._listener.sockets[0].getsockname()[:2]
+
+    async def start_unix(self, path: str):
+        # Starts listening on a Unix socket
+        self._listener = await asyncio.start_unix_server(self._handle_connection, path)
+        return path
+
+    async def serve_forever(self):
+        async with self._listener:
+            await self._listener.serve_forever()
+
+    async def close(self):
+        self._listener.close()
+        await self._listener.wait_closed()
+
+    def _dispatch(self, opcode: int, view: memoryview) -> bytearray:
+        out = bytearray()
+        if opcode == OP_INFO:
+            out += INFO.pack(self._server._depth, self._server._bucket_capacity)
+        elif opcode == OP_READ_PATH:
+            (start_level,) = COUNT.unpack_from(view, 0)
+            encode_blocks(self._server.read_path(_decode_leaves(view, COUNT.size)[0], start_level), out)
+        elif opcode == OP_WRITE_PATH:
+            leaf_index, start_level = PATH_HEADER.unpack_from(view, 0)
+            offset = PATH_HEADER.size
+            (count,) = COUNT.unpack_from(view, offset)
+            offset += COUNT.size
+            blocks = []
+            for _ in range(count):
+                bucket_blocks, offset = decode_blocks(view, offset)
+                blocks.append(bucket_blocks)
+            self._server.write_path(leaf_index, blocks, start_level)
+        elif opcode == OP_READ_PATHS:
+            (start_level,) = COUNT.unpack_from(view, 0)
+            encode_buckets(self._server.read_paths(_decode_leaves(view, COUNT.size), start_level), out)
+        elif opcode == OP_WRITE_PATHS:
+            self._server.write_paths(decode_buckets(view, 0)[0])
+        else:
+            raise ValueError(f"Unknown opcode {opcode}.")
+        return out
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                length, request_id, opcode = FRAME_HEADER.unpack(await reader.readexactly(FRAME_HEADER.size))
+                payload = await reader.readexactly(length)
+                try:
+                    response = self._dispatch(opcode, memoryview(payload))
+                    status = STATUS_OK
+                except Exception as err:
+                    response = str(err).encode()
+                    status = STATUS_ERROR
+                writer.write(FRAME_HEADER.pack(len(response), request_id, status))
+                writer.write(response)
+                await writer.drain()
+        except asyncio.IncompleteReadError:
+            pass  # The client closed the connection
+        finally:
+            writer.close()
+
+
+class _Connection:
+    # One socket with a reader task matching responses to pending requests by ID
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self._reader = reader
+        self._writer = writer
+        self._pending = {}
+        self._request_ids = itertools.count()
+        self._lost = None  # Why the connection stopped serving responses, once it has
+        self._reader_task = asyncio.get_running_loop().create_task(self._read_responses())
+
+    async def _read_responses(self):
+        try:
+            while True:
+                length, request_id, status = FRAME_HEADER.unpack(await self._reader.readexactly(FRAME_HEADER.size))
+                payload = await self._reader.readexactly(length)
+                future = self._pending.pop(request_id, None)
+                if future is None or future.done():
+                    continue  # Nobody waits for this response any more
+                if status == STATUS_OK:
+                    future.set_result(memoryview(payload))
+                else:
+                    future.set_exception(RuntimeError(f"Server error: {payload.decode()}"))
+        except (asyncio.IncompleteReadError, ConnectionError) as err:
+            self._lost = f"Connection to the ORAM server lost: {err}"
+        finally:
+            # Whatever stopped the reader, no pending or later request can be answered
+            if self._lost is None:
+                self._lost = "Connection to the ORAM server closed."
+            for future in self._pending.values():
+                if not future.done():
+                    future.set_exception(ConnectionError(self._lost))
+            self._pending.clear()
+
+    def send(self, opcode: int, payload: bytes) -> asyncio.Future:
+        # Queues a request and returns the future of its response payload
+        if self._lost is not None:
+            raise ConnectionError(self._lost)
+        request_id = next(self._request_ids) & 0xFFFFFFFF
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+        self._writer.write(FRAME_HEADER.pack(len(payload), request_id, opcode))
+        self._writer.write(payload)
+        return future
+
+    async def close(self):
+        self._writer.close()
+        await self._writer.wait_closed()
+        self._reader_task.cancel()
+
+
+class AsyncServerTransport:
+    """
+    Asyncio client of a NetworkServer, with a pool of connections and pipelined writes.
+
+    A write only waits for the request to be queued on a connection. Any later read is sent on
+    the connection holding the most recent unacknowledged write and waits for the writes queued
+    on the other connections, so the server always applies a write-back before serving a read
+    issued after it, while the write and the read are still in flight together.
+    """
+
+    def __init__(self, connections: list):
+        self._connections = connections
+        self._next_connection = itertools.cycle(range(len(connections)))
+        self._unacked_writes = {}  # Connection index -> future of its latest write
+        self._send_lock = asyncio.Lock()  # Requests reach the connections in the order they were issued
+        self._depth, self._bucket_capacity = None, None
+
+    @classmethod
+    async def connect(cls, host: str = None, port: int = None, path: str = None, pool_size: int = DEFAULT_POOL_SIZE):
+        """
+        Opens `pool_size` connections to a NetworkServer, over TCP (host, port) or a Unix socket (path).
+
+        Returns:
+            AsyncServerTransport: A connected transport.
+        """
+        connections = []
+        for _ in range(pool_size):
+            if path is not None:
+                reader, writer = await asyncio.open_unix_connection(path)
+            else:
+                reader, writer = await asyncio.open_connection(host, port)
+            connections.append(_Connection(reader, writer))
+        transport = cls(connections)
+        response = await connections[0].send(OP_INFO, b"")
+        transport._depth, transport._bucket_capacity = INFO.unpack_from(response)
+        return transport
+
+    async def _ordered_send(self, opcode: int, payload: bytes) -> tuple[asyncio.Future, int]:
+        # Sends a request after every write queued so far, as seen by the server
+        async with self._send_lock:
+            index = next(self._next_connection)
+            if self._unacked_writes:
+                index = next(reversed(self._unacked_writes))
+                others = [future for other, future in self._unacked_writes.items() if other != index]
+                if others:
+                    await asyncio.gather(*others)
+            return self._connections[index].send(opcode, payload), index
+
+    async def _write(self, opcode: int, payload: bytes) -> asyncio.Future:
+        future, index = await self._ordered_send(opcode, payload)
+        self._unacked_writes.pop(index, None)
+        self._unacked_writes[index] = future  # Re-inserted last: the most recent write
+
+        def acknowledged(done):
+            if self._unacked_writes.get(index) is done:
+                del self._unacked_writes[index]
+
+        future.add_done_callback(acknowledged)
+        return future
+
+    async def read_path(self, leaf_index: int, start_level: int = 0) -> list:
+        payload = bytearray(COUNT.pack(start_level))
+        _encode_leaves([leaf_index], payload)
+        future, _ = await self._ordered_send(OP_READ_PATH, payload)
+        return decode_blocks(await future, 0)[0]
+
+    async def write_path(self, leaf_index: int, blocks: list, start_level: int = 0) -> asyncio.Future:
+        # Returns once the write is queued; await the returned future to wait for its acknowledgement
+        payload = bytearray(PATH_HEADER.pack(leaf_index, start_level))
+        payload += COUNT.pack(len(blocks))
+        for bucket_blocks in blocks:
+            encode_blocks(bucket_blocks, payload)
+        return await self._write(OP_WRITE_PATH, payload)
+
+    async def read_paths(self, leaf_indices: list[int], start_level: int = 0) -> dict:
+        payload = bytearray(COUNT.pack(start_level))
+        _encode_leaves(leaf_indices, payload)
+        future, _ = await self._ordered_send(OP_READ_PATHS, payload)
+        return decode_buckets(await future, 0)[0]
+
+    async def write_paths(self, buckets: dict) -> asyncio.Future:
+        # Returns once the write is queued; await the returned future to wait for its acknowledgement
+        payload = bytearray()
+        encode_buckets(buckets, payload)
+        return await self._write(OP_WRITE_PATHS, payload)
+
+    async def flush(self):
+        # Waits until every queued write has been acknowledged
+        if self._unacked_writes:
+            await asyncio.gather(*self._unacked_writes.values())
+
+    async def close(self):
+        await self.flush()
+        for connection in self._connections:
+            await connection.close()
+
+
+class RemoteServer:
+    """
+    Synchronous facade over AsyncServerTransport, usable anywhere Client expects a server.
+
+    The transport runs on an event loop in a background thread. Writes return as soon as they
+    are queued, so the write-back of one access overlaps the read of the next; an error from a
+    pipelined write is raised by the following call.
+    """
+
+    def __init__(self, host: str = None, port: int = None, path: str = None, pool_size: int = DEFAULT_POOL_SIZE):
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+        self._thread.start()
+        self._transport = self._call(AsyncServerTransport.connect(host, port, path, pool_size))
+        self._depth = self._transport._depth
+        self._bucket_capacity = self._transport._bucket_capacity
+        self._write_failures = []
+
+    def _call(self, coroutine):
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop).result()
+
+    async def _queue_write(self, write):
+        # Runs on the event loop: queues a write and records its failure, if any, for the next call
+        def acknowledged(done):
+            if not done.cancelled() and done.exception() is not None:
+                self._write_failures.append(done.exception())
+
+        (await write).add_done_callback(acknowledged)
+
+    def _raise_write_failure(self):
+        if self._write_failures:
+            raise self._write_failures.pop(0)
+
+    def read_path(self, leaf_index: int, start_level: int = 0):
+        self._raise_write_failure()
+        return self._call(self._transport.read_path(leaf_index, start_level))
+
+    def write_path(self, leaf_index: int, blocks: list, start_level: int = 0):
+        self._raise_write_failure()
+        self._call(self._queue_write(self._transport.write_path(leaf_index, blocks, start_level)))
+
+    def read_paths(self, leaf_indices: list[int], start_level: int = 0) -> dict:
+        self._raise_write_failure()
+        return self._call(self._transport.read_paths(leaf_indices, start_level))
+
+    def write_paths(self, buckets: dict):
+        self._raise_write_failure()
+        self._call(self._queue_write(self._transport.write_paths(buckets)))
+
+    def submit_read_paths(self, leaf_indices: list[int], start_level: int = 0):
+        """
+        Issues a read_paths request without waiting for it.
+
+        Requests are applied by the server in the order they are submitted, relative to every
+        other call on this RemoteServer.
+
+        Returns:
+            concurrent.futures.Future: Resolves to the same mapping read_paths returns.
+        """
+        self._raise_write_failure()
+        return asyncio.run_coroutine_threadsafe(self._transport.read_paths(leaf_indices, start_level), self._loop)
+
+    def flush(self):
+        # Waits until every pipelined write has been acknowledged
+        self._call(self._transport.flush())
+        self._raise_write_failure()
+
+    def close(self):
+        self._call(self._transport.close())
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+
+
+async def _serve(arguments):
+    network_server = NetworkServer(Server(arguments.depth, arguments.bucket_capacity))
+    if arguments.unix:
+        address = await network_server.start_unix(arguments.unix)
+    else:
+        address = await network_server.start_tcp(arguments.host, arguments.port)
+    print(f"ORAM server listening on {address}")
+    await network_server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run an ORAM storage server.")
+    parser.add_argument("depth", type=int, help="Depth of the ORAM tree")
+    parser.add_argument("bucket_capacity", type=int, help="Number of blocks per bucket")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=7070)
+    parser.add_argument("--unix", help="Listen on this Unix socket path instead of TCP")
+    asyncio.run(_serve(parser.parse_args()))
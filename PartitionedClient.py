@@ -0,0 +1,262 @@
+import multiprocessing
+import random
+import threading
+from concurrent.futures import Future
+from functools import partial
+
+from Client import Client, OP_READ, OP_WRITE, OP_DELETE, OP_UPDATE
+from Server import Server
+
+# CONSTANTS
+DEFAULT_PARTITIONS = 4
+DEFAULT_EVICTION_RATE = 2
+DEFAULT_BUCKET_CAPACITY = 4
+
+_chooser = random.SystemRandom()
+
+
+def _serve_partition(connection, depth: int, server_factory, client_options: dict):
+    # Worker process: runs one partition's Client against its server, one request at a time
+    server = server_factory()
+    client = Client(depth, **client_options)
+    while True:
+        request = connection.recv()
+        if request is None:
+            break
+        request_id, method, args = request
+        try:
+            connection.send((request_id, getattr(client, method)(server, *args), None))
+        except Exception as err:
+            connection.send((request_id, None, err))
+    client.close()
+    if hasattr(server, "close"):
+        server.close()
+    connection.close()
+
+
+class _LocalPartition:
+    # A partition whose Client runs in the calling thread
+
+    def __init__(self, depth: int, server_factory, client_options: dict):
+        self._server = server_factory()
+        self._client = Client(depth, **client_options)
+
+    def call(self, method: str, *args) -> Future:
+        future = Future()
+        try:
+            future.set_result(getattr(self._client, method)(self._server, *args))
+        except Exception as err:
+            future.set_exception(err)
+        return future
+
+    def close(self):
+        self._client.close()
+
+
+class _ProcessPartition:
+    # A partition whose Client runs in a worker process; requests are served in the order they are sent
+
+    def __init__(self, context, depth: int, server_factory, client_options: dict):
+        self._connection, child_connection = context.Pipe()
+        self._process = context.Process(target=_serve_partition, daemon=True,
+                                        args=(child_connection, depth, server_factory, client_options))
+        self._process.start()
+        child_connection.close()
+        self._lock = threading.Lock()  # Guards the request counter and the futures table
+        self._futures = {}  # Request ID -> future waiting for its result
+        self._next_request = 0
+        self._reader = threading.Thread(target=self._read_results, daemon=True)
+        self._reader.start()
+
+    def _read_results(self):
+        while True:
+            try:
+                request_id, result, error = self._connection.recv()
+            except (EOFError, OSError):
+                return
+            with self._lock:
+                future = self._futures.pop(request_id)
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+    def call(self, method: str, *args) -> Future:
+        future = Future()
+        with self._lock:
+            request_id = self._next_request
+            self._next_request += 1
+            self._futures[request_id] = future
+            self._connection.send((request_id, method, args))
+        return future
+
+    def close(self):
+        self._connection.send(None)
+        self._process.join()
+        self._reader.join()
+        self._connection.close()
+
+
+class PartitionedClient:
+    """
+    ORAM frontend splitting the block space over independent Path ORAM partitions.
+
+    Every block lives in one of `partitions` sub-ORAMs, each with its own Client and server.
+    Following the partitioning framework of Stefanov, Shi and Song, an access reads the block out
+    of its partition (or reads a random partition if the block is not stored in any), then assigns
+    the block to a fresh random partition and parks it in that partition's cache slot on the
+    client. After every access, `eviction_rate` partitions chosen at random each receive one
+    cached block, or a dummy access if their slot is empty. The server therefore sees one read of
+    a random partition followed by writes to random partitions, whatever is accessed.
+
+    With `processes=True` every partition runs in a worker process. Reads wait for their result
+    but evictions are only queued, so the partitions work in parallel. Partition servers are built
+    by `server_factories`, one zero-argument callable per partition, for example
+    functools.partial(RemoteServer, host, port) to place each shard on another host.
+    """
+
+    def __init__(self, block_count: int, partitions: int = DEFAULT_PARTITIONS,
+                 eviction_rate: int = DEFAULT_EVICTION_RATE, processes: bool = False, server_factories: list = None,
+                 bucket_capacity: int = DEFAULT_BUCKET_CAPACITY, **client_options):
+        """
+        Args:
+            block_count (int): Number of blocks the ORAM should hold.
+            partitions (int): Number of sub-ORAMs.
+            eviction_rate (int): Partitions written to after every access.
+            processes (bool): Whether to run every partition in its own worker process.
+            server_factories (list): One zero-argument callable per partition returning its server.
+                                     Defaults to in-process Server trees sized for the partition.
+            bucket_capacity (int): Bucket capacity of the default partition servers.
+            **client_options: Options passed to every partition's Client; they must be picklable
+                              when `processes` is set.
+        """
+        partition_blocks = -(-block_count // partitions)
+        self._depth = max((partition_blocks - 1).bit_length(), 1)
+        if server_factories is None:
+            server_factories = [partial(Server, self._depth, bucket_capacity)] * partitions
+        if len(server_factories) != partitions:
+            raise ValueError("Expected one server factory per partition.")
+
+        if processes:
+            context = multiprocessing.get_context("spawn")
+            self._partitions = [_ProcessPartition(context, self._depth, factory, client_options)
+                                for factory in server_factories]
+        else:
+            self._partitions = [_LocalPartition(self._depth, factory, client_options) for factory in server_factories]
+        self._eviction_rate = eviction_rate
+        self._partition_of = {}  # Block ID -> partition the block is stored or cached in
+        self._slots = [{} for _ in range(partitions)]  # Per partition, cached block ID -> content
+        self._evictions = []  # Futures of evictions not yet known to have succeeded
+
+    @property
+    def stash_size(self) -> int:
+        # Number of blocks waiting in the cache slots
+        return sum(len(slot) for slot in self._slots)
+
+    @property
+    def depth(self) -> int:
+        # Depth of every partition's tree
+        return self._depth
+
+    def _random_partition(self) -> int:
+        return _chooser.randrange(len(self._partitions))
+
+    def _check_evictions(self):
+        # Drops finished evictions, raising the first failure among them
+        failed = [future for future in self._evictions if future.done() and future.exception() is not None]
+        self._evictions = [future for future in self._evictions if not future.done()]
+        if failed:
+            raise failed[0].exception()
+
+    def _evict(self):
+        # Writes one cached block, or a dummy access, to each of `eviction_rate` random partitions
+        for _ in range(self._eviction_rate):
+            partition = self._random_partition()
+            slot = self._slots[partition]
+            if slot:
+                block_id = next(iter(slot))
+                self._evictions.append(self._partitions[partition].call("store_data", block_id, slot.pop(block_id)))
+            else:
+                self._evictions.append(self._partitions[partition].call("dummy_access"))
+
+    def access(self, action: str, block_id: int, payload=None):
+        """
+        Performs one operation.
+
+        Args:
+            action (str): One of OP_READ, OP_WRITE, OP_UPDATE, OP_DELETE.
+            block_id (int): ID of the block.
+            payload: Content to store for OP_WRITE, or the update function for OP_UPDATE.
+
+        Returns:
+            The data held before the operation, or None.
+        """
+        self._check_evictions()
+        partition = self._partition_of.get(block_id)
+        if partition is not None and block_id in self._slots[partition]:
+            # Already on the client: read a random partition so the access looks like any other
+            data = self._slots[partition].pop(block_id)
+            self._partitions[self._random_partition()].call("dummy_access").result()
+        elif partition is not None:
+            data = self._partitions[partition].call("delete_data", block_id).result()
+        else:
+            data = None
+            self._partitions[self._random_partition()].call("dummy_access").result()
+
+        if action == OP_DELETE:
+            self._partition_of.pop(block_id, None)
+        elif action != OP_READ or data is not None:
+            content = payload if action == OP_WRITE else payload(data) if action == OP_UPDATE else data
+            partition = self._random_partition()
+            self._partition_of[block_id] = partition
+            self._slots[partition][block_id] = content
+
+        self._evict()
+        return data
+
+    def bulk_load(self, items):
+        """
+        Fills the empty partitions, assigning every block to a uniformly random partition.
+
+        Args:
+            items: (block_id, content) pairs with distinct block IDs.
+        """
+        per_partition = [[] for _ in self._partitions]
+        for block_id, content in items:
+            partition = self._random_partition()
+            self._partition_of[block_id] = partition
+            per_partition[partition].append((block_id, content))
+        loads = [partition.call("bulk_load", partition_items)
+                 for partition, partition_items in zip(self._partitions, per_partition)]
+        for load in loads:
+            load.result()
+
+    def retrieve_data(self, block_id: int):
+        # Retrieves data
+        return self.access(OP_READ, block_id)
+
+    def store_data(self, block_id: int, content: str):
+        # Stores data
+        self.access(OP_WRITE, block_id, content)
+
+    def update_data(self, block_id: int, update):
+        # Replaces data with update(current data or None), returning the previous data
+        return self.access(OP_UPDATE, block_id, update)
+
+    def delete_data(self, block_id: int):
+        # Deletes data, returning the deleted data (or None)
+        return self.access(OP_DELETE, block_id)
+
+    def flush(self):
+        # Waits until every queued eviction has been applied
+        for future in self._evictions:
+            future.result()
+        self._evictions = []
+
+    def close(self):
+        # Applies the queued evictions and shuts the partitions down
+        try:
+            self.flush()
+        finally:
+            for partition in self._partitions:
+                partition.close()
@@ -0,0 +1,108 @@
+import os
+from array import array
+
+# CONSTANTS
+UNASSIGNED_LEAF = 0xFFFFFFFF  # Marks an array slot whose block has no leaf yet
+DEFAULT_LEAF_BATCH = 4096
+
+
+class LeafSampler:
+    """
+    Draws uniformly random leaves from a buffer refilled in bulk from os.urandom.
+
+    The number of leaves is a power of two, so masking a uniform 32-bit word keeps it uniform.
+    """
+
+    def __init__(self, depth: int, batch_size: int = DEFAULT_LEAF_BATCH):
+        if depth >= 32:  # Leaves must fit in 32 bits, below UNASSIGNED_LEAF
+            raise ValueError("Trees deeper than 31 levels are not supported.")
+        self._mask = (1 << depth) - 1
+        self._batch_size = batch_size
+        self._buffer = array("I")
+        self._next = 0
+
+    def _refill(self):
+        self._buffer = array("I", os.urandom(self._buffer.itemsize * self._batch_size))
+        self._next = 0
+
+    def draw(self) -> int:
+        # Returns the next random leaf, refilling the buffer when it runs out
+        if self._next == len(self._buffer):
+            self._refill()
+        leaf = self._buffer[self._next] & self._mask
+        self._next += 1
+        return leaf
+
+
+class PositionMap:
+    """
+    Flat client-side position map, holding the leaf of every block in a dict.
+
+    All position maps expose `remap`, which looks a block up and assigns its new leaf in one
+    step, so that a map stored in an ORAM can serve each lookup with a single access.
+    """
+
+    def __init__(self):
+        self._leaves = {}  # Maps block ID to a leaf index
+
+    def __len__(self):
+        return len(self._leaves)
+
+    def __contains__(self, block_id):
+        return block_id in self._leaves
+
+    def remap(self, block_id: int, new_leaf: int):
+        """
+        Assigns a new leaf to a block.
+
+        Args:
+            block_id (int): ID of the block.
+            new_leaf (int): The leaf the block is moved to.
+
+        Returns:
+            int | None: The previous leaf of the block, or None if it had none.
+        """
+        previous_leaf = self._leaves.get(block_id)
+        self._leaves[block_id] = new_leaf
+        return previous_leaf
+
+
+class ArrayPositionMap:
+    """
+    Flat client-side position map for dense integer block IDs, backed by a packed array.
+
+    Each entry takes 4 bytes instead of a dict slot and two int objects. It is a drop-in
+    replacement for PositionMap when block IDs range from 0 to block_count - 1.
+    """
+
+    def __init__(self, block_count: int, depth: int):
+        if depth >= 32:  # Leaves must fit in 32 bits, below UNASSIGNED_LEAF
+            raise ValueError("Trees deeper than 31 levels are not supported.")
+        self._leaves = array("I", [UNASSIGNED_LEAF]) * block_count
+        self._assigned = 0  # Number of blocks with a leaf
+
+    def __len__(self):
+        return self._assigned
+
+    def __contains__(self, block_id):
+        return 0 <= block_id < len(self._leaves) and self._leaves[block_id] != UNASSIGNED_LEAF
+
+    def remap(self, block_id: int, new_leaf: int):
+        """
+        Assigns a new leaf to a block.
+
+        Args:
+            block_id (int): ID of the block.
+            new_leaf (int): The leaf the block is moved to.
+
+        Returns:
+            int | None: The previous leaf of the block, or None if it had none.
+        """
+        if not 0 <= block_id < len(self._leaves):
+            raise ValueError(f"Block ID {block_id} is outside the range covered by the position map.")
+        previous_leaf = self._leaves[block_id]
+        self._leaves[block_id] = new_leaf
+        if previous_leaf == UNASSIGNED_LEAF:
+            self._assigned += 1
+            return None
+        return previous_leaf
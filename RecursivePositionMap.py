@@ -0,0 +1,85 @@
+from Client import LEAF_HEADER, Client
+from PositionMap import UNASSIGNED_LEAF, PositionMap
+from Server import Server
+
+# CONSTANTS
+DEFAULT_ENTRIES_PER_BLOCK = 16
+DEFAULT_CLIENT_THRESHOLD = 256
+DEFAULT_BUCKET_CAPACITY = 4
+
+
+class RecursivePositionMap:
+    """
+    Position map stored in a smaller ORAM of its own.
+
+    Entries are packed `entries_per_block` to a block, as one LEAF_HEADER-encoded leaf each
+    (UNASSIGNED_LEAF for a block with none), and the packed blocks live on a separate server
+    driven by a separate Client whose block size fits exactly one packed block. That Client needs a position map for the packed blocks
+    too, so the construction recurses until fewer than `client_threshold` packed blocks remain,
+    whose leaves are finally kept in a flat PositionMap on the client.
+    """
+
+    def __init__(self, block_count: int, entries_per_block: int = DEFAULT_ENTRIES_PER_BLOCK,
+                 client_threshold: int = DEFAULT_CLIENT_THRESHOLD, bucket_capacity: int = DEFAULT_BUCKET_CAPACITY,
+                 server_factory=Server):
+        """
+        Args:
+            block_count (int): Number of block IDs (0 to block_count - 1) the map must cover.
+            entries_per_block (int): Number of positions packed into one block of the inner ORAM.
+            client_threshold (int): Largest number of packed blocks whose leaves are kept in a flat map.
+            bucket_capacity (int): Bucket capacity of every inner ORAM tree.
+            server_factory: Callable building a server from (depth, bucket_capacity) (default: Server).
+        """
+        self._block_count = block_count
+        self._entries_per_block = entries_per_block
+
+        packed_count = -(-block_count // entries_per_block)
+        depth = (packed_count - 1).bit_length()
+        if packed_count <= client_threshold:
+            inner_map = PositionMap()
+        else:
+            inner_map = RecursivePositionMap(packed_count, entries_per_block, client_threshold,
+                                             bucket_capacity, server_factory)
+
+        self._server = server_factory(depth, bucket_capacity)
+        self._client = Client(depth, pos_map=inner_map, block_size=entries_per_block * LEAF_HEADER.size)
+
+    @property
+    def levels(self) -> int:
+        # Number of ORAMs used to store the map
+        inner_map = self._client._pos_map
+        return 1 + (inner_map.levels if isinstance(inner_map, RecursivePositionMap) else 0)
+
+    def __len__(self):
+        # Number of entries kept on the client, in the flat map at the bottom of the recursion
+        return len(self._client._pos_map)
+
+    def remap(self, block_id: int, new_leaf: int):
+        """
+        Assigns a new leaf to a block with a single access to the inner ORAM.
+
+        Args:
+            block_id (int): ID of the block.
+            new_leaf (int): The leaf the block is moved to.
+
+        Returns:
+            int | None: The previous leaf of the block, or None if it had none.
+        """
+        if not 0 <= block_id < self._block_count:
+            raise ValueError(f"Block ID {block_id} is outside the range covered by the position map.")
+
+        packed_id, slot = divmod(block_id, self._entries_per_block)
+        offset = slot * LEAF_HEADER.size
+
+        def pack(content):
+            if content is None:
+                content = LEAF_HEADER.pack(UNASSIGNED_LEAF) * self._entries_per_block
+            packed = bytearray(content)
+            LEAF_HEADER.pack_into(packed, offset, new_leaf)
+            return bytes(packed)
+
+        previous = self._client.update_data(self._server, packed_id, pack)
+        if previous is None:
+            return None
+        entry = LEAF_HEADER.unpack_from(previous, offset)[0]
+        return entry if entry != UNASSIGNED_LEAF else None
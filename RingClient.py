@@ -0,0 +1,197 @@
+import random
+
+from Client import Client, DEFAULT_LOAD_BATCH
+from TreeUtils import find_path_indices, leftmost_leaf, node_level
+
+# CONSTANTS
+DEFAULT_REAL_SLOTS = 4
+DEFAULT_DUMMY_SLOTS = 6
+DEFAULT_EVICTION_RATE = 3
+
+_shuffler = random.SystemRandom()
+
+
+class _RingBucket:
+    """
+    Permutation metadata of one Ring ORAM bucket.
+
+    Attributes:
+        slots (list): Block ID stored in every slot, None for dummy slots.
+        valid (list[bool]): Whether every slot has not been read since the bucket was last written.
+        count (int): Number of online reads served by the bucket since it was last written.
+    """
+
+    def __init__(self, slots: list):
+        self.slots = slots
+        self.valid = [True] * len(slots)
+        self.count = 0
+
+    def valid_real_ids(self) -> set:
+        return {block_id for block_id, valid in zip(self.slots, self.valid) if valid and block_id is not None}
+
+
+class RingClient(Client):
+    """
+    ORAM client running Ring ORAM on the same server tree as Path ORAM.
+
+    Every bucket holds `real_slots` slots for real blocks plus `dummy_slots` reserved dummy slots,
+    randomly permuted; the server must be built with a bucket capacity of real_slots + dummy_slots.
+    An online access reads a single slot per bucket on the path: the requested block where it
+    lives, a fresh dummy everywhere else. Every `eviction_rate` accesses one path, chosen in
+    reverse-lexicographic order, is evicted as in Path ORAM, and a bucket that ran out of unread
+    dummies is reshuffled early. Bucket metadata is kept on the client.
+    """
+
+    def __init__(self, tree_height: int, real_slots: int = DEFAULT_REAL_SLOTS, dummy_slots: int = DEFAULT_DUMMY_SLOTS,
+                 eviction_rate: int = DEFAULT_EVICTION_RATE, **client_options):
+        if client_options.get("bucket_format") is not None:
+            raise ValueError("Ring ORAM reads single slots and cannot use the bucket-granular format.")
+        if client_options.get("cached_levels"):
+            raise ValueError("Ring ORAM keeps per-bucket metadata and cannot cache the top of the tree.")
+        if client_options.get("deferred_writes"):
+            raise ValueError("Ring ORAM writes buckets back synchronously.")
+        super().__init__(tree_height, **client_options)
+        self._real_slots = real_slots
+        self._dummy_slots = dummy_slots
+        self._eviction_rate = eviction_rate
+        self._buckets = {}  # Node index -> _RingBucket, for every bucket written so far
+        self._access_count = 0
+        self._eviction_count = 0
+
+    def _bucket(self, node_index: int) -> _RingBucket:
+        # Metadata of a bucket; a never-written bucket only holds dummy slots
+        bucket = self._buckets.get(node_index)
+        if bucket is None:
+            bucket = self._buckets[node_index] = _RingBucket([None] * (self._real_slots + self._dummy_slots))
+        return bucket
+
+    def _next_eviction_leaf(self) -> int:
+        # Leaves are visited in reverse-lexicographic order: the bits of a counter, reversed
+        counter = self._eviction_count % (1 << self._depth)
+        self._eviction_count += 1
+        return int(f"{counter:0{self._depth}b}"[::-1], 2) if self._depth else 0
+
+    def _read_online(self, server, leaf: int, block_id):
+        # Reads one slot per bucket on the path, moving the requested block (None for a dummy
+        # access) into the stash
+        # Slots are only marked read once the server answered, so a failed read leaves them valid
+        requests = []
+        for node_index in find_path_indices(leaf, self._depth):
+            bucket = self._bucket(node_index)
+            if block_id is not None and block_id in bucket.slots and bucket.valid[bucket.slots.index(block_id)]:
+                slot = bucket.slots.index(block_id)
+            else:
+                slot = _shuffler.choice([index for index, stored_id in enumerate(bucket.slots)
+                                         if stored_id is None and bucket.valid[index]])
+            requests.append((node_index, slot))
+
+        fetched = server.read_slots(requests)
+        for node_index, slot in requests:
+            bucket = self._buckets[node_index]
+            bucket.valid[slot] = False
+            bucket.count += 1
+        self._stash_fetched([block for block in fetched if not block._is_dummy and block._id == block_id])
+
+    def _read_buckets_into_stash(self, server, node_indices: list[int]):
+        # Moves every real block not yet read out of the given buckets into the stash
+        for node_index, bucket_blocks in server.read_buckets(node_indices).items():
+            valid_ids = self._bucket(node_index).valid_real_ids()
+            self._stash_fetched([block for block in bucket_blocks if not block._is_dummy and block._id in valid_ids])
+
+    def _seal_nodes(self, server, buckets: dict) -> dict:
+        # Seals a dict of node index -> entries, each bucket under a fresh random permutation
+        # whose metadata replaces that of the bucket
+        capacity = self._real_slots + self._dummy_slots
+        sealed_buckets = {}
+        for (node_index, entries), sealed in zip(buckets.items(),
+                                                 self._encrypt_buckets(capacity, list(buckets.values()))):
+            order = list(range(capacity))
+            _shuffler.shuffle(order)
+            slot_ids = [entry[0] for entry in entries] + [None] * (capacity - len(entries))
+            sealed_buckets[node_index] = [sealed[index] for index in order]
+            self._buckets[node_index] = _RingBucket([slot_ids[index] for index in order])
+        return sealed_buckets
+
+    def _bucket_real_slots(self, server) -> int:
+        return self._real_slots
+
+    def _write_buckets(self, server, node_indices: list[int]):
+        # Refills the given buckets from the stash, deepest first, under fresh random permutations
+        buckets = {}
+        for node_index in sorted(node_indices, key=node_level, reverse=True):
+            buckets[node_index] = self._stash.take_evictable(leftmost_leaf(node_index, self._depth),
+                                                             node_level(node_index), self._real_slots)
+            if self._metrics is not None:
+                self._count_evicted(node_level(node_index), buckets[node_index])
+        server.write_paths(self._seal_nodes(server, buckets))
+
+    def _check_server(self, server):
+        if server._bucket_capacity != self._real_slots + self._dummy_slots:
+            raise ValueError("Ring ORAM needs a server whose bucket capacity is real_slots + dummy_slots.")
+
+    def _after_online_read(self, server, leaf: int):
+        # Evicts a path every eviction_rate accesses and reshuffles the buckets on the accessed path
+        # that have no unread dummy left
+        self._access_count += 1
+        if self._access_count % self._eviction_rate == 0:
+            self._evict_path(server)
+
+        exhausted = [node_index for node_index in find_path_indices(leaf, self._depth)
+                     if self._bucket(node_index).count >= self._dummy_slots]
+        if exhausted:
+            self._read_buckets_into_stash(server, exhausted)
+            self._write_buckets(server, exhausted)
+
+    def _evict_path(self, server):
+        # Path ORAM style eviction of the next path in reverse-lexicographic order
+        path = find_path_indices(self._next_eviction_leaf(), self._depth)
+        self._read_buckets_into_stash(server, path)
+        self._write_buckets(server, path)
+
+    def _process_request(self, server, block_id: int, action: str, payload: str = None):
+        # Main handler for read/write/delete/update requests
+        self._check_server(server)
+        new_leaf = self._assign_new_leaf()
+        previous_leaf = self._pos_map.remap(block_id, new_leaf)  # Re-assign position
+        leaf = previous_leaf if previous_leaf is not None else self._assign_new_leaf()  # Unknown: random path
+
+        try:
+            self._read_online(server, leaf, block_id)
+        except BaseException:
+            self._restore_leaf(block_id, previous_leaf)
+            raise
+        try:
+            result, _ = self._handle_access(block_id, action, payload, new_leaf)
+        except BaseException:
+            # The block stays in the stash under its previous leaf; the read still counts as an access
+            self._restore_leaf(block_id, previous_leaf)
+            self._after_online_read(server, leaf)
+            raise
+        self._after_online_read(server, leaf)
+
+        self._report_stash()
+        return result
+
+    def batch_access(self, server, operations: list) -> list:
+        raise ValueError("Ring ORAM reads single slots and cannot serve a batch from one union of paths.")
+
+    def dummy_access(self, server):
+        """
+        Reads one fresh dummy slot from every bucket on a uniformly random path.
+
+        It counts towards evictions and reshuffles like any access, and is indistinguishable from
+        a real one to the server.
+        """
+        self._check_server(server)
+        leaf = self._assign_new_leaf()
+        self._read_online(server, leaf, None)
+        self._after_online_read(server, leaf)
+        self._report_stash()
+
+    def bulk_load(self, server, items, batch_size: int = DEFAULT_LOAD_BATCH):
+        """
+        Fills an empty ORAM as Client.bulk_load does, placing at most real_slots blocks per bucket
+        and writing every bucket under a fresh random permutation.
+        """
+        self._check_server(server)
+        super().bulk_load(server, items, batch_size)
@@ -1,4 +1,5 @@
-from TreeUtils import create_perfect_tree, find_path_indices
+from Metrics import record_read, record_write
+from TreeUtils import create_perfect_tree, find_path_indices, find_paths_union, node_level
 
 
 class Server:
@@ -7,46 +8,114 @@ class Server:
     path-based read/write operations.
     """
 
-    def __init__(self, depth: int, bucket_capacity: int):
+    def __init__(self, depth: int, bucket_capacity: int, metrics=None):
         # Initialize tree with given depth and bucket capacity
         self._depth = depth
         self._bucket_capacity = bucket_capacity
         self._tree = create_perfect_tree(depth, bucket_capacity)
+        self._metrics = metrics  # Optional MetricsSink counting the buckets and bytes read and written
+        self._dirty = None  # Nodes written since the latest snapshot, once one has been taken
+        self._snapshot_id = None  # ID of the latest snapshot
 
-    def read_path(self, leaf_index: int):
+    def read_path(self, leaf_index: int, start_level: int = 0):
         """
         Read all blocks along the path from root to given leaf.
 
         Args:
             leaf_index (int): Index of the target leaf node.
+            start_level (int): First level to read; the levels above it are skipped.
 
         Returns:
             list: Blocks collected along the path.
         """
-        path = find_path_indices(leaf_index, self._depth)
-        collected_blocks = []
-        for node_index in path:
-            collected_blocks += self._tree[node_index].get_blocks()
+        path = find_path_indices(leaf_index, self._depth)[start_level:]
+        tree = self._tree
+        collected_blocks = [block for node_index in path for block in tree[node_index]._blocks]
+        if self._metrics is not None:
+            record_read(self._metrics, len(path), collected_blocks)
         return collected_blocks
 
-    def write_path(self, leaf_index: int, blocks: list):
+    def write_path(self, leaf_index: int, blocks: list, start_level: int = 0):
         """
-        Write blocks along the path from root to given leaf, filling each bucket up to capacity.
+        Write blocks along the path from root to given leaf, replacing the content of each bucket.
 
         Args:
             leaf_index (int): Index of the target leaf node.
-            blocks (list): Blocks to write along the path.
+            blocks (list): One list of blocks per bucket on the path, ordered from start_level to leaf.
+                           Each list may hold at most bucket_capacity blocks.
+            start_level (int): Level of the first bucket written; the levels above it are left untouched.
         """
-        path = find_path_indices(leaf_index, self._depth)
-        current = 0
+        path = find_path_indices(leaf_index, self._depth)[start_level:]
 
-        for node_index in path:
+        for node_index, bucket_blocks in zip(path, blocks):
             bucket = self._tree[node_index]
             bucket.reset_content()
-            capacity = self._bucket_capacity
+            for block in bucket_blocks:
+                bucket.add_block(block)
+        if self._dirty is not None:
+            self._dirty.update(path)
+        if self._metrics is not None:
+            record_write(self._metrics, blocks[:len(path)])
 
-            for _ in range(capacity):
-                if current >= len(blocks):
-                    break
-                bucket.add_block(blocks[current])
-                current += 1
\ No newline at end of file
+    def read_paths(self, leaf_indices: list[int], start_level: int = 0) -> dict:
+        """
+        Read the buckets on the union of several paths, each shared bucket only once.
+
+        Args:
+            leaf_indices (list[int]): Indices of the target leaf nodes.
+            start_level (int): First level to read; the levels above it are skipped.
+
+        Returns:
+            dict: Maps each node index on the union to the blocks stored in its bucket.
+        """
+        nodes = find_paths_union(leaf_indices, self._depth)
+        if start_level:
+            nodes = [node_index for node_index in nodes if node_level(node_index) >= start_level]
+        return self.read_buckets(nodes)
+
+    def read_buckets(self, node_indices: list[int]) -> dict:
+        """
+        Read whole buckets by node index.
+
+        Args:
+            node_indices (list[int]): Indices of the buckets to read.
+
+        Returns:
+            dict: Maps each node index to the blocks stored in its bucket.
+        """
+        buckets = {node_index: self._tree[node_index].get_blocks() for node_index in node_indices}
+        if self._metrics is not None:
+            record_read(self._metrics, len(buckets), [block for blocks in buckets.values() for block in blocks])
+        return buckets
+
+    def read_slots(self, slots: list[tuple[int, int]]) -> list:
+        """
+        Read single blocks out of buckets.
+
+        Args:
+            slots (list[tuple[int, int]]): (node index, slot index) pairs.
+
+        Returns:
+            list: The block stored in every requested slot, in order.
+        """
+        blocks = [self._tree[node_index].get_block(slot) for node_index, slot in slots]
+        if self._metrics is not None:
+            record_read(self._metrics, 0, blocks)  # Single slots: bytes only
+        return blocks
+
+    def write_paths(self, buckets: dict):
+        """
+        Replace the content of several buckets at once.
+
+        Args:
+            buckets (dict): Maps node indices to the blocks (at most bucket_capacity) to store there.
+        """
+        for node_index, bucket_blocks in buckets.items():
+            bucket = self._tree[node_index]
+            bucket.reset_content()
+            for block in bucket_blocks:
+                bucket.add_block(block)
+        if self._dirty is not None:
+            self._dirty.update(buckets)
+        if self._metrics is not None:
+            record_write(self._metrics, buckets.values())
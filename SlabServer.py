@@ -0,0 +1,226 @@
+import struct
+
+from Block import Block
+from Metrics import record_read, record_write
+from TreeUtils import find_path_indices, find_paths_union, node_level
+
+# SLOT LAYOUT: flags | block id | ciphertext length | nonce | tag | ciphertext (padded)
+SLOT_HEADER = struct.Struct("<BqI")
+NONCE_SIZE = 16
+TAG_SIZE = 16
+DEFAULT_MAX_PAYLOAD = 64
+
+# SLOT FLAGS
+SLOT_EMPTY = 0
+SLOT_REAL = 1
+SLOT_DUMMY = 2  # Holds a dummy ciphertext
+
+
+def slot_size(max_payload: int) -> int:
+    # Bytes taken by one slot holding ciphertexts of up to max_payload bytes
+    return SLOT_HEADER.size + NONCE_SIZE + TAG_SIZE + max_payload
+
+
+def unpack_slot(view: memoryview, offset: int, copy: bool = True):
+    # Decodes the slot at `offset`, returning its Block or None if the slot is empty.
+    # Without copy, the nonce, tag and ciphertext are views into `view`, which must then be a
+    # private buffer that is never written again; slabs are rewritten in place, so they copy.
+    flags, block_id, length = SLOT_HEADER.unpack_from(view, offset)
+    if flags == SLOT_EMPTY:
+        return None
+    if not copy:
+        view = memoryview(view).toreadonly()
+    start = offset + SLOT_HEADER.size
+    nonce = view[start:start + NONCE_SIZE]
+    start += NONCE_SIZE
+    tag = view[start:start + TAG_SIZE]
+    start += TAG_SIZE
+    cipher_text = view[start:start + length]
+    if copy:
+        nonce, tag, cipher_text = bytes(nonce), bytes(tag), bytes(cipher_text)
+    if flags == SLOT_DUMMY:
+        return Block(None, (nonce, cipher_text, tag), is_dummy=True)
+    return Block(block_id, (nonce, cipher_text, tag), is_dummy=False)
+
+
+def pack_slot(view: memoryview, offset: int, block: Block, max_payload: int):
+    # Encodes a block into the slot at `offset`; a block without data empties the slot
+    data = block._data
+    if data is None:
+        view[offset] = SLOT_EMPTY
+        return
+    nonce, cipher_text, tag = data
+    length = len(cipher_text)
+    if length > max_payload:
+        raise ValueError(f"Ciphertext of {length} bytes exceeds the slot payload of {max_payload} bytes.")
+    if block._is_dummy:
+        SLOT_HEADER.pack_into(view, offset, SLOT_DUMMY, 0, length)
+    else:
+        SLOT_HEADER.pack_into(view, offset, SLOT_REAL, block._id, length)
+    start = offset + SLOT_HEADER.size
+    view[start:start + NONCE_SIZE] = nonce
+    start += NONCE_SIZE
+    view[start:start + TAG_SIZE] = tag
+    start += TAG_SIZE
+    view[start:start + length] = cipher_text
+
+
+class SlabServer:
+    """
+    ORAM Server that stores the whole bucket tree in one preallocated slab of fixed-size slots.
+
+    Bucket i occupies bucket_capacity consecutive slots starting at i * bucket_size, so reading
+    or writing a path is index arithmetic plus slice copies instead of walking Bucket objects.
+    It exposes the same read_path/write_path interface as the object-based Server, which stays
+    the reference backend.
+    """
+
+    def __init__(self, depth: int, bucket_capacity: int, max_payload: int = DEFAULT_MAX_PAYLOAD, metrics=None):
+        self._metrics = metrics  # Optional MetricsSink counting the buckets and bytes read and written
+        self._dirty = None  # Nodes written since the latest snapshot, once one has been taken
+        self._snapshot_id = None  # ID of the latest snapshot
+        self._configure(depth, bucket_capacity, max_payload)
+        total_buckets = (1 << (depth + 1)) - 1
+        self._slab = self._allocate(total_buckets * self._bucket_size)
+
+    def _configure(self, depth: int, bucket_capacity: int, max_payload: int):
+        # Tree shape and slot geometry
+        self._depth = depth
+        self._bucket_capacity = bucket_capacity
+        self._max_payload = max_payload
+        self._slot_size = slot_size(max_payload)
+        self._bucket_size = self._slot_size * bucket_capacity
+
+    def _allocate(self, size: int):
+        # Zero-filled storage, so every slot starts out empty
+        return bytearray(size)
+
+    def _bucket_offset(self, node_index: int) -> int:
+        # Byte offset of the first slot of a bucket inside the slab
+        return node_index * self._bucket_size
+
+    def _read_bucket(self, view: memoryview, node_index: int, collected_blocks: list):
+        offset = self._bucket_offset(node_index)
+        for slot in range(self._bucket_capacity):
+            block = unpack_slot(view, offset + slot * self._slot_size)
+            if block is not None:
+                collected_blocks.append(block)
+
+    def _write_bucket(self, view: memoryview, node_index: int, bucket_blocks: list):
+        if len(bucket_blocks) > self._bucket_capacity:
+            raise Exception("Reached max capacity")
+        offset = self._bucket_offset(node_index)
+        for slot in range(self._bucket_capacity):
+            slot_offset = offset + slot * self._slot_size
+            if slot < len(bucket_blocks):
+                pack_slot(view, slot_offset, bucket_blocks[slot], self._max_payload)
+            else:
+                view[slot_offset] = SLOT_EMPTY
+
+    def read_path(self, leaf_index: int, start_level: int = 0):
+        """
+        Read all blocks along the path from root to given leaf.
+
+        Args:
+            leaf_index (int): Index of the target leaf node.
+            start_level (int): First level to read; the levels above it are skipped.
+
+        Returns:
+            list: Blocks collected along the path.
+        """
+        view = memoryview(self._slab)
+        collected_blocks = []
+        path = find_path_indices(leaf_index, self._depth)[start_level:]
+        for node_index in path:
+            self._read_bucket(view, node_index, collected_blocks)
+        if self._metrics is not None:
+            record_read(self._metrics, len(path), collected_blocks)
+        return collected_blocks
+
+    def write_path(self, leaf_index: int, blocks: list, start_level: int = 0):
+        """
+        Write blocks along the path from root to given leaf, replacing the content of each bucket.
+
+        Args:
+            leaf_index (int): Index of the target leaf node.
+            blocks (list): One list of blocks per bucket on the path, ordered from start_level to leaf.
+                           Each list may hold at most bucket_capacity blocks.
+            start_level (int): Level of the first bucket written; the levels above it are left untouched.
+        """
+        view = memoryview(self._slab)
+        path = find_path_indices(leaf_index, self._depth)[start_level:]
+        for node_index, bucket_blocks in zip(path, blocks):
+            self._write_bucket(view, node_index, bucket_blocks)
+        if self._dirty is not None:
+            self._dirty.update(path)
+        if self._metrics is not None:
+            record_write(self._metrics, blocks[:len(path)])
+
+    def read_paths(self, leaf_indices: list[int], start_level: int = 0) -> dict:
+        """
+        Read the buckets on the union of several paths, each shared bucket only once.
+
+        Args:
+            leaf_indices (list[int]): Indices of the target leaf nodes.
+            start_level (int): First level to read; the levels above it are skipped.
+
+        Returns:
+            dict: Maps each node index on the union to the blocks stored in its bucket.
+        """
+        nodes = find_paths_union(leaf_indices, self._depth)
+        if start_level:
+            nodes = [node_index for node_index in nodes if node_level(node_index) >= start_level]
+        return self.read_buckets(nodes)
+
+    def read_buckets(self, node_indices: list[int]) -> dict:
+        """
+        Read whole buckets by node index.
+
+        Args:
+            node_indices (list[int]): Indices of the buckets to read.
+
+        Returns:
+            dict: Maps each node index to the blocks stored in its bucket.
+        """
+        view = memoryview(self._slab)
+        buckets = {}
+        for node_index in node_indices:
+            buckets[node_index] = []
+            self._read_bucket(view, node_index, buckets[node_index])
+        if self._metrics is not None:
+            record_read(self._metrics, len(buckets), [block for blocks in buckets.values() for block in blocks])
+        return buckets
+
+    def read_slots(self, slots: list[tuple[int, int]]) -> list:
+        """
+        Read single blocks out of buckets.
+
+        Args:
+            slots (list[tuple[int, int]]): (node index, slot index) pairs.
+
+        Returns:
+            list: The block stored in every requested slot, in order (an empty Block if unwritten).
+        """
+        view = memoryview(self._slab)
+        blocks = []
+        for node_index, slot in slots:
+            block = unpack_slot(view, self._bucket_offset(node_index) + slot * self._slot_size)
+            blocks.append(block if block is not None else Block())
+        if self._metrics is not None:
+            record_read(self._metrics, 0, blocks)  # Single slots: bytes only
+        return blocks
+
+    def write_paths(self, buckets: dict):
+        """
+        Replace the content of several buckets at once.
+
+        Args:
+            buckets (dict): Maps node indices to the blocks (at most bucket_capacity) to store there.
+        """
+        view = memoryview(self._slab)
+        for node_index, bucket_blocks in buckets.items():
+            self._write_bucket(view, node_index, bucket_blocks)
+        if self._dirty is not None:
+            self._dirty.update(buckets)
+        if self._metrics is not None:
+            record_write(self._metrics, buckets.values())
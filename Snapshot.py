@@ -0,0 +1,363 @@
+import mmap
+import os
+import struct
+from array import array
+
+from Block import Block
+from BucketFormat import BucketFormat
+from Client import Client, LEAF_HEADER
+from PositionMap import ArrayPositionMap, PositionMap, UNASSIGNED_LEAF
+from Server import Server
+from SlabServer import SlabServer, DEFAULT_MAX_PAYLOAD, pack_slot, slot_size, unpack_slot
+
+# SERVER SNAPSHOT: header, padded to DATA_OFFSET, then fixed-width bucket records. A full snapshot
+# holds every bucket in node order; an incremental one holds the buckets written since the
+# snapshot it is based on, each prefixed by its node index. A bucket record is `bucket_capacity`
+# slots in the SlabServer slot layout, so a full snapshot is a SlabServer slab as is. Every file
+# records its own max payload: a SlabServer's, or the largest ciphertext saved from a Server.
+SNAPSHOT_MAGIC = b"ORAMSNAP"
+SNAPSHOT_VERSION = 1
+# magic | version | kind | depth | bucket capacity | max payload | record count | snapshot id | base snapshot id
+SNAPSHOT_HEADER = struct.Struct("<8sHBxIIIQQQ")
+KIND_FULL = 0
+KIND_INCREMENTAL = 1
+DATA_OFFSET = mmap.ALLOCATIONGRANULARITY  # Records start where the file can be mapped from
+NODE_INDEX = struct.Struct("<I")
+WRITE_CHUNK = 1 << 20  # Bytes gathered before each write to disk
+
+# CLIENT SNAPSHOT: header, then the position map as packed arrays, then the stash entries,
+# then the entries of the cached tree-top buckets, each prefixed by its node index
+CLIENT_MAGIC = b"ORAMCLNT"
+CLIENT_VERSION = 2
+# magic | version | map kind | depth | cached levels | dummy size | block size | bucket format capacity |
+# bucket format slot size | key | map entries | stash entries | cached entries
+# (a block size of 0 and a bucket format capacity of 0 mean none)
+CLIENT_HEADER = struct.Struct("<8sHBxIIIIII16sQQQ")
+MAP_DICT = 0  # Block IDs (int64) then their leaves (uint32)
+MAP_ARRAY = 1  # One leaf (uint32) per block ID, as held by ArrayPositionMap
+ENTRY_HEADER = struct.Struct("<qIBI")  # block id | leaf | content kind | content length
+CONTENT_STR = 0
+CONTENT_BYTES = 1
+# Client arguments restored from a client snapshot, which load_client does not accept
+RESTORED_OPTIONS = ("tree_height", "pos_map", "dummy_size", "cached_levels", "key")
+
+
+def _new_snapshot_id() -> int:
+    return int.from_bytes(os.urandom(8), "little")
+
+
+def _bucket_geometry(server, nodes) -> tuple[int, int]:
+    # Max payload and record size of the saved buckets: the slot size of a SlabServer, and for a
+    # Server the largest ciphertext among the given nodes (at least DEFAULT_MAX_PAYLOAD)
+    if isinstance(server, SlabServer):
+        max_payload = server._max_payload
+    else:
+        max_payload = max((len(block._data[1]) for node_index in nodes for block in server._tree[node_index]._blocks
+                           if block._data is not None), default=DEFAULT_MAX_PAYLOAD)
+        max_payload = max(max_payload, DEFAULT_MAX_PAYLOAD)
+    return max_payload, slot_size(max_payload) * server._bucket_capacity
+
+
+def _bucket_record(server, node_index: int, max_payload: int, bucket_size: int):
+    # The fixed-width record of one bucket; a SlabServer bucket is copied straight out of the slab
+    if isinstance(server, SlabServer):
+        offset = server._bucket_offset(node_index)
+        return memoryview(server._slab)[offset:offset + bucket_size]
+    record = bytearray(bucket_size)
+    stride = bucket_size // server._bucket_capacity
+    for slot, block in enumerate(server._tree[node_index].get_blocks()):
+        pack_slot(record, slot * stride, block, max_payload)
+    return record
+
+
+def _repack_bucket(server: SlabServer, node_index: int, view: memoryview, offset: int, max_payload: int):
+    # Copies a bucket record of another slot size into the slab, slot by slot
+    stride = slot_size(max_payload)
+    target = server._bucket_offset(node_index)
+    for slot in range(server._bucket_capacity):
+        block = unpack_slot(view, offset + slot * stride)
+        pack_slot(server._slab, target + slot * server._slot_size, block or Block(), server._max_payload)
+
+
+def _fill_bucket(server: Server, node_index: int, view: memoryview, offset: int, max_payload: int):
+    # Decodes one bucket record into a bucket of an object-based Server
+    bucket = server._tree[node_index]
+    bucket.reset_content()
+    stride = slot_size(max_payload)
+    for slot in range(server._bucket_capacity):
+        block = unpack_slot(view, offset + slot * stride)
+        if block is not None:
+            bucket.add_block(block)
+
+
+def _replace_file(path: str, write):
+    # Streams a file through write(output) into a temporary file, then moves it into place
+    temporary_path = path + ".tmp"
+    with open(temporary_path, "wb") as output:
+        write(output)
+        output.flush()
+        os.fsync(output.fileno())
+    os.replace(temporary_path, path)
+
+
+def save_server(server, path: str, incremental: bool = False) -> int:
+    """
+    Streams the server's bucket tree to a snapshot file.
+
+    A full snapshot starts tracking the buckets the server writes from then on; an incremental
+    snapshot holds only the buckets written since the previous snapshot, full or incremental,
+    and is restored on top of it. Clients with deferred writes must be flushed first.
+
+    Args:
+        server: A Server or SlabServer (MmapServer included).
+        path (str): Snapshot file to write; it is replaced atomically.
+        incremental (bool): Whether to write only the buckets changed since the last snapshot.
+
+    Returns:
+        int: The ID of the new snapshot.
+
+    Raises:
+        ValueError: If an incremental snapshot is requested before any snapshot of the server.
+    """
+    if not isinstance(server, (Server, SlabServer)):
+        raise TypeError(f"Cannot snapshot a {type(server).__name__}; only Server and SlabServer trees are supported.")
+    if incremental and server._dirty is None:
+        raise ValueError("An incremental snapshot needs an earlier snapshot of the same server.")
+    # Swap the change set first, so that writes made while saving are kept for the next snapshot
+    dirty, server._dirty = server._dirty, set()
+    nodes = sorted(dirty) if incremental else range((1 << (server._depth + 1)) - 1)
+    max_payload, bucket_size = _bucket_geometry(server, nodes)
+    snapshot_id = _new_snapshot_id()
+    header = SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, KIND_INCREMENTAL if incremental else KIND_FULL,
+                                  server._depth, server._bucket_capacity, max_payload, len(nodes), snapshot_id,
+                                  server._snapshot_id if incremental else 0)
+
+    def write(output):
+        output.write(header.ljust(DATA_OFFSET, b"\0"))
+        chunk = bytearray()
+        for node_index in nodes:
+            if incremental:
+                chunk += NODE_INDEX.pack(node_index)
+            chunk += _bucket_record(server, node_index, max_payload, bucket_size)
+            if len(chunk) >= WRITE_CHUNK:
+                output.write(chunk)
+                chunk.clear()
+        output.write(chunk)
+
+    try:
+        _replace_file(path, write)
+    except BaseException:
+        server._dirty = None if dirty is None else server._dirty | dirty
+        raise
+    server._snapshot_id = snapshot_id
+    return snapshot_id
+
+
+def _read_header(handle, path: str) -> tuple:
+    magic, version, kind, depth, bucket_capacity, max_payload, count, snapshot_id, base_id = \
+        SNAPSHOT_HEADER.unpack(handle.read(SNAPSHOT_HEADER.size))
+    if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+        raise ValueError(f"{path} is not an ORAM snapshot of version {SNAPSHOT_VERSION}.")
+    return kind, (depth, bucket_capacity, max_payload), count, snapshot_id, base_id
+
+
+def load_server(path: str, increments: list[str] = (), server_cls=SlabServer, metrics=None):
+    """
+    Restores a server from a full snapshot and the incremental snapshots taken after it.
+
+    A SlabServer maps the full snapshot copy-on-write and uses it as its slab without parsing it;
+    changed buckets are then copied in from each increment. The snapshot files are never modified.
+    A Server saved with larger ciphertexts after its full snapshot is restored into a Server.
+
+    Args:
+        path (str): The full snapshot.
+        increments (list[str]): Incremental snapshots, in the order they were taken.
+        server_cls: SlabServer (default) or Server.
+        metrics: Optional MetricsSink given to the restored server.
+
+    Returns:
+        The restored server, tracking changes for a next incremental snapshot.
+    """
+    with open(path, "rb") as handle:
+        kind, shape, count, snapshot_id, _ = _read_header(handle, path)
+        if kind != KIND_FULL:
+            raise ValueError(f"{path} is an incremental snapshot; restore starts from a full one.")
+        depth, bucket_capacity, max_payload = shape
+        bucket_size = slot_size(max_payload) * bucket_capacity
+        if server_cls is SlabServer:
+            server = SlabServer.__new__(SlabServer)
+            server._metrics = metrics
+            server._configure(depth, bucket_capacity, max_payload)
+            server._slab = mmap.mmap(handle.fileno(), count * bucket_size, access=mmap.ACCESS_COPY,
+                                     offset=DATA_OFFSET)
+        elif server_cls is Server:
+            server = Server(depth, bucket_capacity, metrics)
+            with mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                with memoryview(mapped) as view:
+                    for node_index in range(count):
+                        _fill_bucket(server, node_index, view, DATA_OFFSET + node_index * bucket_size, max_payload)
+        else:
+            raise TypeError(f"Cannot restore into a {server_cls.__name__}; use SlabServer or Server.")
+
+    for increment_path in increments:
+        with open(increment_path, "rb") as handle:
+            kind, increment_shape, count, increment_id, base_id = _read_header(handle, increment_path)
+            if kind != KIND_INCREMENTAL or increment_shape[:2] != shape[:2]:
+                raise ValueError(f"{increment_path} is not an incremental snapshot of the same tree.")
+            if base_id != snapshot_id:
+                raise ValueError(f"{increment_path} does not follow the snapshot restored before it.")
+            increment_payload = increment_shape[2]
+            increment_size = slot_size(increment_payload) * bucket_capacity
+            record_size = NODE_INDEX.size + increment_size
+            with mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                with memoryview(mapped) as view:
+                    for record in range(count):
+                        offset = DATA_OFFSET + record * record_size
+                        node_index = NODE_INDEX.unpack_from(view, offset)[0]
+                        offset += NODE_INDEX.size
+                        if server_cls is not SlabServer:
+                            _fill_bucket(server, node_index, view, offset, increment_payload)
+                        elif increment_payload == max_payload:
+                            target = server._bucket_offset(node_index)
+                            server._slab[target:target + bucket_size] = view[offset:offset + bucket_size]
+                        else:
+                            _repack_bucket(server, node_index, view, offset, increment_payload)
+            snapshot_id = increment_id
+
+    server._dirty = set()
+    server._snapshot_id = snapshot_id
+    return server
+
+
+def _entry_record(block_id: int, leaf: int, content) -> bytes:
+    if isinstance(content, str):
+        kind, data = CONTENT_STR, content.encode()
+    else:
+        kind, data = CONTENT_BYTES, bytes(content)
+    return ENTRY_HEADER.pack(block_id, leaf, kind, len(data)) + data
+
+
+def _read_entry(view: memoryview, offset: int) -> tuple:
+    # Decodes the entry at `offset`, returning (block_id, leaf, content) and the offset after it
+    block_id, leaf, kind, length = ENTRY_HEADER.unpack_from(view, offset)
+    offset += ENTRY_HEADER.size
+    data = bytes(view[offset:offset + length])
+    return (block_id, leaf, data.decode() if kind == CONTENT_STR else data), offset + length
+
+
+def _format_shape(bucket_format) -> tuple[int, int]:
+    # Capacity and slot size of a BucketFormat, or zeros for none
+    if bucket_format is None:
+        return 0, 0
+    return bucket_format.capacity, bucket_format._slot_size
+
+
+def save_client(client: Client, path: str):
+    """
+    Streams the client's key, position map, stash and cached tree-top buckets to a file.
+
+    Deferred write-backs are flushed first, so the file matches the server once they are applied.
+    Anyone holding the file can read the ORAM: it contains the key.
+
+    Raises:
+        TypeError: For Ring and Circuit clients, which keep extra state, and for recursive
+                   position maps, which live on their own server.
+    """
+    if type(client) is not Client:
+        raise TypeError(f"Cannot save a {type(client).__name__}; only Path ORAM Client state is supported.")
+    pos_map = client._pos_map
+    if isinstance(pos_map, ArrayPositionMap):
+        map_kind, map_entries = MAP_ARRAY, len(pos_map._leaves)
+    elif isinstance(pos_map, PositionMap):
+        map_kind, map_entries = MAP_DICT, len(pos_map._leaves)
+    else:
+        raise TypeError(f"Cannot save a {type(pos_map).__name__}; only flat position maps are supported.")
+    client.flush()
+
+    stash = client._stash._entries  # Block ID -> (content, leaf)
+    cached = client._tree_top._buckets  # Node index -> entries
+    # A fixed-size client has no separate dummy size: its dummies are full blocks
+    dummy_size = 0 if client._block_size is not None else len(client._dummy_plaintext) - LEAF_HEADER.size
+    header = CLIENT_HEADER.pack(CLIENT_MAGIC, CLIENT_VERSION, map_kind, client._depth, client._tree_top.levels,
+                                dummy_size, client._block_size or 0, *_format_shape(client._bucket_format),
+                                client._key, map_entries, len(stash), sum(len(entries) for entries in cached.values()))
+
+    def write(output):
+        output.write(header)
+        if map_kind == MAP_ARRAY:
+            output.write(pos_map._leaves)
+        else:
+            output.write(array("q", pos_map._leaves.keys()))
+            output.write(array("I", pos_map._leaves.values()))
+        for block_id, (content, leaf) in stash.items():
+            output.write(_entry_record(block_id, leaf, content))
+        for node_index, entries in cached.items():
+            for block_id, leaf, content in entries:
+                output.write(NODE_INDEX.pack(node_index) + _entry_record(block_id, leaf, content))
+
+    _replace_file(path, write)
+
+
+def load_client(path: str, **client_options) -> Client:
+    """
+    Restores a client saved by save_client.
+
+    The block size and bucket format are restored as saved; passing them again is allowed if
+    they match. The depth, position map, dummy size, cached levels and key always come from the
+    snapshot and cannot be passed.
+
+    Args:
+        path (str): The client snapshot.
+        **client_options: Further Client options (crypto_workers, deferred_writes, ...).
+
+    Returns:
+        Client: A client holding the saved key, position map, stash and cached buckets.
+
+    Raises:
+        ValueError: If client_options hold a restored option, or if block_size or bucket_format
+            differ from those saved.
+    """
+    restored = sorted(set(client_options).intersection(RESTORED_OPTIONS))
+    if restored:
+        raise ValueError(f"load_client takes {', '.join(restored)} from the snapshot; they cannot be passed.")
+    with open(path, "rb") as handle, mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        with memoryview(mapped) as view:
+            (magic, version, map_kind, depth, cached_levels, dummy_size, block_size, format_capacity,
+             format_slot_size, key, map_entries, stash_entries, cached_entries) = CLIENT_HEADER.unpack_from(view)
+            if magic != CLIENT_MAGIC or version != CLIENT_VERSION:
+                raise ValueError(f"{path} is not an ORAM client snapshot of version {CLIENT_VERSION}.")
+            if client_options.get("block_size", block_size or None) != (block_size or None):
+                raise ValueError(f"{path} was saved with a block size of {block_size or None}, "
+                                 f"not {client_options['block_size']}.")
+            if _format_shape(client_options.get("bucket_format")) not in ((0, 0), (format_capacity, format_slot_size)):
+                raise ValueError(f"{path} was saved with another bucket format.")
+            client_options["block_size"] = block_size or None
+            if format_capacity:
+                client_options["bucket_format"] = BucketFormat(format_capacity, format_slot_size)
+            offset = CLIENT_HEADER.size
+
+            leaves = array("I")
+            if map_kind == MAP_ARRAY:
+                pos_map = ArrayPositionMap(0, depth)
+                leaves.frombytes(view[offset:offset + map_entries * leaves.itemsize])
+                pos_map._leaves = leaves
+                pos_map._assigned = len(leaves) - leaves.count(UNASSIGNED_LEAF)
+            else:
+                block_ids = array("q")
+                block_ids.frombytes(view[offset:offset + map_entries * block_ids.itemsize])
+                offset += map_entries * block_ids.itemsize
+                leaves.frombytes(view[offset:offset + map_entries * leaves.itemsize])
+                pos_map = PositionMap()
+                pos_map._leaves = dict(zip(block_ids, leaves))
+            offset += map_entries * leaves.itemsize
+
+            client = Client(depth, pos_map=pos_map, dummy_size=dummy_size, cached_levels=cached_levels, key=key,
+                            **client_options)
+            for _ in range(stash_entries):
+                (block_id, leaf, content), offset = _read_entry(view, offset)
+                client._stash.add(block_id, content, leaf)
+            for _ in range(cached_entries):
+                node_index = NODE_INDEX.unpack_from(view, offset)[0]
+                entry, offset = _read_entry(view, offset + NODE_INDEX.size)
+                client._tree_top._buckets.setdefault(node_index, []).append(entry)
+    return client
@@ -0,0 +1,118 @@
+from itertools import islice
+
+
+class Stash:
+    """
+    Client-side stash of decrypted blocks, indexed by block ID and by the tree nodes each block
+    may be evicted to.
+
+    Every block is registered under the prefix of its assigned leaf at each level of the tree.
+    A node at level d is identified by the top d bits of any leaf below it, so the blocks that
+    may be written into that node are exactly the blocks registered under the same prefix.
+
+    Attributes:
+        _depth (int): Depth of the ORAM tree the stash belongs to.
+        _entries (dict): Maps block ID to a (content, leaf) pair.
+        _by_prefix (list[dict]): Per level, maps a leaf prefix to the IDs registered under it.
+    """
+
+    def __init__(self, depth: int):
+        self._depth = depth
+        self._entries = {}
+        self._by_prefix = [{} for _ in range(depth + 1)]
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, block_id):
+        return block_id in self._entries
+
+    def __iter__(self):
+        return iter(self._entries)
+
+    def __repr__(self):
+        return f"Stash({list(self._entries)})"
+
+    # Method to get the content of a block by its ID (None if the block is not stashed)
+    def get(self, block_id: int):
+        entry = self._entries.get(block_id)
+        return entry[0] if entry is not None else None
+
+    # Method to get the leaf a stashed block is assigned to
+    def leaf_of(self, block_id: int) -> int:
+        return self._entries[block_id][1]
+
+    # Method to add (or replace) a block assigned to the given leaf
+    def add(self, block_id: int, content, leaf: int):
+        if block_id in self._entries:
+            self.remove(block_id)
+        self._entries[block_id] = (content, leaf)
+        for level, groups in enumerate(self._by_prefix):
+            prefix = leaf >> (self._depth - level)
+            group = groups.get(prefix)
+            if group is None:
+                groups[prefix] = group = {}
+            group[block_id] = None
+
+    # Method to remove a block by its ID, returning its content (None if the block is not stashed)
+    def remove(self, block_id: int):
+        entry = self._entries.pop(block_id, None)
+        if entry is None:
+            return None
+        content, leaf = entry
+        for level, groups in enumerate(self._by_prefix):
+            prefix = leaf >> (self._depth - level)
+            group = groups[prefix]
+            del group[block_id]
+            if not group:
+                del groups[prefix]
+        return content
+
+    # Method to move a stashed block to a newly assigned leaf
+    def reassign(self, block_id: int, leaf: int):
+        entry = self._entries.get(block_id)
+        if entry is not None:
+            self.add(block_id, entry[0], leaf)
+
+    def deepest_for(self, leaf: int):
+        """
+        Finds the stashed block that can go deepest along the path to `leaf`.
+
+        Args:
+            leaf (int): Leaf identifying the path.
+
+        Returns:
+            tuple | None: (block_id, level) of that block, or None if the stash is empty.
+        """
+        for level in range(self._depth, -1, -1):
+            group = self._by_prefix[level].get(leaf >> (self._depth - level))
+            if group:
+                return next(iter(group)), level
+        return None
+
+    def take_evictable(self, leaf: int, level: int, limit: int, pinned=()) -> list[tuple]:
+        """
+        Removes and returns up to `limit` blocks that may be stored in the node at `level`
+        on the path to `leaf`.
+
+        Args:
+            leaf (int): Leaf identifying the accessed path.
+            level (int): Level of the target node on that path (0 is the root).
+            limit (int): Maximum number of blocks to take.
+            pinned: IDs of blocks that must stay in the stash.
+
+        Returns:
+            list[tuple]: (block_id, leaf, content) for every block taken out of the stash.
+        """
+        group = self._by_prefix[level].get(leaf >> (self._depth - level))
+        if not group:
+            return []
+        if pinned:
+            chosen = list(islice((block_id for block_id in group if block_id not in pinned), limit))
+        else:
+            chosen = list(islice(group, limit))
+        taken = []
+        for block_id in chosen:
+            block_leaf = self._entries[block_id][1]
+            taken.append((block_id, block_leaf, self.remove(block_id)))
+        return taken
@@ -0,0 +1,164 @@
+import json
+import marshal
+import os
+import random
+import sys
+import threading
+from collections import deque
+from time import perf_counter_ns
+
+# CONSTANTS
+DEFAULT_MAX_ACCESSES = 100_000  # Traced accesses kept; the oldest are dropped beyond this
+TRACE_FILE = "Client.py"  # File name given to the phases in pstats output
+
+# PHASES OF AN ACCESS, in the order they run; each span ends where the next begins
+PHASES = ("remap", "read_path", "decrypt", "stash_merge", "handle_access", "evict", "encrypt", "write_path")
+
+
+class AccessTrace:
+    """
+    Phase boundaries of one traced access.
+
+    The access starts when the trace is created; every `mark(phase)` closes the span of that
+    phase at the current time, the span starting at the previous mark.
+    """
+
+    def __init__(self, kind: str):
+        self.kind = kind
+        self.thread = threading.get_ident()
+        self.marks = []  # (phase, end time in ns)
+        self.start_ns = perf_counter_ns()
+        self.end_ns = None
+
+    def mark(self, phase: str):
+        self.marks.append((phase, perf_counter_ns()))
+
+    def spans(self):
+        # Yields (phase, start ns, end ns) for every marked phase
+        start = self.start_ns
+        for phase, end in self.marks:
+            yield phase, start, end
+            start = end
+
+
+class Tracer:
+    """
+    Records a span for every phase of sampled client accesses.
+
+    A Client given a tracer asks it at the start of every access whether to trace it; accesses
+    left out by sampling cost a single `is not None` test per phase, as do all accesses of a
+    client without a tracer. Recorded accesses can be exported as Chrome trace-event JSON
+    (chrome://tracing, Perfetto) or as a pstats file readable by pstats.Stats and snakeviz.
+    """
+
+    def __init__(self, sample_rate: float = 1.0, max_accesses: int = DEFAULT_MAX_ACCESSES, seed: int = None):
+        """
+        Args:
+            sample_rate (float): Fraction of the accesses traced, drawn at random.
+            max_accesses (int): Number of traced accesses kept, the oldest being dropped first.
+            seed (int): Seed of the sampling decisions.
+        """
+        if not 0 <= sample_rate <= 1:
+            raise ValueError("The sample rate must be between 0 and 1.")
+        self._sample_rate = sample_rate
+        self._sampler = random.Random(seed)
+        self._lock = threading.Lock()  # Guards the sampler and the recorded accesses
+        self._accesses = deque(maxlen=max_accesses)
+        self._origin_ns = perf_counter_ns()
+
+    def begin(self, kind: str):
+        # Starts tracing an access, or returns None if sampling leaves it out
+        if self._sample_rate < 1:
+            with self._lock:
+                if self._sampler.random() >= self._sample_rate:
+                    return None
+        return AccessTrace(kind)
+
+    def finish(self, trace: AccessTrace):
+        trace.end_ns = perf_counter_ns()
+        with self._lock:
+            self._accesses.append(trace)
+
+    def clear(self):
+        # Drops every recorded access, for example once a warmup is over
+        with self._lock:
+            self._accesses.clear()
+
+    @property
+    def accesses(self) -> list[AccessTrace]:
+        with self._lock:
+            return list(self._accesses)
+
+    def phase_totals(self) -> dict:
+        """
+        Aggregates the recorded spans.
+
+        Returns:
+            dict: Maps every phase, and "access" for whole accesses, to (span count, total ns).
+        """
+        totals = {}
+        for trace in self.accesses:
+            count, total = totals.get("access", (0, 0))
+            totals["access"] = (count + 1, total + trace.end_ns - trace.start_ns)
+            for phase, start, end in trace.spans():
+                count, total = totals.get(phase, (0, 0))
+                totals[phase] = (count + 1, total + end - start)
+        return totals
+
+    def chrome_trace(self) -> dict:
+        # The recorded accesses as Chrome trace-event JSON, every access enclosing its phases
+        pid = os.getpid()
+        events = []
+        for sequence, trace in enumerate(self.accesses):
+            events.append({"name": trace.kind, "cat": "access", "ph": "X", "pid": pid, "tid": trace.thread,
+                           "ts": (trace.start_ns - self._origin_ns) / 1e3,
+                           "dur": (trace.end_ns - trace.start_ns) / 1e3, "args": {"sequence": sequence}})
+            for phase, start, end in trace.spans():
+                events.append({"name": phase, "cat": "phase", "ph": "X", "pid": pid, "tid": trace.thread,
+                               "ts": (start - self._origin_ns) / 1e3, "dur": (end - start) / 1e3})
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def write_chrome_trace(self, path: str):
+        with open(path, "w") as output:
+            json.dump(self.chrome_trace(), output)
+
+    def pstats_table(self) -> dict:
+        """
+        The recorded spans in the format of cProfile's stats, as pstats.Stats loads them.
+
+        Every access kind is a function calling one function per phase; time not covered by any
+        phase is the access's own time.
+        """
+        stats = {}
+        for trace in self.accesses:
+            access_key = (TRACE_FILE, 0, trace.kind)
+            phase_ns = 0
+            for phase, start, end in trace.spans():
+                elapsed = (end - start) / 1e9
+                phase_ns += end - start
+                calls, _, own, cumulative, callers = stats.get((TRACE_FILE, 0, phase), (0, 0, 0.0, 0.0, {}))
+                stats[(TRACE_FILE, 0, phase)] = (calls + 1, calls + 1, own + elapsed, cumulative + elapsed, callers)
+                caller_calls, _, caller_own, caller_cumulative = callers.get(access_key, (0, 0, 0.0, 0.0))
+                callers[access_key] = (caller_calls + 1, caller_calls + 1,
+                                       caller_own + elapsed, caller_cumulative + elapsed)
+            total = (trace.end_ns - trace.start_ns) / 1e9
+            calls, _, own, cumulative, callers = stats.get(access_key, (0, 0, 0.0, 0.0, {}))
+            stats[access_key] = (calls + 1, calls + 1, own + total - phase_ns / 1e9, cumulative + total, callers)
+        return stats
+
+    def write_pstats(self, path: str):
+        # Writes a file readable by pstats.Stats(path)
+        with open(path, "wb") as output:
+            marshal.dump(self.pstats_table(), output)
+
+    def print_summary(self, stream=None):
+        # Prints the count, total and mean time of every phase, and its share of the access time
+        stream = stream or sys.stdout
+        totals = self.phase_totals()
+        access_ns = totals.get("access", (0, 0))[1] or 1
+        print(f"{'Phase':<15} {'Spans':>8} {'Total (ms)':>12} {'Mean (us)':>11} {'Share':>7}", file=stream)
+        for phase in ("access",) + PHASES:
+            if phase in totals:
+                count, total = totals[phase]
+                print(f"{phase:<15} {count:>8} {total / 1e6:>12.2f} {total / count / 1e3:>11.1f} "
+                      f"{total / access_ns:>7.1%}", file=stream)
@@ -0,0 +1,71 @@
+from TreeUtils import node_level
+
+
+def levels_for_budget(budget_bytes: int, bucket_capacity: int, block_size: int, depth: int) -> int:
+    """
+    Picks how many top levels of the tree fit in a client-side memory budget.
+
+    Args:
+        budget_bytes (int): Memory the client may spend on cached buckets.
+        bucket_capacity (int): Number of blocks per bucket.
+        block_size (int): Approximate memory taken by one cached block, in bytes.
+        depth (int): Depth of the ORAM tree.
+
+    Returns:
+        int: The largest k whose 2^k - 1 buckets fit in the budget. The leaf level always
+             stays on the server, so k is at most `depth`.
+    """
+    bucket_bytes = bucket_capacity * block_size
+    levels = 0
+    while levels < depth and ((1 << (levels + 1)) - 1) * bucket_bytes <= budget_bytes:
+        levels += 1
+    return levels
+
+
+class TreeTopCache:
+    """
+    Client-side copy of the top `levels` levels of the ORAM tree.
+
+    Those buckets are on every path, so keeping them locally removes them from every read and
+    write-back. They are held decrypted, as lists of (block_id, leaf, content) entries, and the
+    server never sees them; the client reads and evicts into them like any other bucket.
+    """
+
+    def __init__(self, levels: int = 0):
+        self._levels = levels
+        self._buckets = {}  # Node index -> entries, for every cached bucket holding blocks
+
+    def __len__(self):
+        # Number of real blocks held in the cached buckets
+        return sum(len(entries) for entries in self._buckets.values())
+
+    @property
+    def levels(self) -> int:
+        return self._levels
+
+    def covers(self, node_index: int) -> bool:
+        # Whether a node lies in the cached top of the tree
+        return node_level(node_index) < self._levels
+
+    def take(self, node_indices) -> list[tuple]:
+        """
+        Empties the cached buckets among the given nodes.
+
+        Args:
+            node_indices: Node indices, possibly including nodes below the cached levels.
+
+        Returns:
+            list[tuple]: (block_id, leaf, content) of every block the cached buckets held.
+        """
+        entries = []
+        for node_index in node_indices:
+            if self.covers(node_index):
+                entries.extend(self._buckets.pop(node_index, ()))
+        return entries
+
+    def put(self, node_index: int, entries: list[tuple]):
+        # Replaces the content of a cached bucket
+        if entries:
+            self._buckets[node_index] = entries
+        else:
+            self._buckets.pop(node_index, None)
@@ -44,3 +44,62 @@ def find_path_indices(leaf_pos: int, depth: int) -> list[int]:
 
     # Return the path from root to leaf by reversing the list
     return path_indices[::-1]
+
+
+def deepest_common_level(leaf_a: int, leaf_b: int, depth: int) -> int:
+    """
+    Finds the deepest level at which the paths of two leaves still share a node.
+
+    Parameters:
+        leaf_a (int): The first leaf position, ranging from 0 to (2^depth - 1).
+        leaf_b (int): The second leaf position, ranging from 0 to (2^depth - 1).
+        depth (int): The depth of the binary tree.
+
+    Returns:
+        int: The level of the lowest shared node (0 is the root, depth is the leaf level).
+    """
+    # Paths diverge right below the highest bit in which the two leaves differ
+    return depth - (leaf_a ^ leaf_b).bit_length()
+
+
+def find_paths_union(leaf_positions: list[int], depth: int) -> list[int]:
+    """
+    Collects the indices of all nodes lying on at least one of the paths to the given leaves.
+
+    Parameters:
+        leaf_positions (list[int]): The leaf positions whose paths are combined.
+        depth (int): The depth of the binary tree.
+
+    Returns:
+        list[int]: The distinct node indices, in ascending order (so parents come before children).
+    """
+    nodes = set()
+    for leaf_pos in leaf_positions:
+        flat_index = (1 << depth) - 1 + leaf_pos
+        # Stop climbing as soon as we reach a node already shared with an earlier path
+        while flat_index >= 0 and flat_index not in nodes:
+            nodes.add(flat_index)
+            flat_index = (flat_index - 1) // 2
+    return sorted(nodes)
+
+
+def node_level(node_index: int) -> int:
+    """
+    Returns the level of a node given its flattened index (0 is the root).
+    """
+    return (node_index + 1).bit_length() - 1
+
+
+def leftmost_leaf(node_index: int, depth: int) -> int:
+    """
+    Returns the position of the leftmost leaf in the subtree rooted at the given node.
+
+    Parameters:
+        node_index (int): The flattened index of the node.
+        depth (int): The depth of the binary tree.
+
+    Returns:
+        int: A leaf position whose path passes through the node.
+    """
+    level = node_level(node_index)
+    return (node_index + 1 - (1 << level)) << (depth - level)
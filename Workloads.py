@@ -0,0 +1,237 @@
+import random
+from itertools import count, islice
+
+from Client import OP_READ, OP_WRITE, OP_DELETE
+
+# CONSTANTS
+DEFAULT_THETA = 0.99  # YCSB's default Zipfian skew
+DEFAULT_DELETE_FRACTION = 0.1
+FNV_OFFSET = 0xCBF29CE484222325
+FNV_PRIME = 0x100000001B3
+
+# YCSB CORE WORKLOADS: fraction of reads, the rest being updates
+YCSB_READ_FRACTIONS = {"a": 0.5, "b": 0.95, "c": 1.0}
+
+# Every operation is an (action, block_id) or (action, block_id, payload) tuple, as taken by Client.batch_access
+
+
+def _fnv_hash(value: int) -> int:
+    # 64-bit FNV-1a over the 8 bytes of value, used to scatter Zipfian ranks over the key space
+    hashed = FNV_OFFSET
+    for _ in range(8):
+        hashed = ((hashed ^ (value & 0xFF)) * FNV_PRIME) & 0xFFFFFFFFFFFFFFFF
+        value >>= 8
+    return hashed
+
+
+class ZipfianKeys:
+    """
+    Draws keys in [0, key_count) following a Zipfian distribution, with the generator of Gray et al.
+    used by YCSB.
+
+    Key k is drawn with probability proportional to 1 / (k + 1) ** theta, so low keys are hot.
+    With `scrambled` the ranks are hashed over the key space, spreading the hot keys out as YCSB does.
+    """
+
+    def __init__(self, key_count: int, theta: float = DEFAULT_THETA, generator: random.Random = None,
+                 scrambled: bool = False):
+        if not 0 < theta < 1:
+            raise ValueError("The Zipfian generator needs 0 < theta < 1.")
+        self._key_count = key_count
+        self._theta = theta
+        self._generator = generator or random.Random()
+        self._scrambled = scrambled
+        self._zeta = sum(1 / rank ** theta for rank in range(1, key_count + 1))
+        self._alpha = 1 / (1 - theta)
+        self._eta = (1 - (2 / key_count) ** (1 - theta)) / (1 - (1 + 0.5 ** theta) / self._zeta)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> int:
+        scaled = self._generator.random() * self._zeta
+        if scaled < 1:
+            rank = 0
+        elif scaled < 1 + 0.5 ** self._theta:
+            rank = 1
+        else:
+            rank = int(self._key_count * (self._eta * scaled / self._zeta - self._eta + 1) ** self._alpha)
+            rank = min(rank, self._key_count - 1)
+        return _fnv_hash(rank) % self._key_count if self._scrambled else rank
+
+
+def uniform_keys(key_count: int, generator: random.Random):
+    # Endless uniformly random keys in [0, key_count)
+    while True:
+        yield generator.randrange(key_count)
+
+
+def sequential_keys(key_count: int, start: int = 0):
+    # Endless scan over [0, key_count), wrapping around
+    for position in count(start):
+        yield position % key_count
+
+
+def mixed_operations(keys, weights: dict, generator: random.Random):
+    """
+    Turns a key stream into operations, choosing the action of each one by weight.
+
+    Args:
+        keys: Iterator of block IDs.
+        weights (dict): Relative weight of every action among OP_READ, OP_WRITE and OP_DELETE.
+        generator (random.Random): Source of randomness for the actions and written payloads.
+
+    Yields:
+        tuple: One operation per key.
+    """
+    actions, action_weights = zip(*weights.items())
+    for block_id in keys:
+        action = generator.choices(actions, action_weights)[0]
+        if action == OP_WRITE:
+            yield action, block_id, f"w{generator.randrange(10 ** 6):06}"
+        else:
+            yield action, block_id
+
+
+def ycsb(key_count: int, workload: str, theta: float = DEFAULT_THETA, seed: int = None):
+    """
+    YCSB core workload A (50% updates), B (5% updates) or C (read only) over scrambled Zipfian keys.
+
+    Updates overwrite the whole record, so they are issued as writes.
+    """
+    generator = random.Random(seed)
+    read_fraction = YCSB_READ_FRACTIONS[workload.lower()]
+    keys = ZipfianKeys(key_count, theta, generator, scrambled=True)
+    return mixed_operations(keys, {OP_READ: read_fraction, OP_WRITE: 1 - read_fraction}, generator)
+
+
+def delete_churn(key_count: int, delete_fraction: float = DEFAULT_DELETE_FRACTION, seed: int = None):
+    """
+    Reads live keys while deleting live keys and re-inserting deleted ones at the same rate,
+    so the number of live blocks stays around key_count.
+
+    Yields:
+        tuple: One operation at a time, endlessly.
+    """
+    generator = random.Random(seed)
+    live = list(range(key_count))
+    deleted = []
+    while True:
+        draw = generator.random()
+        if draw < delete_fraction and live:
+            index = generator.randrange(len(live))
+            live[index], live[-1] = live[-1], live[index]
+            block_id = live.pop()
+            deleted.append(block_id)
+            yield OP_DELETE, block_id
+        elif draw < 2 * delete_fraction and deleted:
+            index = generator.randrange(len(deleted))
+            deleted[index], deleted[-1] = deleted[-1], deleted[index]
+            block_id = deleted.pop()
+            live.append(block_id)
+            yield OP_WRITE, block_id, f"w{generator.randrange(10 ** 6):06}"
+        else:
+            yield OP_READ, live[generator.randrange(len(live))] if live else generator.randrange(key_count)
+
+
+def _uniform_mix(weights: dict):
+    def build(key_count: int, seed: int = None, theta: float = DEFAULT_THETA):
+        generator = random.Random(seed)
+        return mixed_operations(uniform_keys(key_count, generator), weights, generator)
+    return build
+
+
+def _zipfian_reads(key_count: int, seed: int = None, theta: float = DEFAULT_THETA):
+    generator = random.Random(seed)
+    return mixed_operations(ZipfianKeys(key_count, theta, generator), {OP_READ: 1.0}, generator)
+
+
+def _scan(key_count: int, seed: int = None, theta: float = DEFAULT_THETA):
+    return ((OP_READ, block_id) for block_id in sequential_keys(key_count))
+
+
+# NAMED WORKLOADS: name -> factory(key_count, seed, theta) returning an endless iterator of operations.
+# Only the workloads in SKEWED_WORKLOADS draw Zipfian keys; the others ignore theta.
+WORKLOADS = {
+    "read-only": _uniform_mix({OP_READ: 1.0}),
+    "read-heavy": _uniform_mix({OP_READ: 0.9, OP_WRITE: 0.1}),
+    "balanced": _uniform_mix({OP_READ: 0.5, OP_WRITE: 0.5}),
+    "churn": _uniform_mix({OP_READ: 0.6, OP_WRITE: 0.25, OP_DELETE: 0.15}),
+    "zipfian": _zipfian_reads,
+    "scan": _scan,
+    "ycsb-a": lambda key_count, seed=None, theta=DEFAULT_THETA: ycsb(key_count, "a", theta, seed),
+    "ycsb-b": lambda key_count, seed=None, theta=DEFAULT_THETA: ycsb(key_count, "b", theta, seed),
+    "ycsb-c": lambda key_count, seed=None, theta=DEFAULT_THETA: ycsb(key_count, "c", theta, seed),
+    "delete-churn": lambda key_count, seed=None, theta=DEFAULT_THETA: delete_churn(key_count, seed=seed),
+}
+SKEWED_WORKLOADS = {"zipfian", "ycsb-a", "ycsb-b", "ycsb-c"}
+
+
+def write_trace(path: str, operations):
+    """
+    Records operations to a trace file, one "<action> <block_id> [payload]" line each.
+
+    Payloads must not contain line breaks.
+    """
+    with open(path, "w") as trace:
+        for action, block_id, *payload in operations:
+            trace.write(f"{action} {block_id} {payload[0]}\n" if payload else f"{action} {block_id}\n")
+
+
+def read_trace(path: str):
+    """
+    Streams the operations of a trace file one line at a time, never holding the whole file in memory.
+    Blank lines and lines starting with '#' are skipped.
+
+    Yields:
+        tuple: One operation per line.
+    """
+    with open(path) as trace:
+        for line in trace:
+            if not line.strip() or line.startswith("#"):
+                continue
+            fields = line.rstrip("\n").split(" ", 2)
+            if len(fields) == 3:
+                yield fields[0], int(fields[1]), fields[2]
+            else:
+                yield fields[0], int(fields[1])
+
+
+def apply_operation(client, server, operation: tuple):
+    # Runs one operation through a Client, returning its result
+    action, block_id, *payload = operation
+    if action == OP_READ:
+        return client.retrieve_data(server, block_id)
+    if action == OP_WRITE:
+        return client.store_data(server, block_id, payload[0])
+    if action == OP_DELETE:
+        return client.delete_data(server, block_id)
+    raise ValueError(f"Unknown action {action!r}.")
+
+
+def replay(client, server, operations, batch_size: int = 1) -> int:
+    """
+    Streams operations, for example from read_trace, through a Client.
+
+    Args:
+        client (Client): The client to drive.
+        server: The ORAM server.
+        operations: Iterable of operations; consumed lazily.
+        batch_size (int): With more than 1, consecutive operations are grouped into batch_access calls.
+
+    Returns:
+        int: Number of operations replayed.
+    """
+    operations = iter(operations)
+    replayed = 0
+    if batch_size <= 1:
+        for operation in operations:
+            apply_operation(client, server, operation)
+            replayed += 1
+        return replayed
+    while True:
+        batch = list(islice(operations, batch_size))
+        if not batch:
+            return replayed
+        client.batch_access(server, batch)
+        replayed += len(batch)
@@ -0,0 +1,120 @@
+import queue
+import threading
+
+
+class WriteBackQueue:
+    """
+    Bounded queue of bucket write-backs applied to the server by a background thread.
+
+    The client evicts into plaintext buckets and queues them; the worker seals and writes them in
+    the order they were queued. Until its last queued write has been applied, the server copy of
+    a bucket is stale, so the queue keeps the plaintext of the latest write of every such bucket
+    and later accesses take their blocks from here instead of from the server.
+    """
+
+    def __init__(self, seal, max_pending: int):
+        """
+        Args:
+            seal: Callable (server, buckets) -> sealed buckets, turning a dict of node index to
+                  (block_id, leaf, content) entries into a dict of node index to blocks.
+            max_pending (int): Maximum number of queued write-backs; submit blocks while the queue is full.
+        """
+        self._seal = seal
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._lock = threading.Lock()  # Guards the two tables below
+        self._entries = {}  # Node index -> entries of its latest queued write, until they are taken
+        self._counts = {}  # Node index -> queued writes not yet applied
+        self._failures = []
+        self._closed = False
+        self._worker = threading.Thread(target=self._run, daemon=True)
+        self._worker.start()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                self._queue.task_done()
+                return
+            server, buckets = item
+            try:
+                server.write_paths(self._seal(server, buckets))
+            except Exception as err:
+                self._failures.append(err)
+            finally:
+                with self._lock:
+                    for node_index in buckets:
+                        self._counts[node_index] -= 1
+                        if not self._counts[node_index]:
+                            del self._counts[node_index]
+                            self._entries.pop(node_index, None)
+                self._queue.task_done()
+
+    def _raise_failure(self):
+        if self._failures:
+            raise self._failures.pop(0)
+
+    def take(self, node_indices) -> dict:
+        """
+        Empties the queued content of the given nodes whose server copy is stale.
+
+        Must be called before reading the nodes from the server: a write applied in between would
+        otherwise leave neither copy holding the blocks. If the read then fails, `restore` hands
+        the content back.
+
+        Args:
+            node_indices: Node indices about to be read.
+
+        Returns:
+            dict: Maps every node with a write still queued, whose server copy must be ignored, to
+                  the (block_id, leaf, content) entries of its latest queued write.
+        """
+        taken = {}
+        with self._lock:
+            for node_index in node_indices:
+                if node_index in self._counts:
+                    taken[node_index] = self._entries[node_index]
+                    self._entries[node_index] = []  # Rebound, never mutated: the worker may be sealing it
+        return taken
+
+    def restore(self, taken: dict):
+        # Undoes a take whose read failed. Nodes whose write has been applied since hold the
+        # entries on the server already.
+        with self._lock:
+            for node_index, entries in taken.items():
+                if node_index in self._counts:
+                    self._entries[node_index] = entries
+
+    def submit(self, server, buckets: dict):
+        """
+        Queues the write-back of several buckets, blocking while the queue is full.
+
+        Args:
+            server: The server to write to.
+            buckets (dict): Maps node indices to the (block_id, leaf, content) entries to store there.
+
+        Raises:
+            Exception: The failure of an earlier write-back, if any.
+        """
+        if self._closed:
+            raise ValueError("The write-back queue is closed.")
+        self._raise_failure()
+        with self._lock:
+            for node_index, entries in buckets.items():
+                self._entries[node_index] = entries
+                self._counts[node_index] = self._counts.get(node_index, 0) + 1
+        self._queue.put((server, buckets))
+
+    def flush(self):
+        # Waits until every queued write-back has been applied
+        self._queue.join()
+        self._raise_failure()
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            self.flush()
+        finally:
+            self._queue.put(None)
+            self._worker.join()